@@ -0,0 +1,3 @@
+"""
+Kokoro MCP Server ベンチマーク
+"""
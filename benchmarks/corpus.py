@@ -0,0 +1,82 @@
+"""
+ベンチマーク用の固定コーパス
+
+結果をバージョン間で比較できるよう、テキストは変更しないでください。
+テキストを変更・追加する場合は CORPUS_VERSION を上げてください。
+"""
+
+from typing import Dict, List
+
+CORPUS_VERSION = 1
+
+CORPUS: List[Dict[str, str]] = [
+    {
+        "id": "ja-short",
+        "lang": "ja",
+        "size": "short",
+        "voice": "jf_alpha",
+        "text": "こんにちは、今日はいい天気ですね。",
+    },
+    {
+        "id": "ja-medium",
+        "lang": "ja",
+        "size": "medium",
+        "voice": "jf_alpha",
+        "text": (
+            "音声合成は、テキストを人間の声のような音声に変換する技術です。"
+            "近年はニューラルネットワークの発展により、自然で聞き取りやすい音声が生成できるようになりました。"
+            "読み上げやアシスタント、アクセシビリティなど、さまざまな場面で利用されています。"
+        ),
+    },
+    {
+        "id": "ja-long",
+        "lang": "ja",
+        "size": "long",
+        "voice": "jf_alpha",
+        "text": (
+            "むかしむかし、ある山のふもとの小さな村に、働き者のおじいさんとおばあさんが住んでいました。"
+            "おじいさんは毎朝早く起きて山へ柴刈りに行き、おばあさんは川へ洗濯に行きました。"
+            "ある日、おばあさんが川で洗濯をしていると、上流から大きな桃がどんぶらこ、どんぶらこと流れてきました。"
+            "おばあさんはその桃を拾い上げ、家に持って帰っておじいさんと一緒に食べようと思いました。"
+            "夕方、山から帰ってきたおじいさんは、その大きな桃を見てたいへん驚きました。"
+            "二人が桃を切ろうとすると、桃がひとりでに割れて、中から元気な男の子が生まれました。"
+            "子どものいなかった二人はたいそう喜び、その子を桃太郎と名付けて大切に育てました。"
+            "桃太郎はすくすくと育ち、やがて村でいちばんの力持ちになりました。"
+        ),
+    },
+    {
+        "id": "en-short",
+        "lang": "en",
+        "size": "short",
+        "voice": "af_heart",
+        "text": "Hello, it is a lovely day today.",
+    },
+    {
+        "id": "en-medium",
+        "lang": "en",
+        "size": "medium",
+        "voice": "af_heart",
+        "text": (
+            "Speech synthesis turns written text into audio that sounds like a human voice. "
+            "Recent neural models produce speech that is natural and easy to understand. "
+            "It is used for screen readers, voice assistants and audiobooks."
+        ),
+    },
+    {
+        "id": "en-long",
+        "lang": "en",
+        "size": "long",
+        "voice": "af_heart",
+        "text": (
+            "Once upon a time, in a small village at the foot of a mountain, there lived an old man "
+            "and an old woman who worked hard every day. Each morning the old man went up the "
+            "mountain to gather firewood, and the old woman went down to the river to wash clothes. "
+            "One day, while she was washing, a huge peach came floating down the stream. "
+            "She carried it home, planning to share it with her husband that evening. "
+            "When they tried to cut the peach open, it split by itself, and a healthy baby boy "
+            "appeared inside. The couple, who had no children of their own, were overjoyed. "
+            "They named the boy Momotaro and raised him with great care, and he grew up to be "
+            "the strongest person in the whole village."
+        ),
+    },
+]
@@ -0,0 +1,429 @@
+"""
+Kokoro MCP Server 負荷試験
+
+複数のクライアントから ``text-to-speech``・``list-voices``・``audio://history`` の読み込みを
+指定した割合・目標レートで同時に送り、スループット・レイテンシの分布・エラー率・
+イベントループの遅延を計測します。
+
+- memory: サーバーを同じプロセス内で起動し、クライアントごとにセッションを作成します
+- stdio: サーバーを子プロセスとして起動し、1つのセッション上で並行してリクエストを送ります
+- http: 起動済みのサーバー（``TTS_TRANSPORT=http``）にStreamable HTTPで接続し、クライアントごとにセッションを作成します
+
+使い方::
+
+    MOCK_TTS=true PYTHONPATH=src python -m benchmarks.load --clients 8 --rate 20 --duration 30
+    PYTHONPATH=src python -m benchmarks.load --transport stdio --mix tts=0.5,voices=0.3,history=0.2
+    PYTHONPATH=src python -m benchmarks.load --transport http --url http://127.0.0.1:8080/mcp --clients 16
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+from contextlib import AsyncExitStack
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+# サーバーモジュールの読み込み前に設定する
+os.environ.setdefault("TTS_HISTORY_DB", "output/load/history.sqlite3")
+
+from mcp import ClientSession  # noqa: E402
+
+from kokoro_mcp_server.metrics import Histogram  # noqa: E402
+
+from .corpus import CORPUS  # noqa: E402
+
+OPERATIONS = ("tts", "voices", "history")
+DEFAULT_MIX = "tts=0.6,voices=0.2,history=0.2"
+DEFAULT_URL = "http://127.0.0.1:8080/mcp"
+
+
+def parse_mix(value: str) -> Dict[str, float]:
+    """
+    "tts=0.6,voices=0.2,history=0.2" 形式の割合を解析する
+
+    Args:
+        value: 割合の指定
+
+    Returns:
+        Dict[str, float]: 操作ごとの重み
+    """
+    mix: Dict[str, float] = {}
+    for part in value.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in OPERATIONS:
+            raise ValueError(f"unknown operation: {name!r} (expected one of {OPERATIONS})")
+        mix[name] = float(weight)
+    if sum(mix.values()) <= 0:
+        raise ValueError("mix weights must add up to a positive value")
+    return mix
+
+
+class LoadStats:
+    """操作ごとのレイテンシとエラー数の集計"""
+
+    def __init__(self) -> None:
+        """初期化"""
+        self.latencies: Dict[str, List[float]] = {name: [] for name in OPERATIONS}
+        self.errors: Dict[str, int] = {name: 0 for name in OPERATIONS}
+        self.error_messages: Dict[str, int] = {}
+        self.dropped = 0
+        self.loop_lag: List[float] = []
+
+    def record(self, operation: str, latency: float, error: Optional[str] = None) -> None:
+        """
+        1件の結果を記録する
+
+        Args:
+            operation: 操作の名前
+            latency: レイテンシ（秒）
+            error: エラーの内容（成功した場合はNone）
+        """
+        self.latencies[operation].append(latency)
+        if error is not None:
+            self.errors[operation] += 1
+            key = f"{operation}: {error[:80]}"
+            self.error_messages[key] = self.error_messages.get(key, 0) + 1
+
+    def report(self, elapsed: float) -> Dict[str, Any]:
+        """
+        集計結果を作成する
+
+        Args:
+            elapsed: 計測時間（秒）
+
+        Returns:
+            Dict[str, Any]: 操作ごと・全体のスループット、レイテンシ、エラー率
+        """
+        operations: Dict[str, Any] = {}
+        for name in OPERATIONS:
+            count = len(self.latencies[name])
+            if not count:
+                continue
+            operations[name] = {
+                "count": count,
+                "throughput": count / elapsed,
+                "error_rate": self.errors[name] / count,
+                "latency": _summarize(self.latencies[name]),
+            }
+
+        total = sum(len(values) for values in self.latencies.values())
+        errors = sum(self.errors.values())
+        return {
+            "elapsed_seconds": elapsed,
+            "requests": total,
+            "throughput": total / elapsed if elapsed else 0.0,
+            "error_rate": errors / total if total else 0.0,
+            "dropped": self.dropped,
+            "latency": _summarize([v for values in self.latencies.values() for v in values]),
+            "operations": operations,
+            "errors": self.error_messages,
+            "client_loop_lag": _summarize(self.loop_lag),
+        }
+
+
+def _summarize(values: List[float]) -> Optional[Dict[str, Any]]:
+    """計測値の集計（平均・最大・p50/p95/p99）を作成する"""
+    if not values:
+        return None
+    histogram = Histogram(window=len(values))
+    for value in values:
+        histogram.observe(value)
+    return histogram.snapshot()
+
+
+class LoadGenerator:
+    """セッションに対して操作を送り、結果を記録する"""
+
+    def __init__(self, response: str, seed: int = 0):
+        """
+        初期化
+
+        Args:
+            response: text-to-speech の応答方式（"inline" または "reference"）
+            seed: テキストや操作の選択に使う乱数のシード
+        """
+        self.response = response
+        self.stats = LoadStats()
+        self.history_uris: List[str] = []
+        self._random = random.Random(seed)
+
+    async def run_operation(self, session: ClientSession, operation: str) -> None:
+        """
+        1つの操作を実行し、レイテンシとエラーを記録する
+
+        Args:
+            session: クライアントセッション
+            operation: 操作の名前
+        """
+        started = time.perf_counter()
+        error: Optional[str] = None
+        try:
+            if operation == "tts":
+                item = self._random.choice(CORPUS)
+                result = await session.call_tool(
+                    "text-to-speech",
+                    {"text": item["text"], "voice": item["voice"], "response": self.response},
+                )
+                if result.isError:
+                    error = _result_text(result)
+                elif self.response == "reference":
+                    self.history_uris.append(json.loads(_result_text(result))["uri"])
+            elif operation == "voices":
+                result = await session.call_tool("list-voices", {})
+                if result.isError:
+                    error = _result_text(result)
+            else:
+                await self._read_history(session)
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+        self.stats.record(operation, time.perf_counter() - started, error)
+
+    async def _read_history(self, session: ClientSession) -> None:
+        """既知の履歴を1件読み込む（まだなければ history://list から取得する）"""
+        if not self.history_uris or self._random.random() < 0.05:
+            listing = await session.read_resource("history://list?limit=50")
+            entries = json.loads(listing.contents[0].text)["entries"]
+            self.history_uris = [f"audio://history/{entry['id']}" for entry in entries]
+            if not self.history_uris:
+                return
+        uri = self._random.choice(self.history_uris)
+        contents = await session.read_resource(f"{uri}?chunk=0")
+        if "error" in json.loads(contents.contents[0].text):
+            # 保持期間を過ぎて削除された履歴は一覧から除く
+            self.history_uris.remove(uri)
+
+    def choose(self, mix: Dict[str, float]) -> str:
+        """割合に従って次の操作を選ぶ"""
+        return self._random.choices(list(mix), weights=list(mix.values()))[0]
+
+
+def _result_text(result: Any) -> str:
+    """ツールの結果からテキストを取り出す"""
+    for content in result.content:
+        if getattr(content, "type", None) == "text":
+            return content.text
+    return ""
+
+
+async def _monitor_loop_lag(stats: LoadStats, interval: float = 0.05) -> None:
+    """クライアント側のイベントループの遅延を記録する"""
+    while True:
+        started = time.perf_counter()
+        await asyncio.sleep(interval)
+        stats.loop_lag.append(max(time.perf_counter() - started - interval, 0.0))
+
+
+async def open_sessions(
+    stack: AsyncExitStack, transport: str, clients: int, url: str = DEFAULT_URL
+) -> List[ClientSession]:
+    """
+    クライアントセッションを作成する
+
+    Args:
+        stack: セッションの終了処理を登録するスタック
+        transport: "memory"、"stdio" または "http"
+        clients: クライアント数
+        url: httpで接続するサーバーのURL
+
+    Returns:
+        List[ClientSession]: クライアントごとのセッション（stdioでは同じセッションを共有）
+    """
+    if transport == "memory":
+        from mcp.shared.memory import create_connected_server_and_client_session
+
+        from kokoro_mcp_server import server
+
+        server.start_tts_loading()
+        server.start_loop_lag_monitor()
+        return [
+            await stack.enter_async_context(create_connected_server_and_client_session(server.server))
+            for _ in range(clients)
+        ]
+
+    if transport == "http":
+        from mcp.client.streamable_http import streamablehttp_client
+
+        sessions = []
+        for _ in range(clients):
+            read_stream, write_stream, _ = await stack.enter_async_context(streamablehttp_client(url))
+            session = await stack.enter_async_context(ClientSession(read_stream, write_stream))
+            await session.initialize()
+            sessions.append(session)
+        return sessions
+
+    from mcp.client.stdio import StdioServerParameters, stdio_client
+
+    src_dir = str(Path(__file__).resolve().parent.parent / "src")
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [src_dir, env.get("PYTHONPATH")]))
+    params = StdioServerParameters(
+        command=sys.executable,
+        args=["-c", "import asyncio; from kokoro_mcp_server import server; asyncio.run(server.main())"],
+        env=env,
+    )
+    read_stream, write_stream = await stack.enter_async_context(stdio_client(params))
+    session = await stack.enter_async_context(ClientSession(read_stream, write_stream))
+    await session.initialize()
+    return [session] * clients
+
+
+async def run(
+    transport: str,
+    clients: int,
+    rate: float,
+    duration: float,
+    mix: Dict[str, float],
+    response: str,
+    max_inflight: int,
+    seed: int,
+    url: str = DEFAULT_URL,
+) -> Dict[str, Any]:
+    """
+    負荷試験を実行する
+
+    ``rate`` が0より大きい場合は目標レートでリクエストを送り（オープンループ）、
+    0の場合は各クライアントが前の応答を待ってから次を送ります（クローズドループ）。
+
+    Args:
+        transport: "memory"、"stdio" または "http"
+        clients: クライアント数
+        rate: 全体の目標レート（リクエスト/秒、0でクローズドループ）
+        duration: 計測時間（秒）
+        mix: 操作ごとの重み
+        response: text-to-speech の応答方式
+        max_inflight: 同時に処理中にできるリクエスト数の上限（オープンループ時）
+        seed: 乱数のシード
+        url: httpで接続するサーバーのURL
+
+    Returns:
+        Dict[str, Any]: 計測結果
+    """
+    generator = LoadGenerator(response, seed)
+    async with AsyncExitStack() as stack:
+        sessions = await open_sessions(stack, transport, clients, url)
+        lag_task = asyncio.create_task(_monitor_loop_lag(generator.stats))
+        started = time.perf_counter()
+        deadline = started + duration
+
+        if rate > 0:
+            inflight: set = set()
+            interval = 1.0 / rate
+            next_at = started
+            index = 0
+            while next_at < deadline:
+                await asyncio.sleep(max(next_at - time.perf_counter(), 0))
+                next_at += interval
+                if len(inflight) >= max_inflight:
+                    generator.stats.dropped += 1
+                    continue
+                session = sessions[index % len(sessions)]
+                index += 1
+                task = asyncio.create_task(
+                    generator.run_operation(session, generator.choose(mix))
+                )
+                inflight.add(task)
+                task.add_done_callback(inflight.discard)
+            if inflight:
+                await asyncio.gather(*inflight)
+        else:
+            async def client_loop(session: ClientSession) -> None:
+                while time.perf_counter() < deadline:
+                    await generator.run_operation(session, generator.choose(mix))
+
+            await asyncio.gather(*(client_loop(session) for session in sessions))
+
+        elapsed = time.perf_counter() - started
+        lag_task.cancel()
+
+        server_metrics = await sessions[0].read_resource("metrics://tts")
+        server_stats = json.loads(server_metrics.contents[0].text)
+
+    report = generator.stats.report(elapsed)
+    report["config"] = {
+        "transport": transport,
+        "clients": clients,
+        "target_rate": rate,
+        "duration": duration,
+        "mix": mix,
+        "response": response,
+        "max_inflight": max_inflight,
+    }
+    report["server_loop_lag"] = server_stats.get("stages", {}).get("event_loop_lag")
+    report["server_executor"] = server_stats.get("executor")
+    return report
+
+
+def print_report(report: Dict[str, Any]) -> None:
+    """計測結果を表形式で表示する"""
+    config = report["config"]
+    print(
+        f"transport={config['transport']} clients={config['clients']} "
+        f"target_rate={config['target_rate']}/s duration={config['duration']}s"
+    )
+    print(f"{'operation':<10} {'count':>6} {'rps':>8} {'err%':>6} {'p50':>8} {'p95':>8} {'p99':>8} {'max':>8}")
+    rows = list(report["operations"].items()) + [("total", {
+        "count": report["requests"],
+        "throughput": report["throughput"],
+        "error_rate": report["error_rate"],
+        "latency": report["latency"],
+    })]
+    for name, row in rows:
+        latency = row["latency"]
+        if latency is None:
+            continue
+        print(
+            f"{name:<10} {row['count']:>6} {row['throughput']:>8.2f} {row['error_rate']:>6.1%} "
+            f"{latency['p50']:>8.4f} {latency['p95']:>8.4f} {latency['p99']:>8.4f} {latency['max']:>8.4f}"
+        )
+    if report["dropped"]:
+        print(f"dropped (max in-flight reached): {report['dropped']}")
+    for label in ("client_loop_lag", "server_loop_lag"):
+        lag = report.get(label)
+        if lag:
+            print(f"{label}: p50={lag['p50'] * 1000:.1f}ms p99={lag['p99'] * 1000:.1f}ms max={lag['max'] * 1000:.1f}ms")
+    for message, count in report["errors"].items():
+        print(f"  {count:>5} x {message}")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """コマンドラインのエントリーポイント"""
+    parser = argparse.ArgumentParser(description="Kokoro MCP Server load generator")
+    parser.add_argument("--transport", choices=("memory", "stdio", "http"), default="memory")
+    parser.add_argument("--url", default=DEFAULT_URL, help="server URL for --transport http")
+    parser.add_argument("--clients", type=int, default=4)
+    parser.add_argument("--rate", type=float, default=0.0,
+                        help="target requests/second across all clients (0 = closed loop)")
+    parser.add_argument("--duration", type=float, default=30.0)
+    parser.add_argument("--mix", default=DEFAULT_MIX)
+    parser.add_argument("--response", choices=("inline", "reference"), default="inline")
+    parser.add_argument("--max-inflight", type=int, default=256)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="path of the JSON report")
+    args = parser.parse_args(argv)
+
+    try:
+        mix = parse_mix(args.mix)
+    except ValueError as e:
+        parser.error(str(e))
+
+    report = asyncio.run(run(
+        args.transport, args.clients, args.rate, args.duration, mix,
+        args.response, args.max_inflight, args.seed, args.url,
+    ))
+    print_report(report)
+
+    if args.output:
+        Path(args.output).parent.mkdir(parents=True, exist_ok=True)
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"Saved {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
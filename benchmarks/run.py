@@ -0,0 +1,375 @@
+"""
+Kokoro TTS ベンチマーク
+
+固定コーパスを使って、以下の3つの経路のレイテンシ・実時間比・最初のチャンクまでの時間・
+ピークRSSを計測し、結果をJSONに保存します。
+
+- generate: ``TTSService.generate``（ファイル書き込みまで）
+- generate_audio: ``generate_audio`` のストリーミング生成
+- mcp: ``handle_call_tool("text-to-speech")``（base64エンコードまで）
+
+使い方::
+
+    PYTHONPATH=src python -m benchmarks.run --backend mock --output output/bench/mock.json
+    PYTHONPATH=src python -m benchmarks.run --backend real --baseline output/bench/old.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# サーバーモジュールの読み込み前に設定する（キャッシュにヒットすると計測にならないため）
+os.environ.setdefault("TTS_CACHE", "false")
+os.environ.setdefault("TTS_HISTORY_DB", "output/bench/history.sqlite3")
+
+from kokoro_mcp_server.kokoro.base import BaseTTSService, TTSRequest  # noqa: E402
+from kokoro_mcp_server.metrics import Histogram  # noqa: E402
+
+from .corpus import CORPUS, CORPUS_VERSION  # noqa: E402
+
+TARGETS = ("generate", "generate_audio", "mcp")
+MODEL_SAMPLE_RATE = 24000
+
+
+def weights_available() -> bool:
+    """
+    Kokoroのモデルの重みがローカルにあるかどうかを確認する
+
+    Returns:
+        bool: Hugging Faceのキャッシュに重みがある場合はTrue
+    """
+    try:
+        from huggingface_hub import try_to_load_from_cache
+    except ImportError:
+        return False
+    path = try_to_load_from_cache("hexgrad/Kokoro-82M", "kokoro-v1_0.pth")
+    return isinstance(path, str) and os.path.exists(path)
+
+
+def create_service(backend: str) -> Tuple[str, BaseTTSService]:
+    """
+    計測対象のTTSサービスを作成する
+
+    Args:
+        backend: "mock" / "real" / "auto"（重みがあればreal、なければmock）
+
+    Returns:
+        Tuple[str, BaseTTSService]: 実際に使用したバックエンド名とサービス
+    """
+    if backend == "auto":
+        backend = "real" if weights_available() else "mock"
+
+    if backend == "mock":
+        from kokoro_mcp_server.kokoro.mock import MockKokoroTTSService
+        return backend, MockKokoroTTSService(seed=0)
+
+    if not weights_available():
+        raise SystemExit("Kokoroの重みが見つかりません（--backend mock を使用してください）")
+    from kokoro_mcp_server.kokoro.kokoro import KokoroTTSService
+    return backend, KokoroTTSService()
+
+
+def peak_rss_mb() -> float:
+    """
+    プロセスのピークRSSを取得する
+
+    Returns:
+        float: ピークRSS（MB）
+    """
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linuxはキロバイト、macOSはバイト単位
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def audio_duration(file_path: str) -> float:
+    """
+    音声ファイルの長さを取得する
+
+    Args:
+        file_path: 音声ファイルのパス
+
+    Returns:
+        float: 長さ（秒）
+    """
+    import soundfile as sf
+
+    return sf.info(file_path).duration
+
+
+def summarize(values: List[float]) -> Optional[Dict[str, Any]]:
+    """
+    計測値の集計（平均・最大・p50/p95/p99）を作成する
+
+    Args:
+        values: 計測値のリスト
+
+    Returns:
+        Optional[Dict[str, Any]]: 集計結果（計測値がない場合はNone）
+    """
+    if not values:
+        return None
+    histogram = Histogram(window=len(values))
+    for value in values:
+        histogram.observe(value)
+    return histogram.snapshot()
+
+
+def bench_generate(
+    service: BaseTTSService, item: Dict[str, str], iterations: int
+) -> Dict[str, List[float]]:
+    """
+    ``generate`` を計測する
+
+    Args:
+        service: TTSサービス
+        item: コーパスの1項目
+        iterations: 繰り返し回数
+
+    Returns:
+        Dict[str, List[float]]: レイテンシ・実時間比・最初のチャンクまでの時間の計測値
+    """
+    samples: Dict[str, List[float]] = {"latency": [], "rtf": [], "ttfc": [], "errors": []}
+    for _ in range(iterations):
+        first_chunk: List[float] = []
+
+        def on_chunk(index: int, total: int, audio: Any, sample_rate: int) -> None:
+            if not first_chunk:
+                first_chunk.append(time.perf_counter())
+
+        request = TTSRequest(text=item["text"], voice=item["voice"], on_chunk=on_chunk)
+        started = time.perf_counter()
+        success, file_path = service.generate(request)
+        latency = time.perf_counter() - started
+
+        if not success or not file_path:
+            samples["errors"].append(1)
+            continue
+        samples["latency"].append(latency)
+        duration = audio_duration(file_path)
+        if duration > 0:
+            samples["rtf"].append(latency / duration)
+        if first_chunk:
+            samples["ttfc"].append(first_chunk[0] - started)
+    return samples
+
+
+def bench_generate_audio(
+    service: BaseTTSService, item: Dict[str, str], iterations: int
+) -> Optional[Dict[str, List[float]]]:
+    """
+    ``generate_audio`` のストリーミング生成を計測する
+
+    Args:
+        service: TTSサービス
+        item: コーパスの1項目
+        iterations: 繰り返し回数
+
+    Returns:
+        Optional[Dict[str, List[float]]]: 計測値（サービスが対応していない場合はNone）
+    """
+    generate_audio: Optional[Callable[..., Any]] = getattr(service, "generate_audio", None)
+    if generate_audio is None:
+        return None
+
+    samples: Dict[str, List[float]] = {"latency": [], "rtf": [], "ttfc": [], "errors": []}
+    for _ in range(iterations):
+        started = time.perf_counter()
+        first_chunk: Optional[float] = None
+        samples_count = 0
+        try:
+            for _, _, audio in generate_audio(item["text"], voice=item["voice"]):
+                if first_chunk is None:
+                    first_chunk = time.perf_counter()
+                samples_count += len(audio)
+        except Exception:
+            samples["errors"].append(1)
+            continue
+        latency = time.perf_counter() - started
+
+        samples["latency"].append(latency)
+        if samples_count:
+            samples["rtf"].append(latency / (samples_count / MODEL_SAMPLE_RATE))
+        if first_chunk is not None:
+            samples["ttfc"].append(first_chunk - started)
+    return samples
+
+
+async def bench_mcp(
+    service: BaseTTSService, item: Dict[str, str], iterations: int
+) -> Dict[str, List[float]]:
+    """
+    MCPの ``text-to-speech`` ツールの処理を計測する
+
+    Args:
+        service: TTSサービス
+        item: コーパスの1項目
+        iterations: 繰り返し回数
+
+    Returns:
+        Dict[str, List[float]]: レイテンシの計測値
+    """
+    from kokoro_mcp_server import server
+
+    server.tts_service = service
+    samples: Dict[str, List[float]] = {"latency": [], "rtf": [], "ttfc": [], "errors": []}
+    for _ in range(iterations):
+        started = time.perf_counter()
+        try:
+            await server.handle_call_tool(
+                "text-to-speech",
+                {"text": item["text"], "voice": item["voice"], "response": "inline"},
+            )
+        except Exception:
+            samples["errors"].append(1)
+            continue
+        samples["latency"].append(time.perf_counter() - started)
+    return samples
+
+
+def run(backend: str, iterations: int, targets: List[str]) -> Dict[str, Any]:
+    """
+    ベンチマークを実行する
+
+    Args:
+        backend: 使用するバックエンド
+        iterations: コーパスの項目ごとの繰り返し回数
+        targets: 計測する経路
+
+    Returns:
+        Dict[str, Any]: 実行環境の情報と計測結果
+    """
+    load_started = time.perf_counter()
+    backend, service = create_service(backend)
+    load_seconds = time.perf_counter() - load_started
+
+    # 初回実行の初期化コストを計測に含めないよう、一度実行しておく
+    service.warmup()
+    for item in CORPUS:
+        service.generate(TTSRequest(text=item["text"], voice=item["voice"]))
+
+    results: Dict[str, Any] = {}
+    for target in targets:
+        target_results: Dict[str, Any] = {}
+        for item in CORPUS:
+            if target == "generate":
+                samples = bench_generate(service, item, iterations)
+            elif target == "generate_audio":
+                samples = bench_generate_audio(service, item, iterations)
+            else:
+                samples = asyncio.run(bench_mcp(service, item, iterations))
+            if samples is None:
+                target_results = {"skipped": "not supported by this service"}
+                break
+            target_results[item["id"]] = {
+                "chars": len(item["text"]),
+                "errors": len(samples["errors"]),
+                **{key: summarize(values) for key, values in samples.items() if key != "errors"},
+            }
+        target_results["peak_rss_mb"] = peak_rss_mb()
+        results[target] = target_results
+
+    return {
+        "meta": {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "commit": _git_commit(),
+            "backend": backend,
+            "iterations": iterations,
+            "corpus_version": CORPUS_VERSION,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "load_seconds": load_seconds,
+        },
+        "results": results,
+    }
+
+
+def _git_commit() -> Optional[str]:
+    """現在のgitコミットを取得する（取得できない場合はNone）"""
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_report(report: Dict[str, Any], baseline: Optional[Dict[str, Any]] = None) -> None:
+    """
+    計測結果を表形式で表示する（baselineが指定されていればp50の変化率も表示）
+
+    Args:
+        report: 計測結果
+        baseline: 比較対象の以前の計測結果
+    """
+    meta = report["meta"]
+    print(f"backend={meta['backend']} iterations={meta['iterations']} commit={meta['commit']}")
+    header = f"{'target':<15} {'item':<10} {'p50':>8} {'p95':>8} {'p99':>8} {'rtf':>6} {'ttfc':>8}"
+    if baseline is not None:
+        header += f" {'Δp50':>8}"
+    print(header)
+
+    for target, items in report["results"].items():
+        for item_id, result in items.items():
+            if not isinstance(result, dict) or result.get("latency") is None:
+                continue
+            latency = result["latency"]
+            rtf = result["rtf"]["p50"] if result.get("rtf") else float("nan")
+            ttfc = result["ttfc"]["p50"] if result.get("ttfc") else float("nan")
+            line = (
+                f"{target:<15} {item_id:<10} {latency['p50']:>8.4f} {latency['p95']:>8.4f} "
+                f"{latency['p99']:>8.4f} {rtf:>6.3f} {ttfc:>8.4f}"
+            )
+            if baseline is not None:
+                previous = baseline.get("results", {}).get(target, {}).get(item_id) or {}
+                if previous.get("latency"):
+                    change = latency["p50"] / previous["latency"]["p50"] - 1
+                    line += f" {change:>+8.1%}"
+            print(line)
+        if "peak_rss_mb" in items:
+            print(f"{target:<15} peak RSS: {items['peak_rss_mb']:.1f} MB")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """コマンドラインのエントリーポイント"""
+    parser = argparse.ArgumentParser(description="Kokoro TTS benchmark")
+    parser.add_argument("--backend", choices=("mock", "real", "auto"), default="auto")
+    parser.add_argument("--iterations", type=int, default=5)
+    parser.add_argument("--targets", default=",".join(TARGETS),
+                        help=f"comma-separated subset of {','.join(TARGETS)}")
+    parser.add_argument("--output", help="path of the JSON report")
+    parser.add_argument("--baseline", help="previous JSON report to compare against")
+    args = parser.parse_args(argv)
+
+    targets = [target for target in args.targets.split(",") if target]
+    unknown = set(targets) - set(TARGETS)
+    if unknown:
+        parser.error(f"unknown targets: {', '.join(sorted(unknown))}")
+
+    report = run(args.backend, args.iterations, targets)
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+    print_report(report, baseline)
+
+    if args.output:
+        Path(args.output).parent.mkdir(parents=True, exist_ok=True)
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"Saved {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
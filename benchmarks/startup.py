@@ -0,0 +1,236 @@
+"""
+Kokoro MCP Server 起動時間ベンチマーク
+
+サーバーの起動にかかる時間を新しいプロセスで繰り返し計測し、結果をJSONに保存します。
+
+- import: ``kokoro_mcp_server.server`` のインポート時間と、インポートの時点で読み込まれた重いモジュール
+- handshake: stdioでサーバーを起動してから ``initialize`` の応答を受け取るまでの時間と、
+  最初の ``list-voices`` の応答を受け取るまでの時間
+
+モックモードでインポート時に torch などが読み込まれた場合や、``--max-import-seconds`` /
+``--max-handshake-seconds`` を超えた場合は終了コード1を返します（CIでの退行検知用）。
+
+使い方::
+
+    PYTHONPATH=src python -m benchmarks.startup --iterations 5 --output output/bench/startup.json
+    PYTHONPATH=src python -m benchmarks.startup --backend real --baseline output/bench/startup.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from kokoro_mcp_server.metrics import Histogram
+
+# 起動時に読み込まれると起動が遅くなるモジュール
+HEAVY_MODULES = (
+    "torch", "librosa", "kokoro", "misaki", "soundfile", "fugashi", "unidic_lite",
+    "spacy", "transformers", "scipy",
+)
+
+# モックモードでは合成前に読み込まれてはいけないモジュール
+FORBIDDEN_IN_MOCK = ("torch", "librosa", "kokoro", "misaki", "fugashi", "unidic_lite")
+
+SRC_DIR = str(Path(__file__).resolve().parent.parent / "src")
+
+_IMPORT_SCRIPT = """
+import json, sys, time
+started = time.perf_counter()
+import kokoro_mcp_server.server
+elapsed = time.perf_counter() - started
+print(json.dumps({"seconds": elapsed, "heavy": [m for m in %r if m in sys.modules]}))
+"""
+
+
+def child_env(backend: str) -> Dict[str, str]:
+    """
+    計測するサーバープロセスの環境変数を作成する
+
+    Args:
+        backend: "mock" または "real"
+
+    Returns:
+        Dict[str, str]: 環境変数
+    """
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [SRC_DIR, env.get("PYTHONPATH")]))
+    env["MOCK_TTS"] = "true" if backend == "mock" else "false"
+    env.setdefault("TTS_HISTORY_DB", "output/bench/startup/history.sqlite3")
+    env.setdefault("TTS_PHONEME_CACHE_DB", "output/bench/startup/phonemes.sqlite3")
+    env.setdefault("TTS_AUDIO_DIR", "output/bench/startup/audio")
+    env.setdefault("TTS_CACHE_DIR", "output/bench/startup/cache")
+    return env
+
+
+def summarize(values: List[float]) -> Optional[Dict[str, Any]]:
+    """計測値の集計（平均・最大・p50/p95/p99）を作成する"""
+    if not values:
+        return None
+    histogram = Histogram(window=len(values))
+    for value in values:
+        histogram.observe(value)
+    return histogram.snapshot()
+
+
+def measure_import(env: Dict[str, str]) -> Dict[str, Any]:
+    """
+    新しいプロセスでサーバーモジュールのインポート時間を計測する
+
+    Args:
+        env: 環境変数
+
+    Returns:
+        Dict[str, Any]: インポート時間（秒）、読み込まれた重いモジュール、プロセス全体の時間（秒）
+    """
+    started = time.perf_counter()
+    completed = subprocess.run(
+        [sys.executable, "-c", _IMPORT_SCRIPT % (HEAVY_MODULES,)],
+        env=env, capture_output=True, text=True, check=True,
+    )
+    wall = time.perf_counter() - started
+    result = json.loads(completed.stdout.strip().splitlines()[-1])
+    result["process_seconds"] = wall
+    return result
+
+
+async def measure_handshake(env: Dict[str, str]) -> Dict[str, float]:
+    """
+    stdioでサーバーを起動し、ハンドシェイクと最初のツール呼び出しまでの時間を計測する
+
+    Args:
+        env: 環境変数
+
+    Returns:
+        Dict[str, float]: initialize と list-voices の応答までの時間（秒、起動からの経過時間）
+    """
+    from mcp import ClientSession
+    from mcp.client.stdio import StdioServerParameters, stdio_client
+
+    params = StdioServerParameters(
+        command=sys.executable,
+        args=["-c", "import asyncio; from kokoro_mcp_server import server; asyncio.run(server.main())"],
+        env=env,
+    )
+    started = time.perf_counter()
+    async with stdio_client(params) as (read_stream, write_stream):
+        async with ClientSession(read_stream, write_stream) as session:
+            await session.initialize()
+            handshake = time.perf_counter() - started
+            await session.call_tool("list-voices", {})
+            first_tool = time.perf_counter() - started
+    return {"handshake": handshake, "first_tool": first_tool}
+
+
+def run(backend: str, iterations: int) -> Dict[str, Any]:
+    """
+    起動時間を計測する
+
+    Args:
+        backend: "mock" または "real"
+        iterations: 計測回数
+
+    Returns:
+        Dict[str, Any]: 計測結果
+    """
+    env = child_env(backend)
+    imports = [measure_import(env) for _ in range(iterations)]
+    handshakes = [asyncio.run(measure_handshake(env)) for _ in range(iterations)]
+    heavy = sorted({module for result in imports for module in result["heavy"]})
+    return {
+        "meta": {"backend": backend, "iterations": iterations, "python": sys.version.split()[0]},
+        "results": {
+            "import": summarize([result["seconds"] for result in imports]),
+            "import_process": summarize([result["process_seconds"] for result in imports]),
+            "handshake": summarize([result["handshake"] for result in handshakes]),
+            "first_tool": summarize([result["first_tool"] for result in handshakes]),
+        },
+        "heavy_modules": heavy,
+    }
+
+
+def check(report: Dict[str, Any], max_import: float, max_handshake: float) -> List[str]:
+    """
+    計測結果が上限を超えていないかを確認する
+
+    Args:
+        report: 計測結果
+        max_import: インポート時間のp50の上限（秒、0で確認しない）
+        max_handshake: ハンドシェイクまでの時間のp50の上限（秒、0で確認しない）
+
+    Returns:
+        List[str]: 上限を超えた項目の説明
+    """
+    failures = []
+    if report["meta"]["backend"] == "mock":
+        forbidden = [m for m in report["heavy_modules"] if m in FORBIDDEN_IN_MOCK]
+        if forbidden:
+            failures.append(f"mock mode imported {', '.join(forbidden)} at startup")
+    for name, limit in (("import", max_import), ("handshake", max_handshake)):
+        p50 = report["results"][name]["p50"]
+        if limit > 0 and p50 > limit:
+            failures.append(f"{name} p50 {p50:.3f}s exceeds {limit:.3f}s")
+    return failures
+
+
+def print_report(report: Dict[str, Any], baseline: Optional[Dict[str, Any]] = None) -> None:
+    """
+    計測結果を表形式で表示する（baselineが指定されていればp50の変化率も表示）
+
+    Args:
+        report: 計測結果
+        baseline: 比較対象の以前の計測結果
+    """
+    meta = report["meta"]
+    print(f"backend={meta['backend']} iterations={meta['iterations']} python={meta['python']}")
+    header = f"{'stage':<15} {'p50':>8} {'p95':>8} {'max':>8}"
+    if baseline is not None:
+        header += f" {'Δp50':>8}"
+    print(header)
+    for stage, result in report["results"].items():
+        line = f"{stage:<15} {result['p50']:>8.3f} {result['p95']:>8.3f} {result['max']:>8.3f}"
+        previous = (baseline or {}).get("results", {}).get(stage)
+        if previous:
+            line += f" {result['p50'] / previous['p50'] - 1:>+8.1%}"
+        print(line)
+    print(f"heavy modules loaded by import: {', '.join(report['heavy_modules']) or 'none'}")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """コマンドラインのエントリーポイント"""
+    parser = argparse.ArgumentParser(description="Kokoro MCP Server startup benchmark")
+    parser.add_argument("--backend", choices=("mock", "real"), default="mock")
+    parser.add_argument("--iterations", type=int, default=5)
+    parser.add_argument("--max-import-seconds", type=float, default=0.0)
+    parser.add_argument("--max-handshake-seconds", type=float, default=0.0)
+    parser.add_argument("--output", help="path of the JSON report")
+    parser.add_argument("--baseline", help="previous JSON report to compare against")
+    args = parser.parse_args(argv)
+
+    report = run(args.backend, args.iterations)
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+    print_report(report, baseline)
+
+    if args.output:
+        Path(args.output).parent.mkdir(parents=True, exist_ok=True)
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"Saved {args.output}")
+
+    failures = check(report, args.max_import_seconds, args.max_handshake_seconds)
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -26,7 +26,8 @@ def main() -> int:
         # server.pyからmcpを受け取り、実行する
         try:
             print("server.main()を実行します")
-            mcp = asyncio.run(server.main())
+            args = server.parse_args()
+            mcp = asyncio.run(server.main(args.transport, args.host, args.port))
             print(f"server.main()の実行完了: {'成功' if mcp else '失敗'}")
             if mcp:
                 print("mcp.run()を実行します")
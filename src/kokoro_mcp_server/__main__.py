@@ -10,7 +10,8 @@ def main():
     print("Kokoro MCP Server をメインエントリーポイントから起動します")
     print("=" * 50)
     
-    mcp = asyncio.run(server.main())
+    args = server.parse_args()
+    mcp = asyncio.run(server.main(args.transport, args.host, args.port))
     if mcp:
         print("MCPサーバーが正常に初期化されました。サーバーを実行します...")
         mcp()
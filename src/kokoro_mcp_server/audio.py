@@ -0,0 +1,492 @@
+"""
+音声処理モジュール
+
+モデル出力（24000Hz）を出力サンプルレートに変換するリサンプラーと、
+出力形式（WAV / FLAC / OGG Vorbis / Opus / MP3）ごとの書き込み処理、
+音声の接続処理、生成済みファイルの範囲読み込みを提供します。
+リサンプラーはセグメント単位で音声を受け取り、受け取った分から順に変換結果を返します。
+"""
+
+import base64
+import hashlib
+import logging
+import mmap
+import os
+from dataclasses import dataclass
+from math import gcd
+from pathlib import Path
+from typing import Dict, Optional, Tuple, Type, Union
+
+import numpy as np
+from numpy.typing import NDArray
+
+logger = logging.getLogger(__name__)
+
+# Kokoroモデルの出力サンプルレート
+MODEL_SAMPLE_RATE = 24000
+
+# 出力ファイルのデフォルトのサンプルレート
+DEFAULT_SAMPLE_RATE = 44100
+
+# クライアントが指定できる出力サンプルレート
+SUPPORTED_SAMPLE_RATES = (24000, 44100, 48000)
+
+# 非可逆圧縮の品質を指定できるビットレートモード
+BITRATE_MODES = ("CONSTANT", "AVERAGE", "VARIABLE")
+
+# libsndfileの SFC_SET_UPDATE_HEADER_AUTO（soundfileでは定数として公開されていない）
+# OGGなどヘッダーを持たない形式で有効にするとファイルが壊れるため、WAVでのみ使用する
+_SFC_SET_UPDATE_HEADER_AUTO = 0x1061
+
+
+@dataclass(frozen=True)
+class AudioFormat:
+    """出力形式の定義"""
+    name: str
+    container: str
+    subtype: str
+    extension: str
+    mime_type: str
+    lossy: bool = False
+    sample_rates: Optional[Tuple[int, ...]] = None
+
+
+AUDIO_FORMATS: Dict[str, AudioFormat] = {
+    "wav": AudioFormat("wav", "WAV", "PCM_16", ".wav", "audio/wav"),
+    "flac": AudioFormat("flac", "FLAC", "PCM_16", ".flac", "audio/flac"),
+    "ogg": AudioFormat("ogg", "OGG", "VORBIS", ".ogg", "audio/ogg", lossy=True),
+    # Opusは 48000Hz 系のサンプルレートのみ対応している
+    "opus": AudioFormat(
+        "opus", "OGG", "OPUS", ".opus", "audio/ogg; codecs=opus",
+        lossy=True, sample_rates=(8000, 12000, 16000, 24000, 48000),
+    ),
+    "mp3": AudioFormat("mp3", "MP3", "MPEG_LAYER_III", ".mp3", "audio/mpeg", lossy=True),
+}
+
+DEFAULT_FORMAT = "wav"
+
+
+def get_audio_format(name: Optional[str]) -> AudioFormat:
+    """
+    出力形式の定義を取得する
+
+    Args:
+        name: 出力形式の名前（Noneの場合はデフォルトの形式）
+
+    Returns:
+        AudioFormat: 出力形式の定義
+
+    Raises:
+        ValueError: 未対応の形式が指定された場合
+    """
+    key = (name or DEFAULT_FORMAT).lower()
+    if key not in AUDIO_FORMATS:
+        raise ValueError(f"Unsupported audio format: {name}")
+    return AUDIO_FORMATS[key]
+
+
+def resolve_sample_rate(audio_format: AudioFormat, sample_rate: int) -> int:
+    """
+    出力形式が対応しているサンプルレートを決定する
+
+    指定されたサンプルレートに形式が対応していない場合は、
+    それ以上で最も近いサンプルレート（なければ最大のもの）を使用します。
+
+    Args:
+        audio_format: 出力形式
+        sample_rate: 要求されたサンプルレート
+
+    Returns:
+        int: 実際に使用するサンプルレート
+    """
+    if audio_format.sample_rates is None or sample_rate in audio_format.sample_rates:
+        return sample_rate
+    higher = [rate for rate in audio_format.sample_rates if rate >= sample_rate]
+    return min(higher) if higher else max(audio_format.sample_rates)
+
+
+def encoder_options(
+    audio_format: AudioFormat, quality: Optional[float] = None, bitrate_mode: Optional[str] = None
+) -> Dict[str, Union[str, float]]:
+    """
+    soundfile に渡すエンコーダーのオプションを作成する
+
+    Args:
+        audio_format: 出力形式
+        quality: 品質（0.0〜1.0、大きいほど高品質・大きなファイル）
+        bitrate_mode: ビットレートモード（非可逆圧縮のみ）
+
+    Returns:
+        Dict[str, Union[str, float]]: soundfile.SoundFile のキーワード引数
+    """
+    options: Dict[str, Union[str, float]] = {
+        "format": audio_format.container,
+        "subtype": audio_format.subtype,
+    }
+    if quality is not None and audio_format.container != "WAV":
+        # libsndfileの compression_level は 0.0 が最高品質（最小圧縮）
+        options["compression_level"] = 1.0 - min(max(float(quality), 0.0), 1.0)
+    if bitrate_mode is not None and audio_format.lossy:
+        options["bitrate_mode"] = bitrate_mode.upper()
+    return options
+
+
+def write_audio(
+    path: Union[str, Path],
+    audio: NDArray[np.float32],
+    sample_rate: int,
+    audio_format: AudioFormat,
+    quality: Optional[float] = None,
+    bitrate_mode: Optional[str] = None,
+) -> None:
+    """
+    音声データを指定した形式でファイルに書き込む
+
+    Args:
+        path: 出力ファイルのパス
+        audio: 音声データ
+        sample_rate: サンプルレート
+        audio_format: 出力形式
+        quality: 品質（0.0〜1.0）
+        bitrate_mode: ビットレートモード
+    """
+    import soundfile as sf
+
+    sf.write(
+        str(path), audio, sample_rate, **encoder_options(audio_format, quality, bitrate_mode)
+    )
+
+
+class AudioWriter:
+    """
+    音声データを少しずつファイルに追記するライター
+
+    ファイルを一度だけ開き、``write`` で渡された音声をそのまま書き込むため、
+    音声全体をメモリ上に保持する必要がありません。
+    WAVでは書き込むたびにヘッダーのサンプル数を更新するため、書き込み中のファイルも
+    その時点までの音声として読み込めます。
+    書き込んだ音声と出力形式のハッシュ値を ``digest`` で取得できます（出力ファイル名に使用）。
+    """
+
+    def __init__(
+        self,
+        path: Union[str, Path],
+        sample_rate: int,
+        audio_format: AudioFormat,
+        quality: Optional[float] = None,
+        bitrate_mode: Optional[str] = None,
+    ):
+        """
+        初期化（出力ファイルを開く）
+
+        Args:
+            path: 出力ファイルのパス
+            sample_rate: サンプルレート
+            audio_format: 出力形式
+            quality: 品質（0.0〜1.0）
+            bitrate_mode: ビットレートモード
+        """
+        import soundfile as sf
+
+        self.path = str(path)
+        self.sample_rate = sample_rate
+        self.frames = 0
+        self._hash = hashlib.blake2b(
+            f"{audio_format.name}/{sample_rate}/{quality}/{bitrate_mode}".encode(), digest_size=16
+        )
+        self._file = sf.SoundFile(
+            self.path, "w", samplerate=sample_rate, channels=1,
+            **encoder_options(audio_format, quality, bitrate_mode),
+        )
+        if audio_format.container == "WAV":
+            self._enable_header_update()
+
+    def _enable_header_update(self) -> None:
+        """書き込みのたびにヘッダーを更新するよう libsndfile に指示する"""
+        try:
+            from soundfile import _ffi, _snd
+
+            _snd.sf_command(self._file._file, _SFC_SET_UPDATE_HEADER_AUTO, _ffi.NULL, 1)
+        except (ImportError, AttributeError) as e:
+            logger.debug(f"Could not enable automatic header updates: {e}")
+
+    def write(self, audio: NDArray[np.float32]) -> None:
+        """
+        音声データを追記する
+
+        Args:
+            audio: 音声データ
+        """
+        if len(audio):
+            self._file.write(audio)
+            # 書き込んだ分をすぐに読めるよう、libsndfileのバッファをファイルに書き出す
+            self._file.flush()
+            self._hash.update(np.ascontiguousarray(audio, dtype=np.float32).tobytes())
+            self.frames += len(audio)
+
+    @property
+    def duration(self) -> float:
+        """書き込んだ音声の長さ（秒）"""
+        return self.frames / self.sample_rate
+
+    @property
+    def digest(self) -> str:
+        """書き込んだ音声と出力形式のハッシュ値（16進数32文字）"""
+        return self._hash.hexdigest()
+
+    def close(self) -> None:
+        """ファイルを閉じる"""
+        self._file.close()
+
+    def __enter__(self) -> "AudioWriter":
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+
+def trim_silence(
+    audio: NDArray[np.float32], threshold: float = 0.01, margin: int = 0
+) -> NDArray[np.float32]:
+    """
+    音声の先頭と末尾の無音を取り除く
+
+    Args:
+        audio: 音声データ
+        threshold: 無音とみなす振幅の上限
+        margin: 無音を取り除いた後に残すサンプル数
+
+    Returns:
+        NDArray[np.float32]: 無音を取り除いた音声データ（全体が無音の場合は空の配列）
+    """
+    voiced = np.flatnonzero(np.abs(audio) > threshold)
+    if len(voiced) == 0:
+        return audio[:0]
+    start = max(voiced[0] - margin, 0)
+    end = min(voiced[-1] + 1 + margin, len(audio))
+    return audio[start:end]
+
+
+def apply_fades(audio: NDArray[np.float32], fade_samples: int) -> NDArray[np.float32]:
+    """
+    音声の先頭をフェードイン、末尾をフェードアウトさせる（接続部分のクリック音を防ぐ）
+
+    Args:
+        audio: 音声データ
+        fade_samples: フェードの長さ（サンプル数）
+
+    Returns:
+        NDArray[np.float32]: フェードを適用した音声データ（入力はコピーされる）
+    """
+    fade = min(fade_samples, len(audio) // 2)
+    audio = audio.astype(np.float32, copy=True)
+    if fade > 0:
+        ramp = np.linspace(0.0, 1.0, fade, dtype=np.float32)
+        audio[:fade] *= ramp
+        audio[-fade:] *= ramp[::-1]
+    return audio
+
+
+class Resampler:
+    """リサンプラーのベースクラス"""
+
+    def __init__(self, orig_sr: int, target_sr: int):
+        """
+        初期化
+
+        Args:
+            orig_sr: 入力のサンプルレート
+            target_sr: 出力のサンプルレート
+        """
+        self.orig_sr = orig_sr
+        self.target_sr = target_sr
+
+    def process(self, chunk: NDArray[np.float32]) -> NDArray[np.float32]:
+        """
+        音声チャンクを変換する
+
+        Args:
+            chunk: 入力の音声データ
+
+        Returns:
+            NDArray[np.float32]: 変換済みの音声データ（入力より短い遅延分を含まない場合がある）
+        """
+        raise NotImplementedError
+
+    def flush(self) -> NDArray[np.float32]:
+        """
+        内部に残っている音声を出力する
+
+        Returns:
+            NDArray[np.float32]: 残りの変換済み音声データ
+        """
+        return np.zeros(0, dtype=np.float32)
+
+
+class PassthroughResampler(Resampler):
+    """サンプルレートが同じ場合に使用する、何もしないリサンプラー"""
+
+    def process(self, chunk: NDArray[np.float32]) -> NDArray[np.float32]:
+        return chunk
+
+
+class LibrosaResampler(Resampler):
+    """librosa.resample を使って各チャンクを個別に変換するリサンプラー"""
+
+    def process(self, chunk: NDArray[np.float32]) -> NDArray[np.float32]:
+        import librosa
+
+        return librosa.resample(y=chunk, orig_sr=self.orig_sr, target_sr=self.target_sr)
+
+
+class PolyphaseResampler(Resampler):
+    """
+    ストリーミング対応のポリフェーズFIRリサンプラー
+
+    scipy.signal.resample_poly と同じカイザー窓の低域通過フィルタを使い、
+    チャンクの境界をまたいでフィルタの状態を保持します。
+    24000Hz→44100Hzの場合は 147/80 倍の変換になります。
+    """
+
+    def __init__(self, orig_sr: int, target_sr: int, half_width: int = 10, beta: float = 5.0):
+        """
+        初期化
+
+        Args:
+            orig_sr: 入力のサンプルレート
+            target_sr: 出力のサンプルレート
+            half_width: フィルタの片側の長さ（入力・出力のうち低い方のレートでのサンプル数）
+            beta: カイザー窓のパラメータ
+        """
+        super().__init__(orig_sr, target_sr)
+        divisor = gcd(orig_sr, target_sr)
+        self.up = target_sr // divisor
+        self.down = orig_sr // divisor
+
+        max_rate = max(self.up, self.down)
+        self.delay = half_width * max_rate
+        n_taps = 2 * self.delay + 1
+        cutoff = 1.0 / max_rate
+        t = np.arange(n_taps) - self.delay
+        h = cutoff * np.sinc(cutoff * t) * np.kaiser(n_taps, beta)
+        h = h / h.sum() * self.up
+
+        # taps[phase, k] = h[phase + (n_phase_taps - 1 - k) * up] となるよう位相ごとに並べ替える
+        # （入力ウィンドウが古い順に並ぶため、係数は逆順にしておく）
+        self.n_phase_taps = -(-n_taps // self.up)
+        padded = np.zeros(self.n_phase_taps * self.up)
+        padded[:n_taps] = h
+        taps = padded.reshape(self.n_phase_taps, self.up).T[:, ::-1]
+        self.taps = np.ascontiguousarray(taps, dtype=np.float32)
+
+        # 入力バッファ（先頭の要素の絶対位置を _buffer_start で管理する）
+        self._buffer = np.zeros(self.n_phase_taps - 1, dtype=np.float32)
+        self._buffer_start = -(self.n_phase_taps - 1)
+        self._total_in = 0
+        self._next_out = 0
+
+    def _produce(self, n_end: int) -> NDArray[np.float32]:
+        """出力番号 _next_out 〜 n_end-1 のサンプルを計算する"""
+        if n_end <= self._next_out:
+            return np.zeros(0, dtype=np.float32)
+
+        # 出力番号を up で割った余りごとに位相が一定になるため、
+        # 余りごとにスライディングウィンドウの等間隔の行と係数の内積をまとめて計算する
+        windows = np.lib.stride_tricks.sliding_window_view(self._buffer, self.n_phase_taps)
+        output = np.empty(n_end - self._next_out, dtype=np.float32)
+        for offset in range(min(self.up, n_end - self._next_out)):
+            first = self._next_out + offset
+            count = (n_end - first + self.up - 1) // self.up
+            base = first * self.down + self.delay
+            row = base // self.up - (self.n_phase_taps - 1) - self._buffer_start
+            rows = windows[row : row + (count - 1) * self.down + 1 : self.down]
+            output[offset :: self.up] = rows @ self.taps[base % self.up]
+        self._next_out = n_end
+
+        # 次の出力に不要になった入力を捨てる
+        next_newest = (n_end * self.down + self.delay) // self.up
+        keep_from = next_newest - (self.n_phase_taps - 1) - self._buffer_start
+        if keep_from > 0:
+            self._buffer = self._buffer[keep_from:]
+            self._buffer_start += keep_from
+
+        return output
+
+    def process(self, chunk: NDArray[np.float32]) -> NDArray[np.float32]:
+        chunk = np.asarray(chunk, dtype=np.float32)
+        self._buffer = np.concatenate([self._buffer, chunk])
+        self._total_in += len(chunk)
+
+        # 必要な入力がすべて揃っている出力だけを計算する
+        available = self._buffer_start + len(self._buffer)
+        n_end = -(-(available * self.up - self.delay) // self.down)
+        return self._produce(n_end)
+
+    def flush(self) -> NDArray[np.float32]:
+        total_out = -(-self._total_in * self.up // self.down)
+        self._buffer = np.concatenate(
+            [self._buffer, np.zeros(self.n_phase_taps + 1, dtype=np.float32)]
+        )
+        return self._produce(total_out)
+
+
+RESAMPLERS: Dict[str, Type[Resampler]] = {
+    "polyphase": PolyphaseResampler,
+    "librosa": LibrosaResampler,
+}
+
+
+def create_resampler(
+    kind: str, orig_sr: int = MODEL_SAMPLE_RATE, target_sr: int = DEFAULT_SAMPLE_RATE
+) -> Resampler:
+    """
+    リサンプラーを作成する
+
+    Args:
+        kind: リサンプラーの種類（"polyphase" または "librosa"）
+        orig_sr: 入力のサンプルレート
+        target_sr: 出力のサンプルレート
+
+    Returns:
+        Resampler: 作成したリサンプラー（サンプルレートが同じ場合は変換なし）
+    """
+    if orig_sr == target_sr:
+        return PassthroughResampler(orig_sr, target_sr)
+    if kind not in RESAMPLERS:
+        raise ValueError(f"Unknown resampler: {kind}")
+    return RESAMPLERS[kind](orig_sr, target_sr)
+
+
+def read_file_base64(
+    path: Union[str, Path], offset: int = 0, length: Optional[int] = None
+) -> Tuple[str, int, int]:
+    """
+    ファイルの指定範囲をbase64文字列として読み込む
+
+    ファイルをmmapで開き、必要な範囲だけをエンコードするため、
+    ファイル全体をPythonのバイト列として読み込むことはありません。
+
+    Args:
+        path: 読み込むファイルのパス
+        offset: 読み込み開始位置（バイト）
+        length: 読み込むバイト数（Noneの場合はファイルの末尾まで）
+
+    Returns:
+        Tuple[str, int, int]: base64文字列、実際に読み込んだバイト数、ファイル全体のサイズ
+
+    Raises:
+        ValueError: offset または length が負の場合
+    """
+    if offset < 0 or (length is not None and length < 0):
+        raise ValueError("offset and length must not be negative")
+
+    size = os.path.getsize(path)
+    start = min(offset, size)
+    end = size if length is None else min(start + length, size)
+    if end <= start:
+        return "", 0, size
+
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        with memoryview(mapped) as view:
+            encoded = base64.b64encode(view[start:end]).decode("ascii")
+    return encoded, end - start, size
@@ -0,0 +1,608 @@
+"""
+音声合成キャッシュ
+
+同じテキスト・音声・速度・出力形式の組み合わせに対して、
+生成済みの音声ファイルを再利用するためのキャッシュを提供します。
+"""
+
+import hashlib
+import json
+import logging
+import os
+import shutil
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple
+
+from .audio import DEFAULT_SAMPLE_RATE, get_audio_format, resolve_sample_rate
+from .kokoro.base import BaseTTSService, TTSRequest
+from .storage import AudioStore
+
+if TYPE_CHECKING:
+    import numpy as np
+
+logger = logging.getLogger(__name__)
+
+_PHONEME_SCHEMA = """
+CREATE TABLE IF NOT EXISTS phonemes (
+    lang TEXT NOT NULL,
+    text TEXT NOT NULL,
+    phonemes TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    PRIMARY KEY (lang, text)
+);
+CREATE INDEX IF NOT EXISTS phonemes_created_at ON phonemes (created_at);
+"""
+
+
+def normalize_text(text: str) -> str:
+    """
+    キャッシュキー用にテキストを正規化する
+
+    NFKC正規化を行い、前後の空白を除去し、連続する空白を1つにまとめます。
+
+    Args:
+        text: 正規化するテキスト
+
+    Returns:
+        str: 正規化されたテキスト
+    """
+    return " ".join(unicodedata.normalize("NFKC", text).split())
+
+
+def request_key(request: TTSRequest, default_voice: str = "jf_alpha") -> str:
+    """
+    リクエストからキャッシュキーを計算する
+
+    Args:
+        request: TTSリクエスト
+        default_voice: voiceが指定されていない場合に使用される音声
+
+    Returns:
+        str: SHA-256のハッシュ文字列
+    """
+    speed = request.speed if request.speed is not None else 1.0
+    audio_format = get_audio_format(request.audio_format)
+    payload = json.dumps(
+        {
+            "text": normalize_text(request.text),
+            "voice": request.voice or default_voice,
+            "speed": round(float(speed), 3),
+            "format": audio_format.name,
+            "sample_rate": resolve_sample_rate(
+                audio_format, request.sample_rate or DEFAULT_SAMPLE_RATE
+            ),
+            "quality": request.quality,
+            "bitrate_mode": request.bitrate_mode,
+            # 音素を直接指定した場合のみキーに含める（既存のキャッシュキーを変えないため）
+            **({"phonemes": request.phonemes} if request.phonemes else {}),
+        },
+        ensure_ascii=False,
+        sort_keys=True,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class SynthesisCache:
+    """
+    生成済み音声ファイルのLRUキャッシュ
+
+    キャッシュの実体は ``cache_dir`` 以下の ``{キー}.{保存先でのファイル名}`` というファイルとして保存され、
+    メモリ上にはキーとファイルの対応表をLRU順で保持します。
+    エントリ数または合計サイズが上限を超えると古いものから削除されます。
+    """
+
+    def __init__(
+        self,
+        cache_dir: str = "output/cache",
+        max_entries: int = 512,
+        max_bytes: int = 256 * 1024 * 1024,
+    ):
+        """
+        初期化
+
+        Args:
+            cache_dir: キャッシュファイルの保存先
+            max_entries: 保持するエントリ数の上限
+            max_bytes: 保持するファイルの合計サイズの上限（バイト）
+        """
+        self.cache_dir = Path(cache_dir)
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, Tuple[str, int]]" = OrderedDict()
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._load()
+
+    def _load(self) -> None:
+        """既存のキャッシュファイルを読み込み、更新日時の古い順に登録する"""
+        if not self.cache_dir.is_dir():
+            return
+
+        files = []
+        for entry in os.scandir(self.cache_dir):
+            if entry.is_file() and not entry.name.startswith("."):
+                stat = entry.stat()
+                files.append((stat.st_mtime, entry.name, entry.path, stat.st_size))
+
+        for _, name, path, size in sorted(files):
+            key = name.split(".", 1)[0]
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._total_bytes -= previous[1]
+            self._entries[key] = (path, size)
+            self._total_bytes += size
+
+        self._evict()
+        logger.info(f"Loaded {len(self._entries)} cached audio files from {self.cache_dir}")
+
+    def get(self, key: str) -> Optional[str]:
+        """
+        キャッシュされた音声ファイルを取得する
+
+        Args:
+            key: キャッシュキー
+
+        Returns:
+            Optional[str]: キャッシュされたファイルのパス（存在しない場合はNone）
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and not os.path.exists(entry[0]):
+                # ファイルが外部から削除されていた場合は登録を取り消す
+                self._entries.pop(key)
+                self._total_bytes -= entry[1]
+                entry = None
+
+            if entry is None:
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key: str, file_path: str) -> str:
+        """
+        生成された音声ファイルをキャッシュに登録する
+
+        ハードリンクを作成し、できない場合はコピーします。
+
+        Args:
+            key: キャッシュキー
+            file_path: 登録する音声ファイルのパス（保存先のファイル）
+
+        Returns:
+            str: キャッシュ内のファイルのパス
+        """
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        cached_path = self.cache_dir / f"{key}.{Path(file_path).name}"
+        tmp_path = self.cache_dir / f".{key}.tmp"
+        try:
+            os.link(file_path, tmp_path)
+        except FileExistsError:
+            os.remove(tmp_path)
+            os.link(file_path, tmp_path)
+        except OSError:
+            shutil.copyfile(file_path, tmp_path)
+        os.replace(tmp_path, cached_path)
+        size = cached_path.stat().st_size
+
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._total_bytes -= previous[1]
+                if previous[0] != str(cached_path):
+                    self._remove(previous[0])
+            self._entries[key] = (str(cached_path), size)
+            self._total_bytes += size
+            self._evict()
+
+        return str(cached_path)
+
+    @staticmethod
+    def stored_name(cached_path: str) -> Optional[str]:
+        """
+        キャッシュファイルのパスから保存先でのファイル名を取得する
+
+        Args:
+            cached_path: キャッシュ内のファイルのパス
+
+        Returns:
+            Optional[str]: 保存先でのファイル名（以前の形式のキャッシュファイルの場合はNone）
+        """
+        name = Path(cached_path).name.split(".", 1)[1]
+        return name if "." in name else None
+
+    @staticmethod
+    def _remove(path: str) -> None:
+        """キャッシュファイルを削除する"""
+        try:
+            os.remove(path)
+        except OSError as e:
+            logger.warning(f"Failed to remove evicted cache file {path}: {e}")
+
+    def _evict(self) -> None:
+        """上限を超えている間、最も古いエントリを削除する"""
+        while self._entries and (
+            len(self._entries) > self.max_entries or self._total_bytes > self.max_bytes
+        ):
+            _, (path, size) = self._entries.popitem(last=False)
+            self._total_bytes -= size
+            self.evictions += 1
+            self._remove(path)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        キャッシュの統計情報を取得する
+
+        Returns:
+            Dict[str, Any]: ヒット数、ミス数、エントリ数、合計サイズなど
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "bytes": self._total_bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+            }
+
+
+class SegmentCache:
+    """
+    文単位の音声データのLRUキャッシュ
+
+    分割後のセグメントテキスト・音声・速度をキーに、
+    モデルが出力した24kHzのfloat32配列をメモリ上に保持します。
+    保持している配列の合計サイズが ``max_bytes`` を超えると古いものから削除されます。
+    """
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024):
+        """
+        初期化
+
+        Args:
+            max_bytes: 保持する音声データの合計サイズの上限（バイト）
+        """
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[Tuple[str, str, float], np.ndarray]" = OrderedDict()
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def _key(segment: str, voice: str, speed: float) -> Tuple[str, str, float]:
+        """キャッシュキーを作成する"""
+        return (normalize_text(segment), voice, round(float(speed), 3))
+
+    def get(self, segment: str, voice: str, speed: float) -> "Optional[np.ndarray]":
+        """
+        キャッシュされたセグメントの音声を取得する
+
+        Args:
+            segment: セグメントのテキスト
+            voice: 音声
+            speed: 速度
+
+        Returns:
+            Optional[np.ndarray]: 音声データ（存在しない場合はNone）
+        """
+        key = self._key(segment, voice, speed)
+        with self._lock:
+            audio = self._entries.get(key)
+            if audio is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return audio
+
+    def put(self, segment: str, voice: str, speed: float, audio: "np.ndarray") -> None:
+        """
+        セグメントの音声をキャッシュに登録する
+
+        登録した配列は読み取り専用になります。
+
+        Args:
+            segment: セグメントのテキスト
+            voice: 音声
+            speed: 速度
+            audio: 音声データ
+        """
+        if audio.nbytes > self.max_bytes:
+            return
+
+        audio.flags.writeable = False
+        key = self._key(segment, voice, speed)
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._total_bytes -= previous.nbytes
+            self._entries[key] = audio
+            self._total_bytes += audio.nbytes
+            while self._total_bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._total_bytes -= evicted.nbytes
+                self.evictions += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        キャッシュの統計情報を取得する
+
+        Returns:
+            Dict[str, Any]: ヒット数、ミス数、エントリ数、合計サイズなど
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "bytes": self._total_bytes,
+                "max_bytes": self.max_bytes,
+            }
+
+
+class PhonemeCache:
+    """
+    セグメント単位のG2P（テキスト→音素）結果の永続キャッシュ
+
+    言語コード・G2Pのバージョン・正規化したセグメントテキストをキーに、
+    パイプラインに渡す音素列のリストをSQLiteに保存します。
+    よく使われるエントリはメモリ上のLRUにも保持し、SQLiteへの問い合わせを省きます。
+    """
+
+    def __init__(
+        self,
+        db_path: str = "output/phonemes.sqlite3",
+        max_entries: int = 100000,
+        memory_entries: int = 4096,
+        version: str = "",
+    ):
+        """
+        初期化
+
+        Args:
+            db_path: SQLiteデータベースのパス（":memory:" も指定可能）
+            max_entries: SQLiteに保持するエントリ数の上限（0以下で無制限）
+            memory_entries: メモリ上に保持するエントリ数の上限
+            version: G2Pのバージョン（変わった場合は以前の結果を使わない）
+        """
+        self.max_entries = max_entries
+        self.memory_entries = memory_entries
+        self.version = version
+        self._memory: "OrderedDict[Tuple[str, str], List[str]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._puts = 0
+        self.hits = 0
+        self.misses = 0
+
+        if db_path != ":memory:":
+            Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        with self._conn:
+            self._conn.executescript(_PHONEME_SCHEMA)
+
+    def _key(self, lang_code: str, segment: str) -> Tuple[str, str]:
+        """キャッシュキーを作成する"""
+        return (f"{self.version}:{lang_code}", normalize_text(segment))
+
+    def get(self, lang_code: str, segment: str) -> Optional[List[str]]:
+        """
+        キャッシュされた音素列を取得する
+
+        Args:
+            lang_code: 言語コード
+            segment: セグメントのテキスト
+
+        Returns:
+            Optional[List[str]]: 音素列のリスト（存在しない場合はNone）
+        """
+        key = self._key(lang_code, segment)
+        with self._lock:
+            phonemes = self._memory.get(key)
+            if phonemes is None:
+                row = self._conn.execute(
+                    "SELECT phonemes FROM phonemes WHERE lang = ? AND text = ?", key
+                ).fetchone()
+                if row is None:
+                    self.misses += 1
+                    return None
+                phonemes = json.loads(row[0])
+                self._remember(key, phonemes)
+            else:
+                self._memory.move_to_end(key)
+            self.hits += 1
+            return list(phonemes)
+
+    def put(self, lang_code: str, segment: str, phonemes: List[str]) -> None:
+        """
+        セグメントの音素列をキャッシュに登録する
+
+        Args:
+            lang_code: 言語コード
+            segment: セグメントのテキスト
+            phonemes: 音素列のリスト
+        """
+        key = self._key(lang_code, segment)
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO phonemes (lang, text, phonemes, created_at) "
+                "VALUES (?, ?, ?, ?)",
+                (*key, json.dumps(phonemes, ensure_ascii=False), time.time()),
+            )
+            self._remember(key, list(phonemes))
+            self._puts += 1
+            if self.max_entries > 0 and self._puts % 256 == 0:
+                self._evict()
+
+    def _remember(self, key: Tuple[str, str], phonemes: List[str]) -> None:
+        """メモリ上のLRUに登録する（ロック内で呼び出す）"""
+        self._memory[key] = phonemes
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def _evict(self) -> None:
+        """上限を超えた古いエントリをSQLiteから削除する（ロック・トランザクション内で呼び出す）"""
+        self._conn.execute(
+            "DELETE FROM phonemes WHERE rowid IN (SELECT rowid FROM phonemes "
+            "ORDER BY created_at DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,),
+        )
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        キャッシュの統計情報を取得する
+
+        Returns:
+            Dict[str, Any]: ヒット数、ミス数、エントリ数など
+        """
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM phonemes").fetchone()[0]
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "entries": entries,
+                "memory_entries": len(self._memory),
+                "max_entries": self.max_entries,
+            }
+
+    def close(self) -> None:
+        """データベースを閉じる"""
+        with self._lock:
+            self._conn.close()
+
+
+class CachedTTSService(BaseTTSService):
+    """
+    キャッシュ付きTTSサービス
+
+    内部のTTSサービスの前段でキャッシュを参照し、
+    ヒットした場合はモデルを実行せずにキャッシュ済みのファイルを音声の保存先に取り込んで返します。
+    返すパスは常に保存先のファイルなので、キャッシュから削除されても履歴の音声は残ります。
+    """
+
+    def __init__(
+        self,
+        service: BaseTTSService,
+        cache: SynthesisCache,
+        audio_store: Optional[AudioStore] = None,
+    ):
+        """
+        初期化
+
+        Args:
+            service: 実際に音声を生成するTTSサービス
+            cache: 使用するキャッシュ
+            audio_store: 音声ファイルの保存先（Noneの場合は output/audio）
+        """
+        self.service = service
+        self.cache = cache
+        self.audio_store = audio_store or AudioStore()
+
+    def __getattr__(self, name: str) -> Any:
+        """キャッシュ対象外のメソッドは内部のサービスに委譲する"""
+        if name == "service":
+            raise AttributeError(name)
+        return getattr(self.service, name)
+
+    def _lookup(self, key: str) -> Optional[str]:
+        """
+        キャッシュを参照し、ヒットしたファイルを保存先に取り込む
+
+        Args:
+            key: キャッシュキー
+
+        Returns:
+            Optional[str]: 保存先の音声ファイルのパス（キャッシュにない場合はNone）
+        """
+        cached_path = self.cache.get(key)
+        if cached_path is None:
+            return None
+        try:
+            return self.audio_store.adopt(cached_path, SynthesisCache.stored_name(cached_path))
+        except OSError as e:
+            # 取り込む前にキャッシュから削除された場合などは、キャッシュにないものとして生成する
+            logger.warning(f"Failed to restore cached audio {cached_path}: {e}")
+            return None
+
+    def generate(self, request: TTSRequest) -> Tuple[bool, Optional[str]]:
+        """
+        音声を生成する（キャッシュにあればそれを返す）
+
+        Args:
+            request: TTSリクエスト
+
+        Returns:
+            tuple[bool, Optional[str]]: 成功したかどうかとファイルパス
+        """
+        key = request_key(request)
+        file_path = self._lookup(key)
+        if file_path is not None:
+            logger.info(f"Cache hit for text: {request.text[:50]}...")
+            return True, file_path
+
+        success, file_path = self.service.generate(request)
+        if success and file_path:
+            try:
+                self.cache.put(key, file_path)
+            except OSError as e:
+                logger.warning(f"Failed to store audio in cache: {e}")
+        return success, file_path
+
+    def generate_batch(self, requests: List[TTSRequest]) -> List[Tuple[bool, Optional[str]]]:
+        """
+        複数のリクエストの音声をまとめて生成する（キャッシュにないものだけを生成）
+
+        Args:
+            requests: TTSリクエストのリスト
+
+        Returns:
+            List[tuple[bool, Optional[str]]]: リクエストごとの成功したかどうかとファイルパス
+        """
+        keys = [request_key(request) for request in requests]
+        results: List[Tuple[bool, Optional[str]]] = [(False, None)] * len(requests)
+        # 同じ内容のリクエストはバッチ内でも1回だけ生成する
+        missing: Dict[str, List[int]] = {}
+        for index, key in enumerate(keys):
+            if key in missing:
+                missing[key].append(index)
+                continue
+            file_path = self._lookup(key)
+            if file_path is not None:
+                results[index] = (True, file_path)
+            else:
+                missing[key] = [index]
+
+        if missing:
+            generated = self.service.generate_batch(
+                [requests[indices[0]] for indices in missing.values()]
+            )
+            for (key, indices), (success, file_path) in zip(missing.items(), generated):
+                for index in indices:
+                    results[index] = (success, file_path)
+                if success and file_path:
+                    try:
+                        self.cache.put(key, file_path)
+                    except OSError as e:
+                        logger.warning(f"Failed to store audio in cache: {e}")
+        return results
@@ -0,0 +1,84 @@
+"""
+実行中リクエストの集約（シングルフライト）
+
+同じキーの処理が実行中の場合は新しく実行せず、実行中の処理の結果を共有します。
+"""
+
+import asyncio
+import logging
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Hashable, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+@dataclass
+class _Call:
+    """実行中の処理と、その結果を待っている呼び出し元の数"""
+    task: asyncio.Future
+    waiters: int = 0
+
+
+class SingleFlight:
+    """
+    キーごとに実行中の処理を1つにまとめる
+
+    処理は呼び出し元とは別のタスクとして実行されるため、1つの呼び出し元がキャンセルされても
+    他の呼び出し元には影響しません。待っている呼び出し元がすべてキャンセルされた場合は処理もキャンセルします。
+    処理が完了すると（失敗した場合も）キーは登録から外れ、次の呼び出しで再実行されます。
+    """
+
+    def __init__(self) -> None:
+        """初期化"""
+        self._calls: Dict[Hashable, _Call] = {}
+        self.started = 0
+        self.coalesced = 0
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> T:
+        """
+        キーに対応する処理を実行する（実行中であればその結果を待つ）
+
+        Args:
+            key: 処理を識別するキー
+            fn: 処理を実行するコルーチン関数
+
+        Returns:
+            処理の結果
+        """
+        call = self._calls.get(key)
+        if call is None:
+            call = _Call(asyncio.ensure_future(fn()))
+            self._calls[key] = call
+            call.task.add_done_callback(lambda _: self._forget(key, call))
+            self.started += 1
+        else:
+            self.coalesced += 1
+            logger.debug(f"実行中の同じリクエストに集約しました（待機数 {call.waiters + 1}）")
+
+        call.waiters += 1
+        try:
+            return await asyncio.shield(call.task)
+        finally:
+            call.waiters -= 1
+            if call.waiters == 0 and not call.task.done():
+                call.task.cancel()
+
+    def _forget(self, key: Hashable, call: _Call) -> None:
+        """完了した処理を登録から外す"""
+        if self._calls.get(key) is call:
+            del self._calls[key]
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        集約の統計情報を取得する
+
+        Returns:
+            Dict[str, Any]: 実行中のキー数、実行した処理数、集約した呼び出し数
+        """
+        return {
+            "inflight": len(self._calls),
+            "started": self.started,
+            "coalesced": self.coalesced,
+        }
@@ -0,0 +1,356 @@
+"""
+長文の音声合成
+
+複数ページにわたるテキストを段落・文の区切りで長さのそろったチャンクに分け、
+ワーカーで並列に合成した音声を元の順番で接続しながらファイルに書き込みます。
+メモリ上に保持する音声は先読みしているチャンクの分だけなので、
+文書が長くなってもメモリ使用量は増えません。
+"""
+
+import asyncio
+import functools
+import logging
+import re
+import time
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+import numpy as np
+
+from .audio import (
+    MODEL_SAMPLE_RATE,
+    AudioFormat,
+    AudioWriter,
+    Resampler,
+    apply_fades,
+    create_resampler,
+    trim_silence,
+)
+from .kokoro.base import BaseTTSService, CancellationToken, SynthesisCancelled
+from .storage import AudioStore
+from .worker import SynthesisExecutor
+
+logger = logging.getLogger(__name__)
+
+# 待ち行列の空きを待つ間隔（秒）
+QUEUE_POLL_SECONDS = 0.1
+
+# 1つのチャンクが待ち行列の空きを待つ時間の上限（超えた場合はそのチャンクを失敗とする）（秒）
+QUEUE_WAIT_SECONDS = 120.0
+
+# 段落の区切り（空行）
+PARAGRAPH_PATTERN = r"\n\s*\n"
+
+# 文の区切り（区切り文字は直前の文に残す）
+SENTENCE_PATTERN = r"(?<=[。．！？!?])\s*|(?<=\.)\s+|\n"
+
+# 長すぎる文を分ける位置（読点など）
+CLAUSE_PATTERN = r"(?<=[、，,;；])"
+
+# チャンクの接続部分に入れるフェードの長さ（秒）
+FADE_SECONDS = 0.01
+
+# 無音とみなす振幅の上限
+SILENCE_THRESHOLD = 0.01
+
+# 進捗の通知先: (完了したチャンク数, チャンク総数)
+ProgressCallback = Callable[[int, int], Awaitable[None]]
+
+
+class DocumentSynthesisError(RuntimeError):
+    """文書のどのチャンクからも音声を生成できなかったときに送出される例外"""
+
+
+@dataclass
+class DocumentChunk:
+    """合成の単位となるチャンク"""
+    index: int
+    text: str
+    # チャンクの末尾が段落の終わりかどうか（次のチャンクとの間の無音の長さを決める）
+    paragraph_end: bool = False
+
+
+def _split_long(sentence: str, max_chars: int) -> List[str]:
+    """
+    長すぎる文を読点などの位置で分け、それでも長い部分は文字数で分ける
+
+    Args:
+        sentence: 文
+        max_chars: 1つの部分の文字数の上限
+
+    Returns:
+        List[str]: 分けた部分のリスト
+    """
+    if len(sentence) <= max_chars:
+        return [sentence]
+    parts: List[str] = []
+    current = ""
+    for clause in re.split(CLAUSE_PATTERN, sentence):
+        if current and len(current) + len(clause) > max_chars:
+            parts.append(current)
+            current = ""
+        current += clause
+    if current:
+        parts.append(current)
+    return [
+        part[start:start + max_chars]
+        for part in parts
+        for start in range(0, len(part), max_chars)
+    ]
+
+
+def _join(sentences: List[str]) -> str:
+    """文を結合する（英語など、区切りに空白を使う文の間には空白を入れる）"""
+    text = ""
+    for sentence in sentences:
+        if text and text[-1].isascii() and sentence[0].isascii():
+            text += " "
+        text += sentence
+    return text
+
+
+def chunk_document(text: str, target_chars: int = 400) -> List[DocumentChunk]:
+    """
+    文書を段落・文の区切りで長さのそろったチャンクに分ける
+
+    チャンクが段落をまたぐことはありません。段落ごとに、文字数を ``target_chars`` に
+    近いチャンク数で割った長さを目標にして文をまとめます。
+
+    Args:
+        text: 文書のテキスト
+        target_chars: 1チャンクの目標の文字数
+
+    Returns:
+        List[DocumentChunk]: チャンクのリスト
+    """
+    chunks: List[DocumentChunk] = []
+    for paragraph in re.split(PARAGRAPH_PATTERN, text):
+        sentences = [
+            part
+            for sentence in re.split(SENTENCE_PATTERN, paragraph)
+            if sentence.strip()
+            for part in _split_long(sentence.strip(), target_chars * 2)
+        ]
+        if not sentences:
+            continue
+
+        total = sum(len(sentence) for sentence in sentences)
+        goal = total / max(round(total / target_chars), 1)
+        current: List[str] = []
+        length = 0
+        for sentence in sentences:
+            # 文を加えると目標を半分以上超える場合は、ここでチャンクを区切る
+            if current and length + len(sentence) / 2 > goal:
+                chunks.append(DocumentChunk(len(chunks), _join(current)))
+                current, length = [], 0
+            current.append(sentence)
+            length += len(sentence)
+        chunks.append(DocumentChunk(len(chunks), _join(current), paragraph_end=True))
+    return chunks
+
+
+class _Stitcher:
+    """合成したチャンクを順番に接続し、リサンプリングしてファイルに書き込む"""
+
+    def __init__(
+        self,
+        writer: AudioWriter,
+        resampler: Resampler,
+        sentence_pause: float,
+        paragraph_pause: float,
+    ):
+        self.writer = writer
+        self.resampler = resampler
+        self.sentence_pause = sentence_pause
+        self.paragraph_pause = paragraph_pause
+        self._previous: Optional[DocumentChunk] = None
+
+    def append(self, chunk: DocumentChunk, audio: Optional[np.ndarray]) -> bool:
+        """
+        チャンクの音声を書き込む
+
+        チャンクの前後の無音を取り除いて短いフェードをかけ、チャンクの間には
+        文の区切りか段落の区切りかに応じた一定の長さの無音を入れます。
+
+        Args:
+            chunk: チャンク
+            audio: 24000Hzの音声データ（生成できなかった場合はNone）
+
+        Returns:
+            bool: 音声を書き込んだかどうか
+        """
+        fade = int(FADE_SECONDS * MODEL_SAMPLE_RATE)
+        if audio is not None:
+            audio = trim_silence(audio, SILENCE_THRESHOLD, margin=fade)
+        if audio is None or len(audio) == 0:
+            logger.warning(f"No audio was generated for document chunk {chunk.index}")
+            return False
+
+        if self._previous is not None:
+            pause = self.paragraph_pause if self._previous.paragraph_end else self.sentence_pause
+            gap = np.zeros(int(pause * MODEL_SAMPLE_RATE), dtype=np.float32)
+            self.writer.write(self.resampler.process(gap))
+        self.writer.write(self.resampler.process(apply_fades(audio, fade)))
+        self._previous = chunk
+        return True
+
+    def finish(self) -> None:
+        """リサンプラーに残っている音声を書き込み、ファイルを閉じる"""
+        self.writer.write(self.resampler.flush())
+        self.writer.close()
+
+
+async def _synthesize_chunk(
+    executor: SynthesisExecutor,
+    service: BaseTTSService,
+    chunk: DocumentChunk,
+    voice: Optional[str],
+    speed: float,
+    priority: str,
+    cancel_token: Optional[CancellationToken],
+) -> Optional[np.ndarray]:
+    """
+    1つのチャンクをワーカーで合成する
+
+    待ち行列が満杯の場合は、キャンセル・期限を確認しながら最長 ``QUEUE_WAIT_SECONDS`` 秒
+    空くのを待ちます（待っている間は拒否として数えません）。それでも空かない場合はチャンクを失敗とします。
+
+    Returns:
+        Optional[np.ndarray]: 24000Hzの音声データ（合成に失敗した場合はNone）
+
+    Raises:
+        SynthesisCancelled: キャンセルされた、または期限を過ぎた場合
+    """
+    give_up_at = time.monotonic() + QUEUE_WAIT_SECONDS
+    while not executor.has_capacity(1, len(chunk.text)):
+        if cancel_token is not None:
+            cancel_token.check()
+        if time.monotonic() > give_up_at:
+            logger.error(
+                f"Failed to synthesize document chunk {chunk.index}: "
+                f"TTS queue stayed full for {QUEUE_WAIT_SECONDS:.0f}s"
+            )
+            return None
+        await asyncio.sleep(QUEUE_POLL_SECONDS)
+
+    try:
+        # 空きを確認してから待たずに投入するため、ここで拒否されることはない
+        return await executor.submit(
+            service.synthesize_text, chunk.text, voice, speed, cancel_token,
+            priority=priority, cost=len(chunk.text),
+        )
+    except SynthesisCancelled:
+        raise
+    except Exception as e:
+        # 1つのチャンクの失敗では文書全体を失敗させず、結果で失敗したチャンクを報告する
+        logger.error(f"Failed to synthesize document chunk {chunk.index}: {e}")
+        return None
+
+
+async def synthesize_document(
+    service: BaseTTSService,
+    executor: SynthesisExecutor,
+    chunks: List[DocumentChunk],
+    store: AudioStore,
+    sample_rate: int,
+    audio_format: AudioFormat,
+    voice: Optional[str] = None,
+    speed: float = 1.0,
+    quality: Optional[float] = None,
+    bitrate_mode: Optional[str] = None,
+    resampler: str = "polyphase",
+    sentence_pause: float = 0.3,
+    paragraph_pause: float = 0.8,
+    lookahead: Optional[int] = None,
+    priority: str = "bulk",
+    cancel_token: Optional[CancellationToken] = None,
+    on_progress: Optional[ProgressCallback] = None,
+) -> Dict[str, Any]:
+    """
+    チャンクを並列に合成し、順番どおりに接続してファイルに書き込む
+
+    先頭から ``lookahead`` 個のチャンクを同時に合成に出し、先頭のチャンクが完了するたびに
+    書き込んで次のチャンクを合成に出します。書き込みは一時ファイルに行い、完了したら保存先に移動します。
+    失敗・キャンセルした場合は書きかけのファイルを削除します。
+
+    Args:
+        service: TTSサービス
+        executor: 合成を実行するエグゼキューター
+        chunks: チャンクのリスト
+        store: 音声ファイルの保存先
+        sample_rate: 出力のサンプルレート
+        audio_format: 出力形式
+        voice: 使用する音声
+        speed: 音声の速度
+        quality: 品質（0.0〜1.0）
+        bitrate_mode: ビットレートモード
+        resampler: リサンプラーの種類
+        sentence_pause: チャンクの間の無音の長さ（秒）
+        paragraph_pause: 段落の間の無音の長さ（秒）
+        lookahead: 同時に合成するチャンク数（Noneの場合はワーカー数の2倍）
+        priority: 合成ジョブの優先度クラス
+        cancel_token: キャンセル用のトークン
+        on_progress: チャンクを書き込むたびに呼び出されるコールバック
+
+    Returns:
+        Dict[str, Any]: 音声ファイルのパス、チャンク数、音声を生成できなかったチャンクのインデックスと
+            音声の長さ（秒）
+
+    Raises:
+        QueueFullError: 合成を始める時点で待ち行列が満杯の場合
+        DocumentSynthesisError: どのチャンクからも音声を生成できなかった場合
+    """
+    loop = asyncio.get_running_loop()
+    lookahead = max(lookahead or executor.max_workers * 2, 1)
+    # 過負荷の場合は書き込みを始める前に拒否する
+    executor.check_admission(
+        min(lookahead, len(chunks)), sum(len(chunk.text) for chunk in chunks[:lookahead])
+    )
+    writer = await loop.run_in_executor(
+        None, functools.partial(store.open, audio_format, sample_rate, quality, bitrate_mode)
+    )
+    stitcher = _Stitcher(
+        writer,
+        create_resampler(resampler, MODEL_SAMPLE_RATE, sample_rate),
+        sentence_pause,
+        paragraph_pause,
+    )
+
+    pending: Dict[int, asyncio.Task] = {}
+    failed: List[int] = []
+    next_index = 0
+    try:
+        for chunk in chunks:
+            while next_index < len(chunks) and next_index < chunk.index + lookahead:
+                pending[next_index] = asyncio.create_task(_synthesize_chunk(
+                    executor, service, chunks[next_index], voice, speed, priority, cancel_token
+                ))
+                next_index += 1
+            audio = await pending.pop(chunk.index)
+            if not await loop.run_in_executor(None, stitcher.append, chunk, audio):
+                failed.append(chunk.index)
+            del audio
+            if on_progress is not None:
+                await on_progress(chunk.index + 1, len(chunks))
+        if len(failed) == len(chunks):
+            raise DocumentSynthesisError("No audio was generated for any chunk of the document")
+        await loop.run_in_executor(None, stitcher.finish)
+        path = await loop.run_in_executor(None, store.commit, writer)
+    except BaseException:
+        if cancel_token is not None:
+            cancel_token.cancel("cancelled")
+        for task in pending.values():
+            task.cancel()
+        await asyncio.gather(*pending.values(), return_exceptions=True)
+        store.discard(writer)
+        raise
+
+    if failed:
+        logger.warning(f"Document was synthesized without {len(failed)} of {len(chunks)} chunks: {failed}")
+    return {
+        "file_path": path,
+        "chunks": len(chunks),
+        "failed_chunks": failed,
+        "duration": writer.duration,
+    }
+
@@ -0,0 +1,339 @@
+"""
+音声生成履歴
+
+生成した音声ファイルのメタデータをSQLiteに保存し、
+件数・経過時間・合計サイズによる保持期間の管理を行います。
+"""
+
+import logging
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Dict, Iterable, List, Optional, Tuple
+
+if TYPE_CHECKING:
+    from .storage import AudioStore
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS audio_history (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    text TEXT NOT NULL,
+    voice TEXT,
+    speed REAL,
+    format TEXT,
+    mime_type TEXT,
+    file_path TEXT NOT NULL,
+    size INTEGER NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS audio_history_created_at ON audio_history (created_at);
+CREATE INDEX IF NOT EXISTS audio_history_file_path ON audio_history (file_path);
+"""
+
+_COLUMNS = ("id", "text", "voice", "speed", "format", "mime_type", "file_path", "size", "created_at")
+
+
+class AudioHistory:
+    """
+    上限付きの音声生成履歴
+
+    履歴の追加時に保持条件（件数・経過時間・合計サイズ）を超えたエントリを古い順に削除し、
+    ``audio_dir`` 以下にある対応する音声ファイルも削除します。
+    キャッシュなど ``audio_dir`` の外にあるファイルは削除しません。
+
+    ``store`` を指定した場合、ファイルの削除は保存先を通して行うため、
+    保存先に ``commit`` されてからまだ履歴に追加されていないファイルは削除されません。
+    """
+
+    def __init__(
+        self,
+        db_path: str = "output/history.sqlite3",
+        audio_dir: str = "output/audio",
+        max_entries: int = 1000,
+        max_age_seconds: float = 7 * 24 * 3600,
+        max_bytes: int = 1024 * 1024 * 1024,
+        store: Optional["AudioStore"] = None,
+    ):
+        """
+        初期化
+
+        Args:
+            db_path: SQLiteデータベースのパス（":memory:" も指定可能）
+            audio_dir: 履歴の削除時にファイルも削除する音声ディレクトリ
+            max_entries: 保持するエントリ数の上限（0以下で無制限）
+            max_age_seconds: 保持する期間（秒、0以下で無制限）
+            max_bytes: 保持する音声ファイルの合計サイズの上限（0以下で無制限）
+            store: 音声ファイルの保存先（指定した場合はファイルの削除を保存先を通して行う）
+        """
+        self.audio_dir = os.path.realpath(audio_dir)
+        self.store = store
+        self.max_entries = max_entries
+        self.max_age_seconds = max_age_seconds
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+
+        if db_path != ":memory:":
+            Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        with self._conn:
+            self._conn.executescript(_SCHEMA)
+
+    @staticmethod
+    def _to_dict(row: sqlite3.Row) -> Dict[str, Any]:
+        """データベースの行を辞書に変換する"""
+        return {column: row[column] for column in _COLUMNS}
+
+    def add(self, metadata: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        履歴にエントリを追加する
+
+        追加した時点で音声ファイルは履歴から参照されるため、保存先の削除対象に戻します。
+
+        Args:
+            metadata: text, voice, speed, format, mime_type, file_path を含むメタデータ
+
+        Returns:
+            Dict[str, Any]: id と created_at が設定されたエントリ
+        """
+        file_path = metadata["file_path"]
+        try:
+            size = os.path.getsize(file_path)
+        except OSError:
+            size = 0
+
+        entry = {
+            "text": metadata.get("text", ""),
+            "voice": metadata.get("voice"),
+            "speed": metadata.get("speed"),
+            "format": metadata.get("format"),
+            "mime_type": metadata.get("mime_type"),
+            "file_path": file_path,
+            "size": size,
+            "created_at": time.time(),
+        }
+        with self._lock, self._conn:
+            cursor = self._conn.execute(
+                "INSERT INTO audio_history (text, voice, speed, format, mime_type, file_path, "
+                "size, created_at) VALUES (:text, :voice, :speed, :format, :mime_type, "
+                ":file_path, :size, :created_at)",
+                entry,
+            )
+            entry["id"] = cursor.lastrowid
+            if self.store is not None:
+                self.store.release(file_path)
+            # 追加したエントリは返したURIが参照するため、1件でサイズの上限を超えていても削除しない
+            self._enforce_retention(keep_id=entry["id"])
+        return entry
+
+    def get(self, entry_id: int) -> Optional[Dict[str, Any]]:
+        """
+        IDでエントリを取得する
+
+        Args:
+            entry_id: エントリのID
+
+        Returns:
+            Optional[Dict[str, Any]]: エントリ（存在しない場合はNone）
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT * FROM audio_history WHERE id = ?", (entry_id,)
+            ).fetchone()
+        return self._to_dict(row) if row is not None else None
+
+    def find_by_path(self, file_path: str) -> Optional[Dict[str, Any]]:
+        """
+        音声ファイルのパスで最新のエントリを取得する
+
+        Args:
+            file_path: 音声ファイルのパス
+
+        Returns:
+            Optional[Dict[str, Any]]: エントリ（そのファイルを参照するエントリがない場合はNone）
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT * FROM audio_history WHERE file_path = ? ORDER BY id DESC LIMIT 1",
+                (file_path,),
+            ).fetchone()
+        return self._to_dict(row) if row is not None else None
+
+    def latest(self) -> Optional[Dict[str, Any]]:
+        """
+        最新のエントリを取得する
+
+        Returns:
+            Optional[Dict[str, Any]]: 最新のエントリ（履歴が空の場合はNone）
+        """
+        entries = self.recent(1)
+        return entries[0] if entries else None
+
+    def recent(self, limit: int) -> List[Dict[str, Any]]:
+        """
+        新しい順にエントリを取得する
+
+        Args:
+            limit: 取得する件数
+
+        Returns:
+            List[Dict[str, Any]]: エントリのリスト
+        """
+        entries, _ = self.page(limit=limit)
+        return entries
+
+    def page(
+        self, cursor: Optional[int] = None, limit: int = 50
+    ) -> Tuple[List[Dict[str, Any]], Optional[int]]:
+        """
+        新しい順にエントリをページ単位で取得する
+
+        Args:
+            cursor: 前のページで返されたカーソル（このIDより古いエントリを返す）
+            limit: 1ページの件数
+
+        Returns:
+            Tuple[List[Dict[str, Any]], Optional[int]]: エントリのリストと次のページのカーソル
+        """
+        with self._lock:
+            if cursor is None:
+                rows = self._conn.execute(
+                    "SELECT * FROM audio_history ORDER BY id DESC LIMIT ?", (limit + 1,)
+                ).fetchall()
+            else:
+                rows = self._conn.execute(
+                    "SELECT * FROM audio_history WHERE id < ? ORDER BY id DESC LIMIT ?",
+                    (cursor, limit + 1),
+                ).fetchall()
+
+        entries = [self._to_dict(row) for row in rows[:limit]]
+        next_cursor = entries[-1]["id"] if len(rows) > limit else None
+        return entries, next_cursor
+
+    def enforce_retention(self) -> int:
+        """
+        保持条件を超えたエントリを削除する
+
+        Returns:
+            int: 削除したエントリ数
+        """
+        with self._lock, self._conn:
+            return self._enforce_retention()
+
+    def _enforce_retention(self, keep_id: Optional[int] = None) -> int:
+        """
+        保持条件を超えたエントリを削除する（ロック・トランザクション内で呼び出す）
+
+        Args:
+            keep_id: 合計サイズの上限による削除の対象から外すエントリのID
+
+        Returns:
+            int: 削除したエントリ数
+        """
+        expired: List[sqlite3.Row] = []
+
+        if self.max_age_seconds > 0:
+            expired += self._conn.execute(
+                "SELECT id, file_path FROM audio_history WHERE created_at < ?",
+                (time.time() - self.max_age_seconds,),
+            ).fetchall()
+
+        if self.max_entries > 0:
+            expired += self._conn.execute(
+                "SELECT id, file_path FROM audio_history ORDER BY id DESC LIMIT -1 OFFSET ?",
+                (self.max_entries,),
+            ).fetchall()
+
+        total_bytes = self._conn.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM audio_history"
+        ).fetchone()[0]
+        if self.max_bytes > 0 and total_bytes > self.max_bytes:
+            removed = {row["id"] for row in expired}
+            rows = self._conn.execute(
+                "SELECT id, file_path, size FROM audio_history ORDER BY id ASC"
+            ).fetchall()
+            remaining = [row for row in rows if row["id"] not in removed]
+            total = sum(row["size"] for row in remaining)
+            for row in remaining:
+                if total <= self.max_bytes:
+                    break
+                if row["id"] == keep_id:
+                    continue
+                expired.append(row)
+                total -= row["size"]
+
+        ids = sorted({row["id"] for row in expired})
+        if not ids:
+            return 0
+
+        self._conn.executemany("DELETE FROM audio_history WHERE id = ?", [(i,) for i in ids])
+        for file_path in {row["file_path"] for row in expired}:
+            self._remove_file(file_path)
+        logger.debug(f"Removed {len(ids)} expired history entries")
+        return len(ids)
+
+    def forget_files(self, file_paths: Iterable[str]) -> int:
+        """
+        削除された音声ファイルを参照しているエントリを削除する
+
+        Args:
+            file_paths: 削除された音声ファイルのパス
+
+        Returns:
+            int: 削除したエントリ数
+        """
+        paths = {variant for path in file_paths for variant in (path, os.path.normpath(path))}
+        with self._lock, self._conn:
+            before = self._conn.total_changes
+            self._conn.executemany(
+                "DELETE FROM audio_history WHERE file_path = ?", [(path,) for path in paths]
+            )
+            return self._conn.total_changes - before
+
+    def _remove_file(self, file_path: str) -> None:
+        """他のエントリから参照されていない音声ディレクトリ内のファイルを削除する"""
+        real_path = os.path.realpath(file_path)
+        if os.path.commonpath([real_path, self.audio_dir]) != self.audio_dir:
+            return
+        still_used = self._conn.execute(
+            "SELECT 1 FROM audio_history WHERE file_path = ? LIMIT 1", (file_path,)
+        ).fetchone()
+        if still_used is not None:
+            return
+        if self.store is not None:
+            self.store.remove(file_path)
+            return
+        try:
+            os.remove(file_path)
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            logger.warning(f"Failed to remove expired audio file {file_path}: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        履歴の統計情報を取得する
+
+        Returns:
+            Dict[str, Any]: エントリ数、合計サイズ、保持条件
+        """
+        with self._lock:
+            count, total = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM audio_history"
+            ).fetchone()
+        return {
+            "entries": count,
+            "bytes": total,
+            "max_entries": self.max_entries,
+            "max_age_seconds": self.max_age_seconds,
+            "max_bytes": self.max_bytes,
+        }
+
+    def close(self) -> None:
+        """データベースを閉じる"""
+        with self._lock:
+            self._conn.close()
@@ -2,8 +2,18 @@
 Kokoro TTSモジュール
 
 このモジュールは、Kokoro TTSサービスの実装を提供します。
+``KokoroTTSService`` は torch と kokoro を読み込むため、最初に参照されたときにインポートします
+（``base`` や ``voices`` だけを使うサーバーの起動やモックモードでは torch を読み込みません）。
 """
 
-from .kokoro import KokoroTTSService
+from typing import Any
 
 __all__ = ["KokoroTTSService"]
+
+
+def __getattr__(name: str) -> Any:
+    if name == "KokoroTTSService":
+        from .kokoro import KokoroTTSService
+
+        return KokoroTTSService
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
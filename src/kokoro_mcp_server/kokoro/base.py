@@ -2,8 +2,85 @@
 TTSサービスのベースクラス
 """
 
-from dataclasses import dataclass
-from typing import Optional, Tuple, Union, Dict, Any, cast
+import re
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Optional, Tuple, Union, Dict, Any, Callable, List, cast
+
+# （英語などは . ; : の後の空白で区切る。3.5 のように後ろに空白のない . では区切らない）
+# （英語などは文末の . ; : の後の空白で区切る。小数点や略語の途中の . では区切らない）
+SPLIT_PATTERN = r"[。、．，!?！？\n]+|(?<=[.;:])\s+"
+
+# G2Pに渡すテキストを途中で区切ってよい文字（空白と、セグメントの分割後にも残る記号）
+G2P_BREAK_PATTERN = re.compile(r"[\s・「」『』（）()［］【】〈〉《》\"“”‘’…―,.;:]")
+
+# モデルに一度に渡せる音素列の長さ
+MAX_PHONEMES = 510
+
+# ストリーミング用コールバック: (セグメント番号, セグメント総数, 音声データ, サンプルレート)
+ChunkCallback = Callable[[int, int, Any, int], None]
+
+class SynthesisCancelled(Exception):
+    """
+    音声合成がキャンセルされた、または期限を過ぎたときに送出される例外
+
+    Attributes:
+        reason: "cancelled"（クライアントによるキャンセル）または "deadline_exceeded"（期限切れ）
+        partial_path: 途中までの音声を書き出したファイルのパス（書き出していない場合はNone）
+    """
+
+    def __init__(self, reason: str, partial_path: Optional[str] = None):
+        super().__init__(f"Synthesis stopped: {reason}")
+        self.reason = reason
+        self.partial_path = partial_path
+
+class CancellationToken:
+    """
+    ワーカースレッドで実行中の音声合成を止めるためのトークン
+
+    イベントループ側から ``cancel`` を呼ぶか期限を過ぎると、
+    合成側はセグメントの区切りで ``check`` によって停止します。
+    """
+
+    def __init__(self, timeout: Optional[float] = None):
+        """
+        初期化
+
+        Args:
+            timeout: 作成時からの期限（秒、Noneの場合は期限なし）
+        """
+        self.deadline = time.monotonic() + timeout if timeout else None
+        self.reason: Optional[str] = None
+        self._event = threading.Event()
+
+    def cancel(self, reason: str = "cancelled") -> None:
+        """
+        キャンセルする（既にキャンセル済みの場合は何もしない）
+
+        Args:
+            reason: キャンセルの理由
+        """
+        if not self._event.is_set():
+            self.reason = reason
+            self._event.set()
+
+    @property
+    def cancelled(self) -> bool:
+        """キャンセルされたか、期限を過ぎているかどうか"""
+        if not self._event.is_set() and self.deadline is not None and time.monotonic() >= self.deadline:
+            self.cancel("deadline_exceeded")
+        return self._event.is_set()
+
+    def check(self) -> None:
+        """
+        キャンセルされていれば例外を送出する
+
+        Raises:
+            SynthesisCancelled: キャンセルされたか、期限を過ぎている場合
+        """
+        if self.cancelled:
+            raise SynthesisCancelled(self.reason or "cancelled")
 
 @dataclass
 class TTSRequest:
@@ -11,6 +88,16 @@ class TTSRequest:
     text: str
     voice: Optional[str] = None
     speed: Optional[float] = None
+    sample_rate: Optional[int] = None
+    audio_format: Optional[str] = None
+    quality: Optional[float] = None
+    bitrate_mode: Optional[str] = None
+    on_chunk: Optional[ChunkCallback] = field(default=None, compare=False, repr=False)
+    cancel_token: Optional[CancellationToken] = field(default=None, compare=False, repr=False)
+    # キャンセル・期限切れのときに途中までの音声を書き出すかどうか
+    allow_partial: bool = False
+    # G2Pを行わずに合成する音素列（指定した場合は文単位のセグメントの代わりに使う）
+    phonemes: Optional[List[str]] = None
     
     def __getitem__(self, key: str) -> Any:
         """辞書風アクセスをサポート"""
@@ -20,8 +107,58 @@ class TTSRequest:
             return self.voice
         elif key == "speed":
             return self.speed
+        elif key == "sample_rate":
+            return self.sample_rate
+        elif key == "audio_format":
+            return self.audio_format
+        elif key == "quality":
+            return self.quality
+        elif key == "bitrate_mode":
+            return self.bitrate_mode
+        elif key == "allow_partial":
+            return self.allow_partial
+        elif key == "phonemes":
+            return self.phonemes
         raise KeyError(f"TTSRequest has no attribute '{key}'")
 
+def split_text(text: str) -> List[str]:
+    """
+    テキストを文単位のセグメントに分割する
+
+    Args:
+        text: 分割するテキスト
+
+    Returns:
+        List[str]: 空のセグメントを除いたセグメントのリスト
+    """
+    return [
+        segment.strip() for segment in re.split(SPLIT_PATTERN, text.strip()) if segment.strip()
+    ]
+
+def split_for_g2p(text: str, max_chars: int) -> List[str]:
+    """
+    G2Pに一度に渡せる長さにテキストを分ける
+
+    単語やかなの並びの途中で区切るとG2Pの結果が変わるため、上限の手前の最後の空白・記号の後で区切り、
+    それがない場合にだけ上限の位置で区切ります。
+
+    Args:
+        text: セグメントのテキスト
+        max_chars: 1つの部分の文字数の上限
+
+    Returns:
+        List[str]: 分けた部分のリスト
+    """
+    parts: List[str] = []
+    while len(text) > max_chars:
+        breaks = [match.end() for match in G2P_BREAK_PATTERN.finditer(text, 0, max_chars)]
+        cut = breaks[-1] if breaks else max_chars
+        parts.append(text[:cut])
+        text = text[cut:]
+    if text:
+        parts.append(text)
+    return parts
+
 class BaseTTSService:
     """TTSサービスのベースクラス"""
     
@@ -35,4 +172,45 @@ class BaseTTSService:
         Returns:
             tuple[bool, Optional[str]]: 成功したかどうかとファイルパス
         """
-        raise NotImplementedError 
\ No newline at end of file
+        raise NotImplementedError
+
+    def generate_batch(self, requests: List[TTSRequest]) -> List[Tuple[bool, Optional[str]]]:
+        """
+        複数のリクエストの音声をまとめて生成する（デフォルトでは1件ずつ順番に生成）
+        
+        Args:
+            requests: TTSリクエストのリスト
+            
+        Returns:
+            List[tuple[bool, Optional[str]]]: リクエストごとの成功したかどうかとファイルパス
+        """
+        return [self.generate(request) for request in requests]
+
+    def synthesize_text(
+        self,
+        text: str,
+        voice: Optional[str] = None,
+        speed: float = 1.0,
+        cancel_token: Optional[CancellationToken] = None,
+    ) -> Any:
+        """
+        テキストを音声データに変換する（ファイルには書き込まない）
+
+        Args:
+            text: 変換するテキスト
+            voice: 使用する音声（Noneの場合はデフォルトの音声）
+            speed: 音声の速度
+            cancel_token: キャンセル用のトークン
+
+        Returns:
+            Optional[np.ndarray]: 24000Hzの音声データ（生成できなかった場合はNone）
+
+        Raises:
+            SynthesisCancelled: キャンセルされた、または期限を過ぎた場合
+        """
+        raise NotImplementedError
+
+    def warmup(self) -> None:
+        """
+        初回リクエストの遅延を減らすための事前処理を行う（デフォルトでは何もしない）
+        """
@@ -3,39 +3,92 @@ Kokoro TTS Service implementation
 """
 
 import logging
-from pathlib import Path
-from datetime import datetime
+import time
 import numpy as np
 from numpy.typing import NDArray
-import librosa
-import soundfile as sf
 import torch
 
 from kokoro import KPipeline
 from torch import Tensor
 from typing import cast, Any, Generator, Tuple, Optional, List
-from .base import BaseTTSService, TTSRequest
+from .base import (
+    MAX_PHONEMES,
+    SPLIT_PATTERN,
+    BaseTTSService,
+    CancellationToken,
+    SynthesisCancelled,
+    TTSRequest,
+    split_for_g2p,
+    split_text,
+)
+from .pipeline_pool import PipelinePool
+from .voices import lang_code_for_voice
+from ..audio import (
+    DEFAULT_SAMPLE_RATE,
+    MODEL_SAMPLE_RATE,
+    create_resampler,
+    get_audio_format,
+    resolve_sample_rate,
+)
+from ..cache import PhonemeCache, SegmentCache
+from ..metrics import metrics
+from ..storage import AudioStore
 
 
 logger = logging.getLogger(__name__)
 
+# 英語以外のG2Pに一度に渡すテキストの長さ（KPipelineと同じ）
+G2P_CHUNK_CHARS = 400
+
 class KokoroTTSService(BaseTTSService):
     """Kokoro TTS Service implementation"""
     
-    def __init__(self):
-        """Initialize the service"""
+    def __init__(
+        self,
+        segment_cache: Optional[SegmentCache] = None,
+        phoneme_cache: Optional[PhonemeCache] = None,
+        resampler: str = "polyphase",
+        max_pipelines: int = 3,
+        pipeline_idle_seconds: float = 600.0,
+        audio_store: Optional[AudioStore] = None,
+    ):
+        """Initialize the service
+
+        Args:
+            segment_cache: 文単位の音声キャッシュ（Noneの場合はキャッシュしない）
+            phoneme_cache: 文単位のG2P結果のキャッシュ（Noneの場合はキャッシュしない）
+            resampler: リサンプラーの種類（"polyphase" または "librosa"）
+            max_pipelines: 同時に保持する言語別パイプライン数の上限
+            pipeline_idle_seconds: 使われない言語のパイプラインを解放するまでの時間（秒）
+            audio_store: 音声ファイルの保存先（Noneの場合は output/audio）
+        """
         self.logger = logger
         self.language = "j"  # Default to Japanese
         self.voice = "jf_alpha"  # Default voice
-        self.pipeline = self._create_pipeline()
-        
-    def _create_pipeline(self) -> Optional[KPipeline]:
-        """Create TTS pipeline"""
-        try:
-            return KPipeline(lang_code=self.language)
-        except Exception as e:
-            self.logger.error(f"Pipeline creation error: {e}", exc_info=True)
-            return None
+        self.segment_cache = segment_cache
+        self.phoneme_cache = phoneme_cache
+        self.resampler = resampler
+        self.audio_store = audio_store or AudioStore()
+        self.pipelines = PipelinePool(max_pipelines, pipeline_idle_seconds)
+        # デフォルト言語のパイプライン（モデル本体を含む）は起動時に読み込んでおく
+        self.pipelines.get(self.language)
+
+    @property
+    def pipeline(self) -> KPipeline:
+        """デフォルト言語のパイプライン"""
+        return self.pipelines.get(self.language)
+
+    def _pipeline_for(self, voice: str) -> KPipeline:
+        """
+        音声の言語に対応するパイプラインを取得する
+
+        Args:
+            voice: 音声名（先頭1文字が言語コード）
+
+        Returns:
+            KPipeline: パイプライン
+        """
+        return self.pipelines.get(lang_code_for_voice(voice))
             
     def _adjust_speed(self, audio: Tensor, speed: float) -> Tensor:
         """
@@ -52,7 +105,9 @@ class KokoroTTSService(BaseTTSService):
             # 音声データをNumPy配列に変換
             audio_np = audio.cpu().numpy()
             
-            # librosaを使用して速度を調整
+            # librosaを使用して速度を調整（読み込みに時間がかかるため、使うときにインポートする）
+            import librosa
+
             audio_stretched = librosa.effects.time_stretch(audio_np, rate=1/speed)
             
             # テンソルに戻す
@@ -62,6 +117,147 @@ class KokoroTTSService(BaseTTSService):
             self.logger.error(f"Speed adjustment error: {e}", exc_info=True)
             return audio
             
+    def _split_text(self, text: str) -> List[str]:
+        """
+        テキストを文単位のセグメントに分割する
+
+        Args:
+            text: 分割するテキスト
+
+        Returns:
+            List[str]: 空のセグメントを除いたセグメントのリスト
+        """
+        return split_text(text)
+
+    def _synthesize_segment(
+        self,
+        segment: str,
+        voice: str,
+        speed: float,
+        cancel_token: Optional[CancellationToken] = None,
+    ) -> Optional[NDArray[np.float32]]:
+        """
+        1つのセグメントを音声に変換する（キャッシュにあればそれを返す）
+
+        Args:
+            segment: セグメントのテキスト
+            voice: 使用する音声
+            speed: 音声の速度
+            cancel_token: キャンセル用のトークン（パイプラインの出力ごとに確認する）
+
+        Returns:
+            Optional[NDArray[np.float32]]: 24000Hzの音声データ（生成できなかった場合はNone）
+
+        Raises:
+            SynthesisCancelled: 合成中にキャンセルされた場合（途中の音声はキャッシュしない）
+        """
+        if self.segment_cache is not None:
+            cached = self.segment_cache.get(segment, voice, speed)
+            if cached is not None:
+                self.logger.debug(f"Segment cache hit: {segment[:30]}...")
+                return cached
+
+        segment_audio = self._infer_segment(segment, voice, speed, cancel_token)
+
+        if segment_audio is not None and self.segment_cache is not None:
+            self.segment_cache.put(segment, voice, speed, segment_audio)
+        return segment_audio
+
+    def _infer_segment(
+        self,
+        segment: str,
+        voice: str,
+        speed: float,
+        cancel_token: Optional[CancellationToken] = None,
+    ) -> Optional[NDArray[np.float32]]:
+        """
+        1つのセグメントを音素に変換してからモデルに通す（音素キャッシュにあればG2Pを省く）
+
+        Args:
+            segment: セグメントのテキスト
+            voice: 使用する音声
+            speed: 音声の速度
+            cancel_token: キャンセル用のトークン（音素列ごとに確認する）
+
+        Returns:
+            Optional[NDArray[np.float32]]: 24000Hzの音声データ（生成できなかった場合はNone）
+        """
+        lang_code = lang_code_for_voice(voice)
+        phonemes = None
+        if self.phoneme_cache is not None:
+            phonemes = self.phoneme_cache.get(lang_code, segment)
+        if phonemes is None:
+            phonemes = self._phonemize(segment, voice)
+            if phonemes and self.phoneme_cache is not None:
+                self.phoneme_cache.put(lang_code, segment, phonemes)
+        return self._infer_phonemes(phonemes, voice, speed, cancel_token)
+
+    def _phonemize(self, segment: str, voice: str) -> List[str]:
+        """
+        セグメントをG2Pで音素列に変換する
+
+        KPipelineと同じ規則で、モデルに一度に渡せる長さの音素列のリストに分けます
+        （英語以外はテキストを ``G2P_CHUNK_CHARS`` 文字以下に、空白・記号の位置で分けてからG2Pに渡します）。
+
+        Args:
+            segment: セグメントのテキスト
+            voice: 使用する音声（言語の判定に使う）
+
+        Returns:
+            List[str]: 音素列のリスト
+        """
+        pipeline = self._pipeline_for(voice)
+        phonemes: List[str] = []
+        with metrics.timer("g2p"):
+            if pipeline.lang_code in "ab":
+                _, tokens = pipeline.g2p(segment)
+                phonemes = [ps for _, ps, _ in pipeline.en_tokenize(tokens) if ps]
+            else:
+                for part in split_for_g2p(segment, G2P_CHUNK_CHARS):
+                    ps, _ = pipeline.g2p(part)
+                    if ps:
+                        phonemes.append(ps)
+        return [ps[:MAX_PHONEMES] for ps in phonemes]
+
+    def _infer_phonemes(
+        self,
+        phonemes: List[str],
+        voice: str,
+        speed: float,
+        cancel_token: Optional[CancellationToken] = None,
+    ) -> Optional[NDArray[np.float32]]:
+        """
+        音素列をモデルに通して音声に変換する（G2Pは行わない）
+
+        Args:
+            phonemes: 音素列のリスト（それぞれ MAX_PHONEMES 文字以下）
+            voice: 使用する音声
+            speed: 音声の速度
+            cancel_token: キャンセル用のトークン（音素列ごとに確認する）
+
+        Returns:
+            Optional[NDArray[np.float32]]: 24000Hzの音声データ（生成できなかった場合はNone）
+        """
+        pipeline = self._pipeline_for(voice)
+        chunks = []
+        with metrics.timer("synthesize"):
+            pack = pipeline.load_voice(voice).to(pipeline.model.device)
+            for ps in phonemes:
+                output = KPipeline.infer(pipeline.model, ps, pack, speed)
+                if output.audio is not None:
+                    chunks.append(output.audio.cpu().numpy())
+                if cancel_token is not None:
+                    cancel_token.check()
+
+        if not chunks:
+            return None
+        return np.concatenate(chunks).astype(np.float32, copy=False)
+
+    def warmup(self) -> None:
+        """短いテキストで一度パイプラインを実行し、辞書やモデルの初期化を済ませる"""
+        for _ in self.pipeline("こんにちは", voice=self.voice, speed=1.0, split_pattern=None):
+            pass
+
     def generate(self, request: TTSRequest) -> tuple[bool, str | None]:
         """音声を生成する
 
@@ -70,22 +266,17 @@ class KokoroTTSService(BaseTTSService):
 
         Returns:
             tuple[bool, Optional[str]]: 成功したかどうかとファイルパス
+
+        Raises:
+            SynthesisCancelled: キャンセルされた、または期限を過ぎた場合
+                （``allow_partial`` の場合は途中までの音声のパスを ``partial_path`` に設定）
         """
         try:
+            started = time.perf_counter()
             self.logger.info(
                 f"Starting voice generation for text: {request.text[:50]}..."
             )
 
-            # 出力ディレクトリの作成
-            voice_folder = Path("output/audio")
-            voice_folder.mkdir(parents=True, exist_ok=True)
-            self.logger.debug(f"Voice folder created/confirmed: {voice_folder}")
-
-            # 出力ファイル名の生成
-            base_filename = request.voice or "output"
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            self.logger.debug(f"Base filename: {base_filename}, Timestamp: {timestamp}")
-
             # 音声生成
             speed = request.speed if request.speed is not None else 1.0
             self.logger.debug(f"Speed set to: {speed}")
@@ -94,48 +285,176 @@ class KokoroTTSService(BaseTTSService):
             voice = request.voice or self.voice
             self.logger.info(f"Using voice: {voice}")
 
-            # 出力ファイル名の生成
-            filename = voice_folder / f"{base_filename}_{timestamp}.wav"
-            self.logger.debug(f"Generated filename: {filename}")
+            # 出力形式とサンプルレートの決定
+            audio_format = get_audio_format(request.audio_format)
+            sample_rate = resolve_sample_rate(
+                audio_format, request.sample_rate or DEFAULT_SAMPLE_RATE
+            )
 
-            # パイプラインの実行
-            generator = self.pipeline(
-                request.text,
-                voice=voice,
-                speed=speed,
-                split_pattern=r"[。、．，!?！？\n]+"  # より自然な区切りのためのパターン
+            # セグメントごとに音声を生成し、リサンプリングしてそのままファイルに追記する
+            # （キャッシュ済みのセグメントはモデルを通さない。on_chunkが指定されていれば通知する）
+            # 音声全体をメモリ上に保持しないため、必要なメモリはセグメントの長さにのみ比例する
+            resampler = create_resampler(self.resampler, MODEL_SAMPLE_RATE, sample_rate)
+            self.logger.debug(f"Resampling audio from {MODEL_SAMPLE_RATE}Hz to {sample_rate}Hz...")
+
+            # 音素が指定されている場合はG2Pとセグメントキャッシュを通さず、音素列をそのまま使う
+            if request.phonemes:
+                segments = list(request.phonemes)
+            else:
+                with metrics.timer("split"):
+                    segments = self._split_text(request.text)
+
+            # 一時ファイルに書き込み、完了したら内容のハッシュ値のパスに移動する
+            writer = self.audio_store.open(
+                audio_format,
+                sample_rate,
+                quality=request.quality,
+                bitrate_mode=request.bitrate_mode,
             )
+            self.logger.debug(f"Writing audio to file: {writer.path}")
+            cancelled: Optional[SynthesisCancelled] = None
+            completed = False
+            try:
+                for index, segment in enumerate(segments):
+                    # キャンセル・期限切れはセグメントの区切りで確認する
+                    try:
+                        if request.cancel_token is not None:
+                            request.cancel_token.check()
+                        if request.phonemes:
+                            segment_audio = self._infer_phonemes(
+                                [segment], voice, speed, request.cancel_token
+                            )
+                        else:
+                            segment_audio = self._synthesize_segment(
+                                segment, voice, speed, request.cancel_token
+                            )
+                    except SynthesisCancelled as e:
+                        self.logger.info(
+                            f"Synthesis stopped ({e.reason}) after {index}/{len(segments)} segments"
+                        )
+                        cancelled = e
+                        break
+                    if segment_audio is not None:
+                        with metrics.timer("resample"):
+                            resampled = resampler.process(segment_audio)
+                        with metrics.timer("write"):
+                            writer.write(resampled)
+                        if request.on_chunk is not None:
+                            request.on_chunk(index, len(segments), resampled, sample_rate)
 
-            # 音声データの結合
-            combined_audio = []
-            for gs, ps, audio in generator:
-                if audio is not None:
-                    combined_audio.append(audio.cpu().numpy())
-
-            if combined_audio:
-                # 音声データを結合
-                final_audio = np.concatenate(combined_audio)
-                
-                # 24000Hzから44100Hzにリサンプリング
-                self.logger.debug("Resampling audio from 24000Hz to 44100Hz...")
-                audio_resampled = librosa.resample(
-                    y=final_audio, orig_sr=24000, target_sr=44100
-                )
+                if writer.frames and (cancelled is None or request.allow_partial):
+                    with metrics.timer("write"):
+                        writer.write(resampler.flush())
+                    completed = True
+            finally:
+                if not completed:
+                    # 音声がない、途中までの音声が不要、またはエラーの場合は書きかけのファイルを削除する
+                    self.audio_store.discard(writer)
 
-                # 音声ファイルの保存
-                self.logger.debug(f"Writing audio to file: {filename}")
-                sf.write(str(filename), audio_resampled, 44100)
+            if not completed:
+                if cancelled is not None:
+                    raise cancelled
+                self.logger.warning("No audio was generated")
+                metrics.inc("failures")
+                return False, None
+            filename = self.audio_store.commit(writer)
 
-                self.logger.info(f"Successfully generated audio file: {filename}")
-                return True, str(filename)
-            
-            self.logger.warning("No audio was generated")
-            return False, None
+            if cancelled is not None:
+                # 途中までの音声を返す（キャッシュされないよう例外として返す）
+                self.logger.info(f"Wrote truncated audio file: {filename}")
+                cancelled.partial_path = filename
+                raise cancelled
+
+            elapsed = time.perf_counter() - started
+            metrics.observe("generate", elapsed)
+            metrics.record_synthesis(len(request.text), writer.duration, elapsed)
+            self.logger.info(f"Successfully generated audio file: {filename}")
+            return True, filename
 
+        except SynthesisCancelled:
+            raise
         except Exception as e:
             self.logger.error(f"Kokoro TTS Error: {e}", exc_info=True)
+            metrics.inc("failures")
             return False, None
 
+    def generate_batch(self, requests: List[TTSRequest]) -> List[Tuple[bool, Optional[str]]]:
+        """複数のリクエストの音声をまとめて生成する
+
+        同じ音声・速度のリクエストをまとめ、グループ内で重複するセグメントは
+        一度だけモデルに通してから各リクエストを生成します（セグメントキャッシュ使用時）。
+
+        Args:
+            requests: TTSリクエストのリスト
+
+        Returns:
+            List[tuple[bool, Optional[str]]]: リクエストごとの成功したかどうかとファイルパス
+        """
+        groups: dict[tuple[str, float], List[int]] = {}
+        for index, request in enumerate(requests):
+            voice = request.voice or self.voice
+            speed = request.speed if request.speed is not None else 1.0
+            groups.setdefault((voice, speed), []).append(index)
+
+        results: List[Tuple[bool, Optional[str]]] = [(False, None)] * len(requests)
+        for (voice, speed), indices in groups.items():
+            self.logger.info(
+                f"Batch group: voice={voice}, speed={speed}, {len(indices)} requests"
+            )
+            if self.segment_cache is not None:
+                unique_segments = dict.fromkeys(
+                    segment
+                    for index in indices
+                    for segment in self._split_text(requests[index].text)
+                )
+                for segment in unique_segments:
+                    try:
+                        self._synthesize_segment(segment, voice, speed)
+                    except Exception as e:
+                        self.logger.error(f"Batch segment error: {e}", exc_info=True)
+
+            for index in indices:
+                try:
+                    results[index] = self.generate(requests[index])
+                except SynthesisCancelled:
+                    results[index] = (False, None)
+        return results
+
+    def synthesize_text(
+        self,
+        text: str,
+        voice: Optional[str] = None,
+        speed: float = 1.0,
+        cancel_token: Optional[CancellationToken] = None,
+    ) -> Optional[NDArray[np.float32]]:
+        """テキストを音声データに変換する（ファイルには書き込まない）
+
+        文単位に分割し、セグメントキャッシュ・音素キャッシュを使って合成した音声を結合します。
+
+        Args:
+            text: 変換するテキスト
+            voice: 使用する音声（Noneの場合はデフォルトの音声）
+            speed: 音声の速度
+            cancel_token: キャンセル用のトークン（セグメントの区切りで確認する）
+
+        Returns:
+            Optional[NDArray[np.float32]]: 24000Hzの音声データ（生成できなかった場合はNone）
+
+        Raises:
+            SynthesisCancelled: キャンセルされた、または期限を過ぎた場合
+        """
+        voice = voice or self.voice
+        chunks = []
+        for segment in self._split_text(text):
+            if cancel_token is not None:
+                cancel_token.check()
+            segment_audio = self._synthesize_segment(segment, voice, speed, cancel_token)
+            if segment_audio is not None:
+                chunks.append(segment_audio)
+        if not chunks:
+            return None
+        return np.concatenate(chunks)
+
     def generate_audio(
         self,
         text: str,
@@ -158,11 +477,11 @@ class KokoroTTSService(BaseTTSService):
             self.logger.debug(f"Parameters - Voice: {voice}, Speed: {speed}")
 
             # パイプラインの実行
-            generator = self.pipeline(
+            generator = self._pipeline_for(voice)(
                 text,
                 voice=voice,
                 speed=speed,
-                split_pattern=r"[。、．，!?！？\n]+"  # より自然な区切りのためのパターン
+                split_pattern=SPLIT_PATTERN
             )
 
             for gs, ps, audio in generator:
@@ -1,94 +1,272 @@
 """
 モックTTSサービス
+
+モデルの重みがない環境で負荷試験ができるよう、実際のKokoroに近い振る舞いを模擬します。
+テキストを文単位に分割し、文字数に比例した処理時間をかけて、
+文字数に比例した長さの音声を生成します。
 """
 
-import os
-import random
 import logging
-from datetime import datetime
-from pathlib import Path
-from typing import Optional, Tuple
+import random
+import time
+import zlib
+from typing import Any, Generator, Optional, Tuple
 
-from .base import BaseTTSService, TTSRequest
+import numpy as np
+
+from .base import (
+    BaseTTSService,
+    CancellationToken,
+    SynthesisCancelled,
+    TTSRequest,
+    split_text,
+)
+from .voices import lang_code_for_voice
+from ..audio import (
+    DEFAULT_SAMPLE_RATE,
+    MODEL_SAMPLE_RATE,
+    create_resampler,
+    get_audio_format,
+    resolve_sample_rate,
+)
+from ..metrics import metrics
+from ..storage import AudioStore
 
 logger = logging.getLogger(__name__)
 
+# 1秒あたりに読み上げる文字数（日本語・中国語は1文字あたりの音節が多い）
+SPEECH_CHARS_PER_SECOND = {"j": 8.0, "z": 5.0}
+DEFAULT_SPEECH_CHARS_PER_SECOND = 15.0
+
+class MockSynthesisError(RuntimeError):
+    """故障注入によって発生させる合成エラー"""
+
 class MockKokoroTTSService(BaseTTSService):
-    """モックTTSサービス"""
-    
-    def __init__(self):
-        """初期化"""
+    """
+    モックTTSサービス
+
+    1セグメントあたりの処理時間は ``segment_cost_ms + 文字数 * char_cost_ms`` を
+    ``jitter`` の割合でばらつかせたものです。``busy=True`` の場合はその時間だけ
+    NumPyの演算でCPUを使い（実際のモデルと同様にGILを解放しながら）、
+    Falseの場合はスリープします。
+    """
+
+    def __init__(
+        self,
+        char_cost_ms: float = 2.0,
+        segment_cost_ms: float = 10.0,
+        jitter: float = 0.1,
+        failure_rate: float = 0.0,
+        busy: bool = False,
+        seed: Optional[int] = None,
+        audio_store: Optional[AudioStore] = None,
+    ):
+        """
+        初期化
+
+        Args:
+            char_cost_ms: 1文字あたりの処理時間（ミリ秒）
+            segment_cost_ms: 1セグメントあたりの固定の処理時間（ミリ秒）
+            jitter: 処理時間のばらつき（標準偏差の割合、0で一定）
+            failure_rate: リクエストが失敗する確率（0.0〜1.0）
+            busy: Trueの場合はスリープではなくCPUを使って時間を消費する
+            seed: 乱数のシード（再現性のある試験用）
+            audio_store: 音声ファイルの保存先（Noneの場合は output/audio）
+        """
         self.logger = logger
-        
-        # サンプル音声ファイルのパス
-        self.sample_files = [
-            os.path.join(os.path.dirname(__file__), "samples", f"sample{i}.wav")
-            for i in range(1, 4)
-        ]
-        
-        # サンプルディレクトリの作成
-        sample_dir = os.path.join(os.path.dirname(__file__), "samples")
-        os.makedirs(sample_dir, exist_ok=True)
-        
-        # サンプルファイルの作成（存在しない場合）
-        for sample_file in self.sample_files:
-            if not os.path.exists(sample_file):
-                self._create_dummy_wav(sample_file)
-    
-    def _create_dummy_wav(self, file_path: str):
+        self.voice = "jf_alpha"
+        self.char_cost_ms = char_cost_ms
+        self.segment_cost_ms = segment_cost_ms
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self.busy = busy
+        self._random = random.Random(seed)
+        self.audio_store = audio_store or AudioStore()
+
+    def _spend(self, seconds: float) -> None:
+        """指定した時間だけ処理を模擬する"""
+        if seconds <= 0:
+            return
+        if not self.busy:
+            time.sleep(seconds)
+            return
+        deadline = time.perf_counter() + seconds
+        matrix = np.ones((64, 64), dtype=np.float32)
+        while time.perf_counter() < deadline:
+            matrix = np.tanh(matrix @ matrix * 1e-3)
+
+    def _synthesize_segment(self, segment: str, voice: str, speed: float) -> np.ndarray:
         """
-        ダミーのWAVファイルを作成する
-        
+        1つのセグメントの音声を模擬生成する
+
         Args:
-            file_path: 作成するファイルのパス
+            segment: セグメントのテキスト
+            voice: 使用する音声
+            speed: 音声の速度
+
+        Returns:
+            np.ndarray: 24000Hzの音声データ
         """
-        import numpy as np
-        import soundfile as sf
-        
-        # 1秒のサイン波を生成
-        sample_rate = 44100
-        t = np.linspace(0, 1, sample_rate)
-        data = np.sin(2 * np.pi * 440 * t)  # 440Hz
-        
-        # WAVファイルとして保存
-        sf.write(file_path, data, sample_rate)
-    
+        cost_ms = self.segment_cost_ms + len(segment) * self.char_cost_ms
+        if self.jitter > 0:
+            cost_ms *= max(self._random.gauss(1.0, self.jitter), 0.0)
+        with metrics.timer("synthesize"):
+            self._spend(cost_ms / 1000)
+
+        chars_per_second = SPEECH_CHARS_PER_SECOND.get(
+            lang_code_for_voice(voice), DEFAULT_SPEECH_CHARS_PER_SECOND
+        )
+        duration = len(segment) / chars_per_second / speed
+        t = np.arange(int(duration * MODEL_SAMPLE_RATE), dtype=np.float32) / MODEL_SAMPLE_RATE
+        # セグメントごとに異なる高さの音にして、結合の誤りを聞き分けられるようにする
+        frequency = 180.0 + zlib.crc32(segment.encode("utf-8")) % 120
+        envelope = np.sin(np.pi * t / max(duration, 1e-3))
+        return (0.3 * envelope * np.sin(2 * np.pi * frequency * t)).astype(np.float32)
+
+    def _maybe_fail(self) -> None:
+        """故障注入の確率に従って例外を送出する"""
+        if self.failure_rate > 0 and self._random.random() < self.failure_rate:
+            raise MockSynthesisError("injected mock synthesis failure")
+
     def generate(self, request: TTSRequest) -> Tuple[bool, Optional[str]]:
         """
         音声を生成する
-        
+
         Args:
             request: TTSリクエスト
-            
+
         Returns:
             tuple[bool, Optional[str]]: 成功したかどうかとファイルパス
+
+        Raises:
+            SynthesisCancelled: キャンセルされた、または期限を過ぎた場合
         """
         try:
+            started = time.perf_counter()
             self.logger.info(
                 f"[MOCK] Starting voice generation for text: {request.text[:50]}..."
             )
-            
-            # 出力ディレクトリの作成
-            voice_folder = Path("output/audio")
-            voice_folder.mkdir(parents=True, exist_ok=True)
-            
-            # 出力ファイル名の生成
-            base_filename = request.voice or "mock_output"
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            
-            # 出力ファイル名
-            filename = voice_folder / f"{base_filename}_{timestamp}.wav"
-            
-            # ランダムにサンプルファイルを選択
-            sample_file = random.choice(self.sample_files)
-            
-            # サンプルファイルをコピー
-            import shutil
-            shutil.copy(sample_file, str(filename))
-            
+            self._maybe_fail()
+
+            # 出力形式とサンプルレートの決定
+            audio_format = get_audio_format(request.audio_format)
+            sample_rate = resolve_sample_rate(
+                audio_format, request.sample_rate or DEFAULT_SAMPLE_RATE
+            )
+
+            voice = request.voice or self.voice
+            speed = request.speed if request.speed is not None else 1.0
+            resampler = create_resampler("polyphase", MODEL_SAMPLE_RATE, sample_rate)
+
+            # 音素が指定されている場合は音素列をそのままセグメントとして使う
+            if request.phonemes:
+                segments = list(request.phonemes)
+            else:
+                with metrics.timer("split"):
+                    segments = split_text(request.text)
+            # セグメントごとにリサンプリングしてそのまま一時ファイルに追記する
+            writer = self.audio_store.open(
+                audio_format, sample_rate,
+                quality=request.quality, bitrate_mode=request.bitrate_mode,
+            )
+            cancelled: Optional[SynthesisCancelled] = None
+            completed = False
+            try:
+                for index, segment in enumerate(segments):
+                    if request.cancel_token is not None and request.cancel_token.cancelled:
+                        cancelled = SynthesisCancelled(request.cancel_token.reason or "cancelled")
+                        break
+                    segment_audio = self._synthesize_segment(segment, voice, speed)
+                    with metrics.timer("resample"):
+                        resampled = resampler.process(segment_audio)
+                    with metrics.timer("write"):
+                        writer.write(resampled)
+                    if request.on_chunk is not None:
+                        request.on_chunk(index, len(segments), resampled, sample_rate)
+
+                if writer.frames and (cancelled is None or request.allow_partial):
+                    with metrics.timer("write"):
+                        writer.write(resampler.flush())
+                    completed = True
+            finally:
+                if not completed:
+                    self.audio_store.discard(writer)
+
+            if not completed:
+                if cancelled is not None:
+                    raise cancelled
+                self.logger.warning("[MOCK] No audio was generated")
+                metrics.inc("failures")
+                return False, None
+            filename = self.audio_store.commit(writer)
+            if cancelled is not None:
+                cancelled.partial_path = filename
+                raise cancelled
+
+            elapsed = time.perf_counter() - started
+            metrics.observe("generate", elapsed)
+            metrics.record_synthesis(len(request.text), writer.duration, elapsed)
             self.logger.info(f"[MOCK] Generated mock audio file: {filename}")
-            return True, str(filename)
-            
+            return True, filename
+
+        except SynthesisCancelled:
+            raise
         except Exception as e:
             self.logger.error(f"[MOCK] Error: {e}", exc_info=True)
-            return False, None 
\ No newline at end of file
+            metrics.inc("failures")
+            return False, None
+
+    def synthesize_text(
+        self,
+        text: str,
+        voice: Optional[str] = None,
+        speed: float = 1.0,
+        cancel_token: Optional[CancellationToken] = None,
+    ) -> Optional[np.ndarray]:
+        """
+        テキストを音声データに変換する（ファイルには書き込まない）
+
+        Args:
+            text: 変換するテキスト
+            voice: 使用する音声（Noneの場合はデフォルトの音声）
+            speed: 音声の速度
+            cancel_token: キャンセル用のトークン（セグメントの区切りで確認する）
+
+        Returns:
+            Optional[np.ndarray]: 24000Hzの音声データ（生成できなかった場合はNone）
+
+        Raises:
+            SynthesisCancelled: キャンセルされた、または期限を過ぎた場合
+        """
+        self._maybe_fail()
+        voice = voice or self.voice
+        chunks = []
+        for segment in split_text(text):
+            if cancel_token is not None:
+                cancel_token.check()
+            chunks.append(self._synthesize_segment(segment, voice, speed))
+        if not chunks:
+            return None
+        return np.concatenate(chunks)
+
+    def generate_audio(
+        self,
+        text: str,
+        voice: str = "jf_alpha",
+        speed: float = 1.0,
+    ) -> Generator[Tuple[str, str, Any], None, None]:
+        """
+        音声をセグメントごとに生成する
+
+        Args:
+            text: 変換するテキスト
+            voice: 使用する音声
+            speed: 音声の速度
+
+        Yields:
+            Generator[Tuple[str, str, Any], None, None]:
+                グラフェーム、音素（モックでは空文字列）、24000Hzの音声データのタプル
+        """
+        self._maybe_fail()
+        for segment in split_text(text):
+            yield segment, "", self._synthesize_segment(segment, voice, speed)
@@ -0,0 +1,133 @@
+"""
+言語ごとのKPipelineプール
+
+音声の言語コードごとにKPipelineを必要になった時点で作成し、
+上限数・アイドル時間を超えたものを使用順の古いものから解放します。
+モデルの重みはすべてのパイプラインで共有します。
+"""
+
+import gc
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class PipelinePool:
+    """言語コードをキーとするKPipelineのLRUプール"""
+
+    def __init__(self, max_pipelines: int = 3, max_idle_seconds: float = 600.0):
+        """
+        初期化
+
+        Args:
+            max_pipelines: 同時に保持するパイプライン数の上限
+            max_idle_seconds: 使われないパイプラインを解放するまでの時間（0以下で無効）
+        """
+        self.max_pipelines = max(max_pipelines, 1)
+        self.max_idle_seconds = max_idle_seconds
+        self._pipelines: "OrderedDict[str, Tuple[Any, float]]" = OrderedDict()
+        self._model: Any = None
+        self._lock = threading.Lock()
+        self._creation_locks: Dict[str, threading.Lock] = {}
+        self.created = 0
+        self.evicted = 0
+
+    def _create(self, lang_code: str) -> Any:
+        """
+        パイプラインを作成する（2つ目以降はモデルを共有する）
+
+        Args:
+            lang_code: 言語コード
+
+        Returns:
+            KPipeline: 作成したパイプライン
+        """
+        from kokoro import KPipeline
+
+        logger.info(f"Creating KPipeline for lang_code={lang_code}")
+        if self._model is None:
+            pipeline = KPipeline(lang_code=lang_code)
+            self._model = pipeline.model
+        else:
+            pipeline = KPipeline(lang_code=lang_code, model=self._model)
+        self.created += 1
+        return pipeline
+
+    def get(self, lang_code: str) -> Any:
+        """
+        言語コードに対応するパイプラインを取得する（なければ作成する）
+
+        Args:
+            lang_code: 言語コード
+
+        Returns:
+            KPipeline: パイプライン
+        """
+        with self._lock:
+            self._evict_idle()
+            entry = self._pipelines.get(lang_code)
+            if entry is not None:
+                self._pipelines[lang_code] = (entry[0], time.monotonic())
+                self._pipelines.move_to_end(lang_code)
+                return entry[0]
+            creation_lock = self._creation_locks.setdefault(lang_code, threading.Lock())
+
+        # 同じ言語のパイプラインを重複して作成しないよう、言語ごとにロックする
+        with creation_lock:
+            with self._lock:
+                entry = self._pipelines.get(lang_code)
+                if entry is not None:
+                    return entry[0]
+
+            pipeline = self._create(lang_code)
+
+            with self._lock:
+                self._pipelines[lang_code] = (pipeline, time.monotonic())
+                while len(self._pipelines) > self.max_pipelines:
+                    evicted_code, _ = self._pipelines.popitem(last=False)
+                    self._on_evict(evicted_code)
+            return pipeline
+
+    def reset_locks(self) -> None:
+        """
+        ロックを作り直す（fork後の子プロセスで呼び出す）
+
+        forkした時点で親プロセスの他のスレッドが取得していたロックは、子プロセスでは解放されないためです。
+        """
+        self._lock = threading.Lock()
+        self._creation_locks = {}
+
+    def _evict_idle(self) -> None:
+        """アイドル時間を超えたパイプラインを解放する（ロック内で呼び出す）"""
+        if self.max_idle_seconds <= 0:
+            return
+        deadline = time.monotonic() - self.max_idle_seconds
+        for lang_code in [code for code, (_, used) in self._pipelines.items() if used < deadline]:
+            del self._pipelines[lang_code]
+            self._on_evict(lang_code)
+
+    def _on_evict(self, lang_code: str) -> None:
+        """パイプライン解放時の処理"""
+        self.evicted += 1
+        logger.info(f"Evicted KPipeline for lang_code={lang_code}")
+        gc.collect()
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        プールの状態を取得する
+
+        Returns:
+            Dict[str, Any]: 保持している言語コード、作成数、解放数など
+        """
+        with self._lock:
+            return {
+                "loaded": list(self._pipelines),
+                "max_pipelines": self.max_pipelines,
+                "max_idle_seconds": self.max_idle_seconds,
+                "created": self.created,
+                "evicted": self.evicted,
+            }
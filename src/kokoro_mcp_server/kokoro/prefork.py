@@ -0,0 +1,480 @@
+"""
+プリフォーク型のマルチプロセスTTSサービス
+
+親プロセスでモデルを読み込んだ後にワーカープロセスをforkし、モデルの重みを
+コピーオンライトで共有したまま、各プロセスでセグメントの推論を並列に実行します。
+推論結果の音声はプロセスごとの共有メモリを通して親プロセスに返します。
+テキストの分割、キャッシュ、リサンプリング、ファイルの書き込みは親プロセスで行います。
+
+forkは他のスレッドが動いているプロセスから行われるため、子プロセスで使うロック（メトリクスとパイプラインプール）は
+fork後に作り直します。子プロセスでの処理時間は応答と一緒に親プロセスに返し、親プロセスのメトリクスに記録します。
+"""
+
+import atexit
+import logging
+import multiprocessing
+import os
+import queue
+import threading
+import time
+from dataclasses import dataclass
+from multiprocessing.connection import Connection
+from multiprocessing.shared_memory import SharedMemory
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from numpy.typing import NDArray
+
+from .base import CancellationToken, SynthesisCancelled
+from .kokoro import KokoroTTSService
+from .voices import lang_code_for_voice
+from ..audio import MODEL_SAMPLE_RATE
+from ..metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# 推論の完了を待つ間に、ワーカープロセスの状態とキャンセルを確認する間隔（秒）
+_POLL_INTERVAL = 0.1
+
+
+class WorkerProcessError(RuntimeError):
+    """ワーカープロセスでの推論に失敗したときに送出される例外"""
+
+
+class WorkerTimeoutError(WorkerProcessError):
+    """ワーカープロセスが時間内に応答しなかったときに送出される例外"""
+
+
+@dataclass
+class _WorkerHandle:
+    """親プロセス側から見たワーカープロセス"""
+    index: int
+    process: Any
+    conn: Connection
+    shm: SharedMemory
+    segments: int = 0
+
+
+def _worker_main(
+    service: "PreforkTTSService",
+    conn: Connection,
+    parent_conn: Connection,
+    shm: SharedMemory,
+    threads: int,
+) -> None:
+    """
+    ワーカープロセスのメインループ（fork後の子プロセスで実行される）
+
+    ``(セグメント, 音素列, 音声, 速度)`` を受け取って推論し、結果を共有メモリに書き込んで
+    サンプル数と音素列、処理段階ごとの所要時間を返します。
+    音素列がNoneの場合はG2Pも行います（音素キャッシュは親プロセスが管理します）。
+    共有メモリに収まらない場合は音声データをパイプで送ります。
+
+    Args:
+        service: fork前に親プロセスで作成したサービス（モデルを含む）
+        conn: 親プロセスとのパイプ
+        parent_conn: パイプの親プロセス側（子プロセスでは閉じる）
+        shm: 音声データの受け渡しに使う共有メモリ
+        threads: このプロセスで推論に使うスレッド数
+    """
+    import torch
+
+    # fork時に引き継いだ親プロセス側のパイプを閉じ、親の終了をEOFで検知できるようにする
+    parent_conn.close()
+    for other in service._workers:
+        other.conn.close()
+    parent_pid = os.getppid()
+    # fork時に親プロセスの他のスレッドが取得していたロックは解放されないため作り直す
+    # （メトリクスのロックは metrics モジュールがfork時に作り直す）
+    service.pipelines.reset_locks()
+
+    torch.set_num_threads(threads)
+    buffer = np.ndarray((shm.size // 4,), dtype=np.float32, buffer=shm.buf)
+    while True:
+        try:
+            if not conn.poll(1.0):
+                if os.getppid() != parent_pid:
+                    break
+                continue
+            message = conn.recv()
+        except (EOFError, KeyboardInterrupt):
+            break
+        if message is None:
+            break
+
+        segment, phonemes, voice, speed = message
+        # 子プロセスのメトリクスは親プロセスから見えないため、所要時間は応答で返す
+        timings: Dict[str, float] = {}
+        try:
+            if phonemes is None:
+                started = time.perf_counter()
+                phonemes = KokoroTTSService._phonemize(service, segment, voice)
+                timings["g2p"] = time.perf_counter() - started
+            started = time.perf_counter()
+            with torch.inference_mode():
+                audio = KokoroTTSService._infer_phonemes(service, phonemes, voice, speed)
+            timings["synthesize"] = time.perf_counter() - started
+        except Exception as e:
+            conn.send(("error", f"{type(e).__name__}: {e}", None, timings))
+            continue
+
+        if audio is None:
+            conn.send(("empty", 0, phonemes, timings))
+        elif len(audio) <= len(buffer):
+            buffer[: len(audio)] = audio
+            conn.send(("shm", len(audio), phonemes, timings))
+        else:
+            conn.send(("inline", audio, phonemes, timings))
+
+
+class PreforkTTSService(KokoroTTSService):
+    """
+    セグメントの推論をforkしたワーカープロセスに振り分けるKokoro TTSサービス
+
+    音声合成エグゼキューターの各スレッドは、セグメントごとに空いているワーカープロセスを1つ借りて
+    推論させ、その間はGILを解放して待機します。そのため同時に推論できるセグメント数は
+    ``min(TTS_WORKERS, processes)`` です。
+
+    fork前の親プロセスでは推論を実行しないでください（OpenMPのスレッドプールが作られた後に
+    forkすると、子プロセスの推論が停止することがあります）。ウォームアップは各ワーカーで行います。
+
+    推論を待つ間もキャンセルと期限を確認し、キャンセルされた場合や ``segment_timeout`` 秒以内に
+    応答がない場合は、推論中のワーカープロセスを停止して起動し直します。
+    """
+
+    def __init__(
+        self,
+        processes: int = 2,
+        threads_per_process: Optional[int] = None,
+        buffer_seconds: float = 60.0,
+        segment_timeout: float = 120.0,
+        **kwargs: Any,
+    ):
+        """
+        初期化（モデルを読み込んでからワーカープロセスを起動する）
+
+        Args:
+            processes: ワーカープロセス数
+            threads_per_process: 各プロセスでtorchが使うスレッド数
+                （Noneの場合はCPUコア数をプロセス数で割った数）
+            buffer_seconds: 共有メモリで受け渡せる1セグメントの音声の長さ（秒）
+            segment_timeout: 1セグメントの推論を待つ時間の上限（秒、0以下で無制限）
+            **kwargs: KokoroTTSService に渡す引数
+
+        Raises:
+            RuntimeError: forkが使えないプラットフォームの場合
+        """
+        if "fork" not in multiprocessing.get_all_start_methods():
+            raise RuntimeError("Pre-fork workers require the 'fork' start method")
+
+        super().__init__(**kwargs)
+        self.processes = max(processes, 1)
+        self.threads_per_process = threads_per_process or max(
+            (os.cpu_count() or 1) // self.processes, 1
+        )
+        self._buffer_bytes = int(buffer_seconds * MODEL_SAMPLE_RATE) * 4
+        self.segment_timeout = segment_timeout
+        self._context = multiprocessing.get_context("fork")
+        self._lock = threading.Lock()
+        self._idle: "queue.Queue[_WorkerHandle]" = queue.Queue()
+        self._workers: List[_WorkerHandle] = []
+        self.restarts = 0
+
+        for index in range(self.processes):
+            worker = self._spawn(index)
+            self._workers.append(worker)
+            self._idle.put(worker)
+        atexit.register(self.close)
+        self.logger.info(
+            f"Started {self.processes} TTS worker processes "
+            f"({self.threads_per_process} torch threads each)"
+        )
+
+    def _spawn(self, index: int) -> _WorkerHandle:
+        """
+        ワーカープロセスを1つforkする
+
+        Args:
+            index: ワーカーの番号
+
+        Returns:
+            _WorkerHandle: 起動したワーカー
+        """
+        shm = SharedMemory(create=True, size=self._buffer_bytes)
+        parent_conn, child_conn = self._context.Pipe()
+        process = self._context.Process(
+            target=_worker_main,
+            args=(self, child_conn, parent_conn, shm, self.threads_per_process),
+            name=f"tts-process-{index}",
+            daemon=True,
+        )
+        process.start()
+        child_conn.close()
+        return _WorkerHandle(index, process, parent_conn, shm)
+
+    def _restart(self, worker: _WorkerHandle, reason: str) -> _WorkerHandle:
+        """
+        ワーカープロセスを起動し直す（終了していないプロセスは停止する）
+
+        Args:
+            worker: 起動し直すワーカー
+            reason: ログに出力する理由
+
+        Returns:
+            _WorkerHandle: 新しく起動したワーカー
+        """
+        if worker.process.is_alive():
+            worker.process.kill()
+        worker.process.join(timeout=1)
+        self.logger.warning(
+            f"TTS worker process {worker.index} {reason} (code {worker.process.exitcode}); restarting"
+        )
+        self._release(worker)
+        with self._lock:
+            replacement = self._spawn(worker.index)
+            self._workers[worker.index] = replacement
+            self.restarts += 1
+        return replacement
+
+    @staticmethod
+    def _release(worker: _WorkerHandle) -> None:
+        """ワーカーのパイプと共有メモリを解放する"""
+        worker.conn.close()
+        worker.shm.close()
+        worker.shm.unlink()
+
+    def _timeout_at(self) -> Optional[float]:
+        """今から ``segment_timeout`` 秒後の時刻（``time.monotonic`` 基準、無制限の場合はNone）"""
+        return time.monotonic() + self.segment_timeout if self.segment_timeout > 0 else None
+
+    def _receive(
+        self,
+        worker: _WorkerHandle,
+        timeout_at: Optional[float],
+        cancel_token: Optional[CancellationToken] = None,
+    ) -> Any:
+        """
+        ワーカープロセスの応答を待って受け取る
+
+        待っている間も一定間隔でワーカープロセスの状態、キャンセル、期限を確認します。
+
+        Args:
+            worker: 応答を待つワーカー
+            timeout_at: 待つ期限（``time.monotonic`` 基準、Noneで無制限）
+            cancel_token: キャンセル用のトークン
+
+        Returns:
+            ワーカープロセスの応答
+
+        Raises:
+            WorkerTimeoutError: 期限までに応答がなかった場合
+            SynthesisCancelled: 待っている間にキャンセルされた、または期限を過ぎた場合
+            EOFError, OSError: ワーカープロセスが終了している場合
+        """
+        while not worker.conn.poll(_POLL_INTERVAL):
+            if not worker.process.is_alive():
+                raise EOFError(f"TTS worker process {worker.index} exited")
+            if cancel_token is not None:
+                cancel_token.check()
+            if timeout_at is not None and time.monotonic() > timeout_at:
+                raise WorkerTimeoutError(
+                    f"TTS worker process {worker.index} did not respond within "
+                    f"{self.segment_timeout:.0f}s"
+                )
+        return worker.conn.recv()
+
+    def _request(
+        self,
+        worker: _WorkerHandle,
+        message: Any,
+        cancel_token: Optional[CancellationToken] = None,
+    ) -> Tuple[Optional[NDArray[np.float32]], List[str]]:
+        """
+        ワーカープロセスに推論を依頼し、結果を待つ
+
+        待っている間も一定間隔でワーカープロセスの状態、キャンセル、``segment_timeout`` を確認します。
+
+        Args:
+            worker: 依頼するワーカー
+            message: ``(セグメント, 音素列, 音声, 速度)``
+            cancel_token: キャンセル用のトークン
+
+        Returns:
+            Tuple[Optional[NDArray[np.float32]], List[str]]:
+                24000Hzの音声データ（生成できなかった場合はNone）と、使用した音素列
+
+        Raises:
+            WorkerProcessError: ワーカーでの推論に失敗した場合
+            WorkerTimeoutError: ワーカーが ``segment_timeout`` 秒以内に応答しなかった場合
+            SynthesisCancelled: 推論を待っている間にキャンセルされた、または期限を過ぎた場合
+            EOFError, OSError: ワーカープロセスが終了している場合
+        """
+        worker.conn.send(message)
+        kind, payload, phonemes, timings = self._receive(worker, self._timeout_at(), cancel_token)
+        worker.segments += 1
+        for stage, seconds in timings.items():
+            metrics.observe(stage, seconds)
+        if kind == "shm":
+            # 次の依頼で上書きされる前に共有メモリからコピーする
+            audio = np.ndarray((payload,), dtype=np.float32, buffer=worker.shm.buf).copy()
+            return audio, phonemes
+        if kind == "inline":
+            return payload, phonemes
+        if kind == "empty":
+            return None, phonemes
+        raise WorkerProcessError(payload)
+
+    def _run_on_worker(
+        self,
+        segment: Optional[str],
+        phonemes: Optional[List[str]],
+        voice: str,
+        speed: float,
+        cancel_token: Optional[CancellationToken] = None,
+    ) -> Tuple[Optional[NDArray[np.float32]], List[str]]:
+        """
+        空いているワーカープロセスで推論を実行する
+
+        キャンセルは依頼する前と推論を待つ間に確認します。推論中にキャンセルされた場合や時間内に応答がない場合は、
+        そのワーカープロセスの応答を次の依頼が受け取ることのないよう、プロセスを停止して起動し直します。
+
+        Args:
+            segment: セグメントのテキスト（音素列を指定した場合は使わない）
+            phonemes: 音素列のリスト（Noneの場合はワーカーでG2Pを行う）
+            voice: 使用する音声
+            speed: 音声の速度
+            cancel_token: キャンセル用のトークン
+
+        Returns:
+            Tuple[Optional[NDArray[np.float32]], List[str]]: 音声データと使用した音素列
+
+        Raises:
+            WorkerProcessError: ワーカーでの推論に失敗した、ワーカーが異常終了した、または応答しなかった場合
+            SynthesisCancelled: キャンセルされた、または期限を過ぎた場合
+        """
+        worker = self._idle.get()
+        try:
+            if cancel_token is not None:
+                cancel_token.check()
+            try:
+                return self._request(worker, (segment, phonemes, voice, speed), cancel_token)
+            except SynthesisCancelled:
+                worker = self._restart(worker, "was stopped after cancellation")
+                raise
+            except WorkerTimeoutError:
+                worker = self._restart(worker, "timed out")
+                raise
+            except (EOFError, OSError) as e:
+                worker = self._restart(worker, "exited")
+                raise WorkerProcessError(f"TTS worker process exited during synthesis: {e}") from e
+        finally:
+            self._idle.put(worker)
+
+    def _infer_segment(
+        self,
+        segment: str,
+        voice: str,
+        speed: float,
+        cancel_token: Optional[CancellationToken] = None,
+    ) -> Optional[NDArray[np.float32]]:
+        """
+        ワーカープロセスで1つのセグメントを音声に変換する（音素キャッシュは親プロセスで参照する）
+
+        Args:
+            segment: セグメントのテキスト
+            voice: 使用する音声
+            speed: 音声の速度
+            cancel_token: キャンセル用のトークン
+
+        Returns:
+            Optional[NDArray[np.float32]]: 24000Hzの音声データ（生成できなかった場合はNone）
+        """
+        lang_code = lang_code_for_voice(voice)
+        cached = None
+        if self.phoneme_cache is not None:
+            cached = self.phoneme_cache.get(lang_code, segment)
+        audio, phonemes = self._run_on_worker(segment, cached, voice, speed, cancel_token)
+        if cached is None and phonemes and self.phoneme_cache is not None:
+            self.phoneme_cache.put(lang_code, segment, phonemes)
+        return audio
+
+    def _infer_phonemes(
+        self,
+        phonemes: List[str],
+        voice: str,
+        speed: float,
+        cancel_token: Optional[CancellationToken] = None,
+    ) -> Optional[NDArray[np.float32]]:
+        """
+        ワーカープロセスで音素列を音声に変換する
+
+        Args:
+            phonemes: 音素列のリスト
+            voice: 使用する音声
+            speed: 音声の速度
+            cancel_token: キャンセル用のトークン
+
+        Returns:
+            Optional[NDArray[np.float32]]: 24000Hzの音声データ（生成できなかった場合はNone）
+        """
+        audio, _ = self._run_on_worker(None, phonemes, voice, speed, cancel_token)
+        return audio
+
+    def warmup(self) -> None:
+        """
+        各ワーカープロセスで一度パイプラインを実行し、辞書やモデルの初期化を済ませる
+
+        ``segment_timeout`` 秒以内に応答しなかった、または異常終了したワーカープロセスは起動し直します
+        （ウォームアップが終わらないまま、モデルの読み込みが完了しない状態にはなりません）。
+        """
+        workers = [self._idle.get() for _ in range(self.processes)]
+        try:
+            for worker in workers:
+                worker.conn.send(("こんにちは", None, self.voice, 1.0))
+            timeout_at = self._timeout_at()
+            for position, worker in enumerate(workers):
+                try:
+                    self._receive(worker, timeout_at)
+                except WorkerTimeoutError:
+                    workers[position] = self._restart(worker, "timed out during warmup")
+                except (EOFError, OSError):
+                    workers[position] = self._restart(worker, "exited during warmup")
+        finally:
+            for worker in workers:
+                self._idle.put(worker)
+
+    def worker_stats(self) -> Dict[str, Any]:
+        """
+        ワーカープロセスの状態を取得する
+
+        Returns:
+            Dict[str, Any]: プロセス数、スレッド数、空きプロセス数、再起動回数、プロセスごとの処理数
+        """
+        return {
+            "processes": self.processes,
+            "threads_per_process": self.threads_per_process,
+            "idle": self._idle.qsize(),
+            "restarts": self.restarts,
+            "workers": [
+                {
+                    "pid": worker.process.pid,
+                    "alive": worker.process.is_alive(),
+                    "segments": worker.segments,
+                }
+                for worker in self._workers
+            ],
+        }
+
+    def close(self) -> None:
+        """ワーカープロセスを停止し、共有メモリを解放する"""
+        for worker in self._workers:
+            try:
+                worker.conn.send(None)
+            except OSError:
+                pass
+        for worker in self._workers:
+            worker.process.join(timeout=5)
+            if worker.process.is_alive():
+                worker.process.terminate()
+            self._release(worker)
+        self._workers = []
@@ -0,0 +1,56 @@
+"""
+Kokoroの音声一覧
+
+音声名の先頭1文字が言語コードを表します（例: jf_alpha → "j"）。
+"""
+
+from typing import Dict, List
+
+# 言語コードごとの音声一覧
+VOICES: Dict[str, List[str]] = {
+    "a": [
+        "af_alloy", "af_aoede", "af_bella", "af_heart", "af_jessica", "af_kore", "af_nicole",
+        "af_nova", "af_river", "af_sarah", "af_sky", "am_adam", "am_echo", "am_eric",
+        "am_fenrir", "am_liam", "am_michael", "am_onyx", "am_puck", "am_santa",
+    ],
+    "b": [
+        "bf_alice", "bf_emma", "bf_isabella", "bf_lily",
+        "bm_daniel", "bm_fable", "bm_george", "bm_lewis",
+    ],
+    "e": ["ef_dora", "em_alex", "em_santa"],
+    "f": ["ff_siwis"],
+    "h": ["hf_alpha", "hf_beta", "hm_omega", "hm_psi"],
+    "i": ["if_sara", "im_nicola"],
+    "j": ["jf_alpha", "jf_gongitsune", "jf_nezumi", "jf_tebukuro", "jm_kumo"],
+    "p": ["pf_dora", "pm_alex", "pm_santa"],
+    "z": [
+        "zf_xiaobei", "zf_xiaoni", "zf_xiaoxiao", "zf_xiaoyi",
+        "zm_yunjian", "zm_yunxi", "zm_yunxia", "zm_yunyang",
+    ],
+}
+
+DEFAULT_LANG_CODE = "j"
+
+
+def lang_code_for_voice(voice: str) -> str:
+    """
+    音声名から言語コードを取得する
+
+    Args:
+        voice: 音声名（例: "af_heart"）
+
+    Returns:
+        str: 言語コード（不明な場合はデフォルトの日本語）
+    """
+    lang_code = voice[:1].lower()
+    return lang_code if lang_code in VOICES else DEFAULT_LANG_CODE
+
+
+def all_voices() -> List[str]:
+    """
+    すべての音声名を取得する
+
+    Returns:
+        List[str]: 音声名のリスト
+    """
+    return [voice for voices in VOICES.values() for voice in voices]
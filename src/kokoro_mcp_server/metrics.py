@@ -0,0 +1,255 @@
+"""
+音声合成のメトリクス
+
+処理段階ごとの所要時間をヒストグラム（p50/p95/p99）として集計し、
+処理した文字数や生成した音声の長さなどのカウンターとあわせて
+JSONまたはPrometheusのテキスト形式で出力します。
+"""
+
+import bisect
+import math
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Deque, Dict, Iterator, List, Sequence
+
+# Prometheus出力用のバケット境界（秒）
+DEFAULT_BUCKETS = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0,
+)
+
+# 実時間比（合成時間 / 音声の長さ）用のバケット境界
+RATIO_BUCKETS = (0.05, 0.1, 0.2, 0.3, 0.5, 0.75, 1.0, 1.5, 2.0, 5.0)
+
+PERCENTILES = (50, 95, 99)
+
+
+class Histogram:
+    """
+    パーセンタイル計算用に直近のサンプルを保持するヒストグラム
+
+    パーセンタイルは直近 ``window`` 件のサンプルから計算し、
+    件数・合計・バケットごとの件数は起動時からの累積値を保持します。
+    """
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS, window: int = 1024):
+        """
+        初期化
+
+        Args:
+            buckets: Prometheus出力用のバケット境界（昇順）
+            window: パーセンタイルの計算に使うサンプル数
+        """
+        self.buckets = tuple(buckets)
+        self.bucket_counts = [0] * len(self.buckets)
+        self.count = 0
+        self.sum = 0.0
+        self._samples: Deque[float] = deque(maxlen=window)
+
+    def observe(self, value: float) -> None:
+        """値を記録する（ロックは呼び出し側で取得する）"""
+        self.count += 1
+        self.sum += value
+        self._samples.append(value)
+        index = bisect.bisect_left(self.buckets, value)
+        if index < len(self.bucket_counts):
+            self.bucket_counts[index] += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        集計結果を取得する
+
+        Returns:
+            Dict[str, Any]: 件数、合計、平均、最大値とp50/p95/p99
+        """
+        samples = sorted(self._samples)
+        result: Dict[str, Any] = {
+            "count": self.count,
+            "sum": self.sum,
+            "mean": self.sum / self.count if self.count else 0.0,
+            "max": samples[-1] if samples else 0.0,
+        }
+        for percentile in PERCENTILES:
+            if samples:
+                # nearest-rank法
+                index = max(0, math.ceil(len(samples) * percentile / 100) - 1)
+                result[f"p{percentile}"] = samples[index]
+            else:
+                result[f"p{percentile}"] = 0.0
+        return result
+
+
+class Metrics:
+    """
+    処理段階ごとのタイマーとカウンターの集計
+
+    ワーカースレッドとイベントループの両方から記録されるため、
+    すべての更新はロックで保護されます。
+    """
+
+    def __init__(self, namespace: str = "kokoro_tts"):
+        """
+        初期化
+
+        Args:
+            namespace: Prometheus出力時のメトリクス名の接頭辞
+        """
+        self.namespace = namespace
+        self.started_at = time.time()
+        self._stages: Dict[str, Histogram] = {}
+        self._ratios: Dict[str, Histogram] = {}
+        self._counters: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, stage: str, seconds: float) -> None:
+        """
+        処理段階の所要時間を記録する
+
+        Args:
+            stage: 処理段階の名前（例: "synthesize"）
+            seconds: 所要時間（秒）
+        """
+        with self._lock:
+            histogram = self._stages.get(stage)
+            if histogram is None:
+                histogram = self._stages[stage] = Histogram()
+            histogram.observe(seconds)
+
+    def observe_ratio(self, name: str, value: float) -> None:
+        """
+        比率（実時間比など）を記録する
+
+        Args:
+            name: 比率の名前（例: "real_time_factor"）
+            value: 値
+        """
+        with self._lock:
+            histogram = self._ratios.get(name)
+            if histogram is None:
+                histogram = self._ratios[name] = Histogram(RATIO_BUCKETS)
+            histogram.observe(value)
+
+    def inc(self, name: str, value: float = 1) -> None:
+        """
+        カウンターを加算する
+
+        Args:
+            name: カウンターの名前（例: "characters"）
+            value: 加算する値
+        """
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+
+    @contextmanager
+    def timer(self, stage: str) -> Iterator[None]:
+        """
+        ブロックの所要時間を処理段階の時間として記録する
+
+        Args:
+            stage: 処理段階の名前
+        """
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - started)
+
+    def record_synthesis(self, characters: int, audio_seconds: float, elapsed: float) -> None:
+        """
+        1件の音声合成の結果を記録する
+
+        Args:
+            characters: 入力テキストの文字数
+            audio_seconds: 生成した音声の長さ（秒）
+            elapsed: 合成にかかった時間（秒）
+        """
+        with self._lock:
+            for name, value in (
+                ("characters", characters),
+                ("audio_seconds", audio_seconds),
+                ("synthesis_seconds", elapsed),
+            ):
+                self._counters[name] = self._counters.get(name, 0) + value
+        if audio_seconds > 0:
+            self.observe_ratio("real_time_factor", elapsed / audio_seconds)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        すべてのメトリクスを取得する
+
+        Returns:
+            Dict[str, Any]: カウンター、派生値（文字/秒・実時間比）、処理段階ごとの集計
+        """
+        with self._lock:
+            counters = dict(self._counters)
+            stages = {name: hist.snapshot() for name, hist in sorted(self._stages.items())}
+            ratios = {name: hist.snapshot() for name, hist in sorted(self._ratios.items())}
+
+        synthesis_seconds = counters.get("synthesis_seconds", 0)
+        audio_seconds = counters.get("audio_seconds", 0)
+        return {
+            "uptime_seconds": time.time() - self.started_at,
+            "counters": counters,
+            "chars_per_second": (
+                counters.get("characters", 0) / synthesis_seconds if synthesis_seconds else 0.0
+            ),
+            "real_time_factor": synthesis_seconds / audio_seconds if audio_seconds else 0.0,
+            "stages": stages,
+            "ratios": ratios,
+        }
+
+    def prometheus(self) -> str:
+        """
+        Prometheusのテキスト形式でメトリクスを出力する
+
+        Returns:
+            str: text/plain; version=0.0.4 形式のテキスト
+        """
+        ns = self.namespace
+        lines: List[str] = []
+        with self._lock:
+            for name, value in sorted(self._counters.items()):
+                lines.append(f"# TYPE {ns}_{name}_total counter")
+                lines.append(f"{ns}_{name}_total {value}")
+            for metric, label, histograms in (
+                (f"{ns}_stage_seconds", "stage", self._stages),
+                (f"{ns}_ratio", "name", self._ratios),
+            ):
+                if not histograms:
+                    continue
+                lines.append(f"# TYPE {metric} histogram")
+                for name, hist in sorted(histograms.items()):
+                    cumulative = 0
+                    for bound, count in zip(hist.buckets, hist.bucket_counts):
+                        cumulative += count
+                        lines.append(f'{metric}_bucket{{{label}="{name}",le="{bound}"}} {cumulative}')
+                    lines.append(f'{metric}_bucket{{{label}="{name}",le="+Inf"}} {hist.count}')
+                    lines.append(f'{metric}_sum{{{label}="{name}"}} {hist.sum}')
+                    lines.append(f'{metric}_count{{{label}="{name}"}} {hist.count}')
+        return "\n".join(lines) + "\n"
+
+    def reset(self) -> None:
+        """すべてのメトリクスを初期化する"""
+        with self._lock:
+            self._stages.clear()
+            self._ratios.clear()
+            self._counters.clear()
+            self.started_at = time.time()
+
+    def _after_fork_in_child(self) -> None:
+        """
+        fork後の子プロセスでロックを作り直す
+
+        forkした時点で他のスレッドがロックを取得していると、子プロセスではロックが解放されないまま残り、
+        最初の記録で停止してしまうためです。
+        """
+        self._lock = threading.Lock()
+
+
+# プロセス全体で共有するメトリクス
+metrics = Metrics()
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=metrics._after_fork_in_child)
@@ -3,6 +3,7 @@ Kokoro MCP Server implementation - Enhanced Version
 """
 
 import os
+import argparse
 import json
 import logging
 import asyncio
@@ -12,15 +13,43 @@ import sys
 import platform
 import shutil
 import signal
-from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+import time
+from importlib import metadata
+from urllib.parse import parse_qs, urlsplit
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence, Tuple, Union
 from mcp.server.models import InitializationOptions
 import mcp.types as types
 from mcp.server import NotificationOptions, Server
 from pydantic import AnyUrl
 import mcp.server.stdio
 from pathlib import Path
-from .kokoro.kokoro import KokoroTTSService
-from .kokoro.base import TTSRequest
+from .kokoro.base import (
+    MAX_PHONEMES,
+    BaseTTSService,
+    CancellationToken,
+    SynthesisCancelled,
+    TTSRequest,
+)
+from .kokoro.voices import VOICES, all_voices
+from .audio import (
+    AUDIO_FORMATS,
+    BITRATE_MODES,
+    DEFAULT_FORMAT,
+    DEFAULT_SAMPLE_RATE,
+    RESAMPLERS,
+    SUPPORTED_SAMPLE_RATES,
+    get_audio_format,
+    read_file_base64,
+    resolve_sample_rate,
+)
+from .history import AudioHistory
+from .metrics import metrics
+from .cache import CachedTTSService, PhonemeCache, SegmentCache, SynthesisCache, request_key
+from .coalesce import SingleFlight
+from .document import DocumentSynthesisError, chunk_document, synthesize_document
+from .storage import AudioStore
+from .transport import DEFAULT_TRANSPORT, TRANSPORTS, create_http_app, serve_http
+from .worker import DEFAULT_PRIORITY, PRIORITIES, QueueFullError, SynthesisExecutor
 
 
 # ログの準備
@@ -38,16 +67,329 @@ elif os.path.exists('/etc/mecabrc'):
 # fugashiのフォールバック設定
 os.environ['FUGASHI_ENABLE_FALLBACK'] = '1'
 
-# TTSサービスの初期化
-tts_service = KokoroTTSService()
+def _env_int(name: str, default: int) -> int:
+    """環境変数を整数として読み込む（未設定・不正値の場合はデフォルト値）"""
+    value = os.environ.get(name)
+    if value is None or value.strip() == "":
+        return default
+    try:
+        return int(value)
+    except ValueError:
+        logger.warning(f"環境変数 {name} の値が不正です: {value!r}（{default} を使用します）")
+        return default
+
+def _env_float(name: str, default: float) -> float:
+    """環境変数を小数として読み込む（未設定・不正値の場合はデフォルト値）"""
+    value = os.environ.get(name)
+    if value is None or value.strip() == "":
+        return default
+    try:
+        return float(value)
+    except ValueError:
+        logger.warning(f"環境変数 {name} の値が不正です: {value!r}（{default} を使用します）")
+        return default
+
+def _env_bool(name: str, default: bool) -> bool:
+    """環境変数を真偽値として読み込む（未設定の場合はデフォルト値）"""
+    value = os.environ.get(name)
+    if value is None or value.strip() == "":
+        return default
+    return value.strip().lower() not in ("0", "false", "no", "off")
+
+# 合成キャッシュ（TTS_CACHE=false でファイルキャッシュを無効化）
+segment_cache = SegmentCache(max_bytes=_env_int("TTS_SEGMENT_CACHE_MB", 64) * 1024 * 1024)
+
+def _g2p_version() -> str:
+    """G2Pの結果に影響するパッケージのバージョンを取得する（音素キャッシュのキーに使う）"""
+    versions = []
+    for name in ("kokoro", "misaki"):
+        try:
+            versions.append(f"{name}={metadata.version(name)}")
+        except metadata.PackageNotFoundError:
+            versions.append(f"{name}=unknown")
+    return ",".join(versions)
+
+# G2P結果の永続キャッシュ（TTS_PHONEME_CACHE=false で無効化）
+phoneme_cache: Optional[PhonemeCache] = None
+if _env_bool("TTS_PHONEME_CACHE", True):
+    phoneme_cache = PhonemeCache(
+        db_path=os.environ.get("TTS_PHONEME_CACHE_DB", "output/phonemes.sqlite3"),
+        max_entries=_env_int("TTS_PHONEME_CACHE_MAX_ENTRIES", 100000),
+        version=_g2p_version(),
+    )
+synthesis_cache: Optional[SynthesisCache] = None
+if _env_bool("TTS_CACHE", True):
+    synthesis_cache = SynthesisCache(
+        cache_dir=os.environ.get("TTS_CACHE_DIR", "output/cache"),
+        max_entries=_env_int("TTS_CACHE_MAX_ENTRIES", 512),
+        max_bytes=_env_int("TTS_CACHE_MAX_MB", 256) * 1024 * 1024,
+    )
+
+# TTSサービスはサーバー起動後にバックグラウンドで読み込む
+tts_service: Optional[BaseTTSService] = None
+_tts_load_task: Optional[asyncio.Task] = None
+_tts_status: Dict[str, Any] = {"state": "pending"}
+
+# ワーカープロセス数（0の場合はサーバーのプロセス内で推論する）
+TTS_PROCESSES = _env_int("TTS_PROCESSES", 0)
+
+# 音声合成用ワーカープール（TTS_WORKERS: 同時実行数, TTS_MAX_QUEUE: 待ち行列の上限,
+# TTS_MAX_QUEUED_CHARS: 待機中の文字数の上限, TTS_AGING_CHARS_PER_SEC: 待ち時間による順位の繰り上げ）
+synthesis_executor = SynthesisExecutor(
+    max_workers=_env_int("TTS_WORKERS", max(TTS_PROCESSES, 2)),
+    max_queue=_env_int("TTS_MAX_QUEUE", 16),
+    max_queued_chars=_env_int("TTS_MAX_QUEUED_CHARS", 20000),
+    aging_chars_per_second=_env_float("TTS_AGING_CHARS_PER_SEC", 100.0),
+)
+
+# 同じ内容の実行中リクエストを1回の合成にまとめる（TTS_COALESCE=false で無効）
+single_flight: Optional[SingleFlight] = SingleFlight() if _env_bool("TTS_COALESCE", True) else None
 
 # MCPサーバーの設定
 server = Server("kokoro-mcp-server")
 
+# 生成した音声ファイルの保存先（内容のハッシュ値でサブディレクトリに分散して配置）
+audio_store = AudioStore(os.environ.get("TTS_AUDIO_DIR", "output/audio"))
+
 # 状態管理のための変数
-generated_audio_files: List[Dict[str, Any]] = []
-last_audio_file: Optional[str] = None
-tts_settings: Dict[str, Any] = {"default_voice": "jf_alpha", "default_speed": 1.0}
+audio_history = AudioHistory(
+    db_path=os.environ.get("TTS_HISTORY_DB", "output/history.sqlite3"),
+    audio_dir=str(audio_store.root),
+    max_entries=_env_int("TTS_HISTORY_MAX_ENTRIES", 1000),
+    max_age_seconds=_env_int("TTS_HISTORY_MAX_AGE_HOURS", 24 * 7) * 3600,
+    max_bytes=_env_int("TTS_HISTORY_MAX_MB", 1024) * 1024 * 1024,
+    store=audio_store,
+)
+
+# 音声ディレクトリ全体の容量と保存期間（履歴にないファイルも含む）を確認する間隔と上限
+# （TTS_JANITOR_INTERVAL_SECONDS=0 で無効。上限のデフォルトは履歴の上限と同じ）
+JANITOR_INTERVAL = _env_int("TTS_JANITOR_INTERVAL_SECONDS", 300)
+AUDIO_MAX_BYTES = _env_int("TTS_AUDIO_MAX_MB", _env_int("TTS_HISTORY_MAX_MB", 1024)) * 1024 * 1024
+AUDIO_MAX_AGE_SECONDS = _env_int(
+    "TTS_AUDIO_MAX_AGE_HOURS", _env_int("TTS_HISTORY_MAX_AGE_HOURS", 24 * 7)
+) * 3600
+_janitor_task: Optional[asyncio.Task] = None
+
+# リソース一覧に含める履歴の件数（それより古い履歴は history://list で取得する）
+HISTORY_PAGE_SIZE = _env_int("TTS_HISTORY_PAGE_SIZE", 20)
+
+# リソース一覧の変更通知をまとめる間隔（秒）
+LIST_CHANGED_INTERVAL = _env_int("TTS_LIST_CHANGED_INTERVAL_MS", 1000) / 1000
+_pending_list_changed: Dict[int, asyncio.Task] = {}
+tts_settings: Dict[str, Any] = {
+    "default_voice": "jf_alpha",
+    "default_speed": 1.0,
+    "default_sample_rate": DEFAULT_SAMPLE_RATE,
+    "default_format": DEFAULT_FORMAT,
+    "default_quality": None,
+    "default_response": "inline",
+    # 合成の期限（ミリ秒、Noneで期限なし。TTS_TIMEOUT_MS）
+    "default_timeout_ms": _env_int("TTS_TIMEOUT_MS", 0) or None,
+}
+
+# イベントループの遅延を計測する間隔（秒、TTS_LOOP_LAG_INTERVAL_MS=0 で無効）
+LOOP_LAG_INTERVAL = _env_int("TTS_LOOP_LAG_INTERVAL_MS", 100) / 1000
+_loop_lag_task: Optional[asyncio.Task] = None
+
+# 範囲指定の読み込みで1回に返す最大サイズ（TTS_RESOURCE_CHUNK_KB）
+RESOURCE_CHUNK_SIZE = _env_int("TTS_RESOURCE_CHUNK_KB", 256) * 1024
+
+# トランスポート（TTS_TRANSPORT: stdio または http）とHTTPの待ち受け設定
+TRANSPORT = os.environ.get("TTS_TRANSPORT", DEFAULT_TRANSPORT)
+HTTP_HOST = os.environ.get("TTS_HTTP_HOST", "127.0.0.1")
+HTTP_PORT = _env_int("TTS_HTTP_PORT", _env_int("PORT", 8080))
+HTTP_KEEPALIVE = _env_float("TTS_HTTP_KEEPALIVE_SECONDS", 75.0)
+
+# 音声のダウンロードURLのベース（HTTPトランスポートで TTS_PUBLIC_URL を指定した場合のみ設定。
+# 指定しない場合はリクエストのHostヘッダーから求める）
+public_base_url: Optional[str] = None
+
+# text-to-speech-document のチャンクの目標文字数と、1回に指定できる文字数
+DOCUMENT_CHUNK_CHARS = _env_int("TTS_DOCUMENT_CHUNK_CHARS", 400)
+DOCUMENT_MAX_CHARS = _env_int("TTS_DOCUMENT_MAX_CHARS", 200000)
+
+# text-to-speech-batch で1回に指定できる件数と合計文字数
+BATCH_MAX_ITEMS = _env_int("TTS_BATCH_MAX_ITEMS", 64)
+BATCH_MAX_CHARS = _env_int("TTS_BATCH_MAX_CHARS", 20000)
+
+# ツールの応答方式（inline: 音声データを含める, reference: リソースURIとメタデータのみ）
+RESPONSE_MODES = ("inline", "reference")
+
+def _create_tts_service() -> BaseTTSService:
+    """
+    TTSサービスを作成する（ワーカースレッド上で実行される）
+
+    MOCK_TTS=true の場合はモックサービスを使用し、
+    TTS_WARMUP=true の場合は短いテキストで一度合成してから返します。
+
+    Returns:
+        BaseTTSService: 作成したTTSサービス
+    """
+    service: BaseTTSService
+    if _env_bool("MOCK_TTS", False):
+        from .kokoro.mock import MockKokoroTTSService
+        seed = _env_int("MOCK_TTS_SEED", -1)
+        service = MockKokoroTTSService(
+            char_cost_ms=_env_float("MOCK_TTS_CHAR_COST_MS", 2.0),
+            segment_cost_ms=_env_float("MOCK_TTS_SEGMENT_COST_MS", 10.0),
+            jitter=_env_float("MOCK_TTS_JITTER", 0.1),
+            failure_rate=_env_float("MOCK_TTS_FAILURE_RATE", 0.0),
+            busy=_env_bool("MOCK_TTS_BUSY", False),
+            seed=seed if seed >= 0 else None,
+            audio_store=audio_store,
+        )
+    else:
+        from .kokoro.kokoro import KokoroTTSService
+        resampler = os.environ.get("TTS_RESAMPLER", "polyphase")
+        if resampler not in RESAMPLERS:
+            logger.warning(f"未知のリサンプラーです: {resampler!r}（polyphase を使用します）")
+            resampler = "polyphase"
+        options = {
+            "segment_cache": segment_cache,
+            "phoneme_cache": phoneme_cache,
+            "resampler": resampler,
+            "max_pipelines": _env_int("TTS_MAX_PIPELINES", 3),
+            "pipeline_idle_seconds": _env_int("TTS_PIPELINE_IDLE_SECONDS", 600),
+            "audio_store": audio_store,
+        }
+        if TTS_PROCESSES > 0:
+            # モデルを読み込んだ後にワーカープロセスをforkし、重みを共有したまま並列に推論する
+            from .kokoro.prefork import PreforkTTSService
+            service = PreforkTTSService(
+                processes=TTS_PROCESSES,
+                threads_per_process=_env_int("TTS_THREADS_PER_PROCESS", 0) or None,
+                segment_timeout=_env_float("TTS_WORKER_TIMEOUT_SECONDS", 120.0),
+                **options,
+            )
+        else:
+            service = KokoroTTSService(**options)
+
+    if _env_bool("TTS_WARMUP", False):
+        logger.info("TTSサービスのウォームアップを実行します")
+        service.warmup()
+
+    if synthesis_cache is not None:
+        service = CachedTTSService(service, synthesis_cache, audio_store)
+    return service
+
+async def _load_tts_service() -> BaseTTSService:
+    """TTSサービスを読み込み、状態を更新する"""
+    global tts_service
+
+    started = time.monotonic()
+    _tts_status.update({"state": "loading", "started_at": time.time()})
+    try:
+        loop = asyncio.get_running_loop()
+        service = await loop.run_in_executor(None, _create_tts_service)
+    except Exception as e:
+        logger.error(f"TTSサービスの読み込みに失敗しました: {e}", exc_info=True)
+        _tts_status.update({"state": "error", "error": str(e)})
+        raise
+
+    tts_service = service
+    _tts_status.update({"state": "ready", "load_seconds": time.monotonic() - started})
+    logger.info(f"TTSサービスの読み込みが完了しました（{_tts_status['load_seconds']:.2f}秒）")
+    return service
+
+def start_tts_loading() -> asyncio.Task:
+    """
+    TTSサービスのバックグラウンド読み込みを開始する（既に開始済みの場合は何もしない）
+
+    Returns:
+        asyncio.Task: 読み込みタスク
+    """
+    global _tts_load_task
+    if _tts_load_task is None:
+        _tts_load_task = asyncio.create_task(_load_tts_service())
+    return _tts_load_task
+
+async def _monitor_event_loop_lag(interval: float) -> None:
+    """
+    一定間隔でスリープし、予定より遅れて再開した時間をイベントループの遅延として記録する
+
+    Args:
+        interval: 計測間隔（秒）
+    """
+    while True:
+        started = time.perf_counter()
+        await asyncio.sleep(interval)
+        metrics.observe("event_loop_lag", max(time.perf_counter() - started - interval, 0.0))
+
+def _clean_audio_files() -> None:
+    """
+    期限切れの履歴と、音声ディレクトリの容量・保存期間の上限を超えたファイルを削除する
+
+    保存先から削除したファイルを参照している履歴も削除します。
+    """
+    removed_entries = audio_history.enforce_retention()
+    forgotten = []
+    result = audio_store.sweep(
+        AUDIO_MAX_BYTES,
+        AUDIO_MAX_AGE_SECONDS,
+        on_remove=lambda paths: forgotten.append(audio_history.forget_files(paths)),
+    )
+    metrics.inc("janitor_removed_files", result["removed"])
+    removed_entries += sum(forgotten)
+    if removed_entries:
+        logger.info(f"期限切れの履歴を{removed_entries}件削除しました")
+
+async def _run_janitor(interval: float) -> None:
+    """
+    一定間隔で音声ファイルの掃除をワーカースレッド上で実行する
+
+    Args:
+        interval: 実行間隔（秒）
+    """
+    loop = asyncio.get_running_loop()
+    while True:
+        try:
+            await loop.run_in_executor(None, _clean_audio_files)
+        except Exception as e:
+            logger.warning(f"音声ファイルの掃除に失敗しました: {e}")
+        await asyncio.sleep(interval)
+
+def start_janitor() -> Optional[asyncio.Task]:
+    """
+    音声ファイルの定期的な掃除を開始する（既に開始済み・無効の場合は何もしない）
+
+    Returns:
+        Optional[asyncio.Task]: 掃除タスク（無効の場合はNone）
+    """
+    global _janitor_task
+    if _janitor_task is None and JANITOR_INTERVAL > 0:
+        _janitor_task = asyncio.create_task(_run_janitor(JANITOR_INTERVAL))
+    return _janitor_task
+
+def start_loop_lag_monitor() -> Optional[asyncio.Task]:
+    """
+    イベントループの遅延の計測を開始する（既に開始済み・無効の場合は何もしない）
+
+    Returns:
+        Optional[asyncio.Task]: 計測タスク（無効の場合はNone）
+    """
+    global _loop_lag_task
+    if _loop_lag_task is None and LOOP_LAG_INTERVAL > 0:
+        _loop_lag_task = asyncio.create_task(_monitor_event_loop_lag(LOOP_LAG_INTERVAL))
+    return _loop_lag_task
+
+async def get_tts_service() -> BaseTTSService:
+    """
+    読み込みが完了したTTSサービスを取得する（読み込み中の場合は完了を待つ）
+
+    Returns:
+        BaseTTSService: TTSサービス
+
+    Raises:
+        ValueError: TTSサービスの読み込みに失敗した場合
+    """
+    if tts_service is not None:
+        return tts_service
+    try:
+        return await asyncio.shield(start_tts_loading())
+    except asyncio.CancelledError:
+        raise
+    except Exception as e:
+        raise ValueError(f"TTS service is not available: {e}") from e
 
 def validate_tts_arguments(arguments: dict) -> bool:
     """
@@ -79,6 +421,24 @@ def validate_tts_arguments(arguments: dict) -> bool:
             logger.error("speedは正の数値である必要があります")
             return False
             
+    if 'sample_rate' in arguments and arguments['sample_rate'] not in SUPPORTED_SAMPLE_RATES:
+        logger.error(f"sample_rateは {SUPPORTED_SAMPLE_RATES} のいずれかである必要があります")
+        return False
+        
+    if 'format' in arguments and arguments['format'] not in AUDIO_FORMATS:
+        logger.error(f"formatは {list(AUDIO_FORMATS)} のいずれかである必要があります")
+        return False
+        
+    if 'quality' in arguments and arguments['quality'] is not None:
+        quality = arguments['quality']
+        if not isinstance(quality, (int, float)) or not 0.0 <= quality <= 1.0:
+            logger.error("qualityは0.0〜1.0の数値である必要があります")
+            return False
+            
+    if 'bitrate_mode' in arguments and arguments['bitrate_mode'] not in (None, *BITRATE_MODES):
+        logger.error(f"bitrate_modeは {BITRATE_MODES} のいずれかである必要があります")
+        return False
+            
     return True
 
 def list_available_voices() -> List[str]:
@@ -88,13 +448,16 @@ def list_available_voices() -> List[str]:
     Returns:
         List[str]: 利用可能な音声のリスト
     """
-    return ["jf_alpha"]
+    return all_voices()
 
 @server.list_resources()
 async def handle_list_resources() -> list[types.Resource]:
     """
     利用可能なTTSリソースの一覧を取得する
+    
+    生成済み音声は新しいものから HISTORY_PAGE_SIZE 件だけを含めます。
     """
+    recent_files = audio_history.recent(HISTORY_PAGE_SIZE)
     resources = [
         types.Resource(
             uri=AnyUrl("voices://available"),
@@ -106,29 +469,121 @@ async def handle_list_resources() -> list[types.Resource]:
             uri=AnyUrl("audio://recent"),
             name="Recent Audio",
             description="Most recently generated audio file",
-            mimeType="audio/wav",
+            mimeType=(
+                recent_files[0]["mime_type"]
+                if recent_files
+                else get_audio_format(tts_settings["default_format"]).mime_type
+            ),
+        ),
+        types.Resource(
+            uri=AnyUrl("history://list"),
+            name="Audio History",
+            description="Paginated audio history (use ?cursor=&limit=)",
+            mimeType="application/json",
         ),
         types.Resource(
             uri=AnyUrl("settings://tts"),
             name="TTS Settings",
             description="Current TTS settings",
             mimeType="application/json",
+        ),
+        types.Resource(
+            uri=AnyUrl("status://tts"),
+            name="TTS Status",
+            description="Readiness of the TTS model (pending/loading/ready/error)",
+            mimeType="application/json",
+        ),
+        types.Resource(
+            uri=AnyUrl("cache://tts"),
+            name="TTS Cache Stats",
+            description="Synthesis cache hit/miss counters",
+            mimeType="application/json",
+        ),
+        types.Resource(
+            uri=AnyUrl("metrics://tts"),
+            name="TTS Metrics",
+            description="Per-stage latency percentiles, chars/sec and real-time factor",
+            mimeType="application/json",
+        ),
+        types.Resource(
+            uri=AnyUrl("metrics://tts?format=prometheus"),
+            name="TTS Metrics (Prometheus)",
+            description="The same metrics in Prometheus text exposition format",
+            mimeType="text/plain",
         )
     ]
     
     # 生成済み音声ファイルをリソースとして追加
-    for idx, audio_file in enumerate(generated_audio_files):
+    for audio_file in recent_files:
+        idx = audio_file["id"]
         resources.append(
             types.Resource(
                 uri=AnyUrl(f"audio://history/{idx}"),
                 name=f"Audio File {idx}",
                 description=f"Generated audio for: {audio_file.get('text', '')[:30]}...",
-                mimeType="audio/wav",
+                mimeType=audio_file.get("mime_type", "audio/wav"),
             )
         )
     
     return resources
 
+@server.list_resource_templates()
+async def handle_list_resource_templates() -> list[types.ResourceTemplate]:
+    """
+    リソーステンプレートの一覧を取得する
+    """
+    return [
+        types.ResourceTemplate(
+            uriTemplate="audio://history/{id}",
+            name="Audio History Entry",
+            description="Generated audio by history id (supports ?offset=&length= or ?chunk=)",
+        )
+    ]
+
+def _read_audio_resource(
+    file_path: str, metadata: Dict[str, Any], query: Dict[str, str]
+) -> Dict[str, Any]:
+    """
+    履歴の音声ファイルを読み込み、リソースの内容を作成する
+
+    クエリに offset/length または chunk（と任意の chunk_size）が指定されている場合は、
+    その範囲だけを読み込みます。指定がない場合はファイル全体を返します。
+
+    Args:
+        file_path: 音声ファイルのパス
+        metadata: 音声ファイルのメタデータ
+        query: URIのクエリパラメータ
+
+    Returns:
+        Dict[str, Any]: base64エンコードされた音声データと範囲の情報
+    """
+    offset = 0
+    length: Optional[int] = None
+    if "chunk" in query:
+        chunk_size = min(int(query.get("chunk_size", RESOURCE_CHUNK_SIZE)), RESOURCE_CHUNK_SIZE)
+        if chunk_size <= 0:
+            raise ValueError("chunk_size must be positive")
+        offset = int(query["chunk"]) * chunk_size
+        length = chunk_size
+    elif "offset" in query or "length" in query:
+        offset = int(query.get("offset", 0))
+        length = min(int(query.get("length", RESOURCE_CHUNK_SIZE)), RESOURCE_CHUNK_SIZE)
+
+    audio_data, read_length, size = read_file_base64(file_path, offset, length)
+    content: Dict[str, Any] = {
+        "audio": audio_data,
+        "mimeType": metadata.get("mime_type", "audio/wav"),
+        "metadata": metadata,
+    }
+    if length is not None:
+        content.update({
+            "offset": offset,
+            "length": read_length,
+            "size": size,
+            "eof": offset + read_length >= size,
+        })
+    return content
+
 @server.read_resource()
 async def handle_read_resource(uri: AnyUrl) -> str:
     """
@@ -136,33 +591,78 @@ async def handle_read_resource(uri: AnyUrl) -> str:
     """
     if uri.scheme == "voices":
         voices = list_available_voices()
-        return json.dumps({"voices": voices})
+        return json.dumps({"voices": voices, "languages": VOICES})
     
     elif uri.scheme == "audio":
-        if uri.path and uri.path.startswith("/history/"):
+        parts = urlsplit(str(uri))
+        path = f"/{parts.netloc}{parts.path}"
+        if path.startswith("/history/"):
             try:
-                idx = int(uri.path.split("/")[-1])
-                if 0 <= idx < len(generated_audio_files):
-                    file_path = generated_audio_files[idx].get("file_path")
+                idx = int(path.split("/")[-1])
+                query = {key: values[-1] for key, values in parse_qs(parts.query).items()}
+                metadata = audio_history.get(idx)
+                if metadata is not None:
+                    file_path = metadata.get("file_path")
                     if file_path and os.path.exists(file_path):
-                        with open(file_path, "rb") as f:
-                            audio_data = base64.b64encode(f.read()).decode("utf-8")
-                        return json.dumps({"audio": audio_data, "metadata": generated_audio_files[idx]})
+                        return json.dumps(_read_audio_resource(file_path, metadata, query))
                 return json.dumps({"error": "Audio file not found"})
             except (ValueError, IndexError):
                 return json.dumps({"error": "Invalid audio index"})
         
         # 最近生成された音声ファイル
-        if last_audio_file and os.path.exists(last_audio_file):
-            with open(last_audio_file, "rb") as f:
-                audio_data = base64.b64encode(f.read()).decode("utf-8")
-            return json.dumps({"audio": audio_data})
+        latest = audio_history.latest()
+        if latest and os.path.exists(latest["file_path"]):
+            audio_data, _, _ = read_file_base64(latest["file_path"])
+            return json.dumps({"audio": audio_data, "mimeType": latest["mime_type"]})
         else:
             return json.dumps({"error": "No recent audio files found"})
     
+    elif uri.scheme == "history":
+        query = {key: values[-1] for key, values in parse_qs(urlsplit(str(uri)).query).items()}
+        try:
+            cursor = int(query["cursor"]) if "cursor" in query else None
+            limit = min(max(int(query.get("limit", HISTORY_PAGE_SIZE)), 1), 500)
+        except ValueError:
+            return json.dumps({"error": "Invalid cursor or limit"})
+        entries, next_cursor = audio_history.page(cursor, limit)
+        return json.dumps({
+            "entries": [{**entry, "uri": f"audio://history/{entry['id']}"} for entry in entries],
+            "nextCursor": next_cursor,
+            "stats": audio_history.stats(),
+        })
+    
     elif uri.scheme == "settings":
         return json.dumps(tts_settings)
     
+    elif uri.scheme == "status":
+        status = dict(_tts_status)
+        pipelines = getattr(tts_service, "pipelines", None)
+        if pipelines is not None:
+            status["pipelines"] = pipelines.stats()
+        worker_stats = getattr(tts_service, "worker_stats", None)
+        if worker_stats is not None:
+            status["processes"] = worker_stats()
+        status["storage"] = audio_store.stats()
+        return json.dumps(status)
+    
+    elif uri.scheme == "cache":
+        stats: Dict[str, Any] = {"segments": segment_cache.stats()}
+        if phoneme_cache is not None:
+            stats["phonemes"] = phoneme_cache.stats()
+        if single_flight is not None:
+            stats["coalescing"] = single_flight.stats()
+        if synthesis_cache is None:
+            stats["enabled"] = False
+        else:
+            stats.update({"enabled": True, **synthesis_cache.stats()})
+        return json.dumps(stats)
+    
+    elif uri.scheme == "metrics":
+        query = parse_qs(urlsplit(str(uri)).query)
+        if query.get("format", ["json"])[-1] == "prometheus":
+            return metrics.prometheus()
+        return json.dumps({**metrics.snapshot(), "executor": synthesis_executor.stats()})
+    
     else:
         raise ValueError(f"Unsupported URI scheme: {uri.scheme}")
 
@@ -181,6 +681,122 @@ async def handle_list_tools() -> list[types.Tool]:
                     "text": {"type": "string"},
                     "voice": {"type": "string", "default": "jf_alpha"},
                     "speed": {"type": "number", "default": 1.0},
+                    "sample_rate": {
+                        "type": "integer",
+                        "enum": list(SUPPORTED_SAMPLE_RATES),
+                        "default": DEFAULT_SAMPLE_RATE,
+                        "description": "Output sample rate (24000 skips resampling)",
+                    },
+                    "format": {
+                        "type": "string",
+                        "enum": list(AUDIO_FORMATS),
+                        "default": DEFAULT_FORMAT,
+                        "description": "Output codec (wav/flac/ogg/opus/mp3)",
+                    },
+                    "quality": {
+                        "type": "number",
+                        "minimum": 0.0,
+                        "maximum": 1.0,
+                        "description": "Encoder quality for compressed formats (higher = larger, better)",
+                    },
+                    "bitrate_mode": {
+                        "type": "string",
+                        "enum": list(BITRATE_MODES),
+                        "description": "Bitrate mode for lossy formats",
+                    },
+                    "response": {
+                        "type": "string",
+                        "enum": list(RESPONSE_MODES),
+                        "description": "inline: embed base64 audio; reference: return only the "
+                        "audio://history URI and metadata",
+                    },
+                    "phonemes": {
+                        "type": "array",
+                        "items": {"type": "string", "maxLength": MAX_PHONEMES},
+                        "description": "Precomputed phonemes (the ps values from G2P), one string per "
+                        "chunk; skips text-to-phoneme conversion. text is still used for history",
+                    },
+                    "stream": {
+                        "type": "boolean",
+                        "default": False,
+                        "description": "Send each synthesized segment as a progress notification "
+                        "(requires a progressToken)",
+                    },
+                    "timeout_ms": {
+                        "type": "integer",
+                        "minimum": 0,
+                        "description": "Stop synthesis after this many milliseconds, including "
+                        "queue wait (0 = no deadline; defaults to the server setting)",
+                    },
+                    "allow_partial": {
+                        "type": "boolean",
+                        "default": False,
+                        "description": "On timeout or cancellation, return the audio synthesized so "
+                        "far (marked truncated) instead of an error",
+                    },
+                    "priority": {
+                        "type": "string",
+                        "enum": list(PRIORITIES),
+                        "default": DEFAULT_PRIORITY,
+                        "description": "Scheduling class; interactive requests run before bulk ones",
+                    },
+                },
+                "required": ["text"],
+            },
+        ),
+        types.Tool(
+            name="text-to-speech-batch",
+            description="Convert multiple texts to speech in one call; returns audio://history URIs",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "items": {
+                        "type": "array",
+                        "maxItems": BATCH_MAX_ITEMS,
+                        "description": f"Texts to convert (at most {BATCH_MAX_CHARS} characters in total)",
+                        "items": {
+                            "type": "object",
+                            "properties": {
+                                "text": {"type": "string"},
+                                "voice": {"type": "string"},
+                                "speed": {"type": "number"},
+                            },
+                            "required": ["text"],
+                        },
+                    },
+                    "voice": {"type": "string", "description": "Default voice for all items"},
+                    "speed": {"type": "number", "description": "Default speed for all items"},
+                    "sample_rate": {"type": "integer", "enum": list(SUPPORTED_SAMPLE_RATES)},
+                    "format": {"type": "string", "enum": list(AUDIO_FORMATS)},
+                    "quality": {"type": "number", "minimum": 0.0, "maximum": 1.0},
+                    "priority": {"type": "string", "enum": list(PRIORITIES), "default": "bulk"},
+                },
+                "required": ["items"],
+            },
+        ),
+        types.Tool(
+            name="text-to-speech-document",
+            description="Convert a long multi-paragraph document to speech; chunks are synthesized "
+            "in parallel and stitched into one file",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "text": {"type": "string"},
+                    "voice": {"type": "string"},
+                    "speed": {"type": "number"},
+                    "sample_rate": {"type": "integer", "enum": list(SUPPORTED_SAMPLE_RATES)},
+                    "format": {"type": "string", "enum": list(AUDIO_FORMATS)},
+                    "quality": {"type": "number", "minimum": 0.0, "maximum": 1.0},
+                    "bitrate_mode": {"type": "string", "enum": list(BITRATE_MODES)},
+                    "response": {"type": "string", "enum": list(RESPONSE_MODES), "default": "reference"},
+                    "chunk_chars": {
+                        "type": "integer",
+                        "minimum": 50,
+                        "description": "Target characters per parallel chunk",
+                    },
+                    "sentence_pause_ms": {"type": "integer", "minimum": 0, "default": 300},
+                    "paragraph_pause_ms": {"type": "integer", "minimum": 0, "default": 800},
+                    "priority": {"type": "string", "enum": list(PRIORITIES), "default": "bulk"},
                 },
                 "required": ["text"],
             },
@@ -201,11 +817,346 @@ async def handle_list_tools() -> list[types.Tool]:
                 "properties": {
                     "default_voice": {"type": "string"},
                     "default_speed": {"type": "number", "minimum": 0.5, "maximum": 2.0},
+                    "default_sample_rate": {"type": "integer", "enum": list(SUPPORTED_SAMPLE_RATES)},
+                    "default_format": {"type": "string", "enum": list(AUDIO_FORMATS)},
+                    "default_quality": {"type": "number", "minimum": 0.0, "maximum": 1.0},
+                    "default_response": {"type": "string", "enum": list(RESPONSE_MODES)},
+                    "default_timeout_ms": {"type": "integer", "minimum": 0},
                 },
             },
         )
     ]
 
+def _notify_resource_list_changed() -> None:
+    """
+    現在のセッションにリソース一覧の変更を通知する
+
+    短時間に続けて呼び出された場合は、LIST_CHANGED_INTERVAL ごとに1回の通知にまとめます。
+    """
+    try:
+        session = server.request_context.session
+    except LookupError:
+        # リクエストの外（ベンチマークなどからの直接呼び出し）では通知先がない
+        return
+    key = id(session)
+    if key in _pending_list_changed:
+        return
+
+    async def send_later() -> None:
+        try:
+            await asyncio.sleep(LIST_CHANGED_INTERVAL)
+            await session.send_resource_list_changed()
+        except Exception as e:
+            logger.debug(f"リソース一覧の変更通知を送信できませんでした: {e}")
+        finally:
+            _pending_list_changed.pop(key, None)
+
+    _pending_list_changed[key] = asyncio.create_task(send_later())
+
+def _build_tts_request(arguments: Dict[str, Any]) -> TTSRequest:
+    """
+    ツールの引数を検証し、TTSリクエストを作成する（省略された値は現在の設定を使用）
+
+    Args:
+        arguments: ツールの引数
+
+    Returns:
+        TTSRequest: 作成したリクエスト
+
+    Raises:
+        ValueError: 引数が不正な場合
+    """
+    values = {
+        "text": arguments.get("text"),
+        "voice": arguments.get("voice", tts_settings["default_voice"]),
+        "speed": arguments.get("speed", tts_settings["default_speed"]),
+        "sample_rate": arguments.get("sample_rate", tts_settings["default_sample_rate"]),
+        "format": arguments.get("format", tts_settings["default_format"]),
+        "quality": arguments.get("quality", tts_settings["default_quality"]),
+        "bitrate_mode": arguments.get("bitrate_mode"),
+    }
+    if not validate_tts_arguments(values):
+        raise ValueError("Invalid arguments")
+
+    return TTSRequest(
+        text=values["text"],
+        voice=values["voice"],
+        speed=values["speed"],
+        sample_rate=values["sample_rate"],
+        audio_format=values["format"],
+        quality=values["quality"],
+        bitrate_mode=values["bitrate_mode"],
+    )
+
+def _audio_metadata(request: TTSRequest, file_path: str) -> Dict[str, Any]:
+    """
+    履歴に記録するメタデータを作成する
+
+    Args:
+        request: 生成に使用したリクエスト
+        file_path: 生成された音声ファイルのパス
+
+    Returns:
+        Dict[str, Any]: 履歴のメタデータ
+    """
+    audio_format = get_audio_format(request.audio_format)
+    return {
+        "text": request.text,
+        "voice": request.voice,
+        "speed": request.speed,
+        "format": audio_format.name,
+        "mime_type": audio_format.mime_type,
+        "file_path": file_path,
+    }
+
+def _audio_reference(entry: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    履歴のエントリから、音声データを含まない参照情報を作成する
+
+    Args:
+        entry: 履歴のエントリ
+
+    Returns:
+        Dict[str, Any]: リソースURIとメタデータ
+    """
+    reference = {
+        "uri": f"audio://history/{entry['id']}",
+        "mimeType": entry["mime_type"],
+        "size": entry["size"],
+        "chunkSize": RESOURCE_CHUNK_SIZE,
+        "voice": entry["voice"],
+        "speed": entry["speed"],
+        "format": entry["format"],
+    }
+    base_url = _audio_base_url()
+    name = audio_store.name_of(entry["file_path"])
+    if base_url and name:
+        # HTTPトランスポートでは音声をHTTPで直接ダウンロードできる（URLは内容のハッシュ値で推測できない）
+        reference["url"] = f"{base_url}/audio/{name}"
+    return reference
+
+def _audio_base_url() -> Optional[str]:
+    """
+    音声のダウンロードURLのベースを取得する
+
+    ``TTS_PUBLIC_URL`` が指定されていればそれを、指定されていなければ処理中のHTTPリクエストの
+    Hostヘッダーから求めたURLを使います（待ち受けアドレスが 0.0.0.0 の場合でもクライアントが接続できるURLになる）。
+
+    Returns:
+        Optional[str]: ベースURL（stdioトランスポートの場合はNone）
+    """
+    if public_base_url:
+        return public_base_url
+    try:
+        # リクエストコンテキストの request は mcp 1.10 以降にしかない
+        request = getattr(server.request_context, "request", None)
+    except (LookupError, AttributeError):
+        return None
+    base_url = getattr(request, "base_url", None)
+    return str(base_url).rstrip("/") if base_url is not None else None
+
+
+def _lookup_audio(name: str) -> Optional[Dict[str, Any]]:
+    """
+    音声のファイル名（内容のハッシュ値と拡張子）から、そのファイルを参照する履歴のエントリを取得する
+
+    Args:
+        name: 音声のファイル名
+
+    Returns:
+        Optional[Dict[str, Any]]: エントリ（ファイル名が正しくない場合や、履歴にない場合はNone）
+    """
+    path = audio_store.locate(name)
+    if path is None:
+        return None
+    return audio_history.find_by_path(str(path))
+
+def _get_phonemes(arguments: Dict[str, Any]) -> Optional[List[str]]:
+    """
+    ツールの引数から音素列を取得する
+
+    Args:
+        arguments: ツールの引数
+
+    Returns:
+        Optional[List[str]]: 音素列のリスト（指定されていない場合はNone）
+
+    Raises:
+        ValueError: 音素列が不正な場合
+    """
+    phonemes = arguments.get("phonemes")
+    if phonemes is None:
+        return None
+    if isinstance(phonemes, str):
+        phonemes = phonemes.splitlines()
+    if not isinstance(phonemes, list) or not all(isinstance(ps, str) for ps in phonemes):
+        raise ValueError("phonemes must be a list of strings")
+    phonemes = [ps.strip() for ps in phonemes if ps.strip()]
+    if not phonemes:
+        raise ValueError("phonemes must not be empty")
+    if any(len(ps) > MAX_PHONEMES for ps in phonemes):
+        raise ValueError(f"Each phoneme string must be at most {MAX_PHONEMES} characters")
+    return phonemes
+
+def _get_priority(arguments: Dict[str, Any], default: str) -> str:
+    """
+    ツールの引数から優先度クラスを取得する
+
+    Args:
+        arguments: ツールの引数
+        default: 省略時の優先度クラス
+
+    Returns:
+        str: 優先度クラス
+
+    Raises:
+        ValueError: 未知の優先度クラスが指定された場合
+    """
+    priority = arguments.get("priority", default)
+    if priority not in PRIORITIES:
+        raise ValueError(f"priority must be one of {list(PRIORITIES)}")
+    return priority
+
+def _shard_batch(requests: List[TTSRequest], shard_count: int) -> List[List[int]]:
+    """
+    バッチのリクエストをワーカー数以下のシャードに分ける
+
+    同じ音声・速度のリクエストが同じシャードに入りやすいよう並べ替えた上で、
+    各シャードの文字数がほぼ均等になるように区切ります。
+
+    Args:
+        requests: リクエストのリスト
+        shard_count: シャード数の上限
+
+    Returns:
+        List[List[int]]: シャードごとのリクエストのインデックス
+    """
+    order = sorted(
+        range(len(requests)), key=lambda i: (requests[i].voice or "", requests[i].speed or 1.0)
+    )
+    total_chars = sum(len(request.text) for request in requests)
+    target = max(total_chars / max(shard_count, 1), 1)
+
+    shards: List[List[int]] = [[]]
+    chars = 0
+    for index in order:
+        if chars >= target and len(shards) < shard_count:
+            shards.append([])
+            chars = 0
+        shards[-1].append(index)
+        chars += len(requests[index].text)
+    return shards
+
+def _get_progress_token() -> Optional[types.ProgressToken]:
+    """
+    現在のリクエストに付与されたprogressTokenを取得する
+
+    Returns:
+        Optional[types.ProgressToken]: progressToken（指定されていない場合はNone）
+    """
+    try:
+        meta = server.request_context.meta
+    except LookupError:
+        return None
+    return meta.progressToken if meta is not None else None
+
+def _encode_wav_chunk(audio: Any, sample_rate: int) -> str:
+    """
+    音声データをWAV形式でエンコードし、base64文字列に変換する
+
+    Args:
+        audio: 音声データ
+        sample_rate: サンプルレート
+
+    Returns:
+        str: base64エンコードされたWAVデータ
+    """
+    import io
+    import soundfile as sf
+
+    buffer = io.BytesIO()
+    sf.write(buffer, audio, sample_rate, format="WAV")
+    return base64.b64encode(buffer.getvalue()).decode("utf-8")
+
+def _make_chunk_callback(chunk_queue: asyncio.Queue) -> Any:
+    """
+    ワーカースレッドから呼ばれるon_chunkコールバックを作成する
+
+    エンコードはワーカースレッド上で行い、結果だけをイベントループのキューに渡します。
+
+    Args:
+        chunk_queue: チャンクを受け渡すキュー
+
+    Returns:
+        ChunkCallback: TTSRequest.on_chunk に設定するコールバック
+    """
+    loop = asyncio.get_running_loop()
+
+    def on_chunk(index: int, total: int, audio: Any, sample_rate: int) -> None:
+        chunk = {
+            "index": index,
+            "total": total,
+            "sampleRate": sample_rate,
+            "mimeType": "audio/wav",
+            "data": _encode_wav_chunk(audio, sample_rate),
+        }
+        loop.call_soon_threadsafe(chunk_queue.put_nowait, chunk)
+
+    return on_chunk
+
+async def _send_audio_chunks(
+    session: Any, progress_token: types.ProgressToken, chunk_queue: asyncio.Queue
+) -> None:
+    """
+    キューに届いた音声チャンクを順番に進捗通知としてクライアントに送信する
+
+    Args:
+        session: 送信先のセッション
+        progress_token: リクエストのprogressToken
+        chunk_queue: チャンクを受け取るキュー（Noneで終了）
+    """
+    while True:
+        chunk = await chunk_queue.get()
+        if chunk is None:
+            return
+        try:
+            await session.send_notification(
+                types.ServerNotification(
+                    types.ProgressNotification(
+                        method="notifications/progress",
+                        params=types.ProgressNotificationParams(
+                            progressToken=progress_token,
+                            progress=chunk["index"] + 1,
+                            total=chunk["total"],
+                            audio=chunk,
+                        ),
+                    )
+                )
+            )
+        except Exception as e:
+            logger.warning(f"音声チャンクの送信に失敗しました: {e}")
+
+def _make_progress_callback(
+    session: Any, progress_token: types.ProgressToken
+) -> Callable[[int, int], Awaitable[None]]:
+    """
+    進捗をクライアントに通知するコールバックを作成する
+
+    Args:
+        session: 送信先のセッション
+        progress_token: リクエストのprogressToken
+
+    Returns:
+        Callable[[int, int], Awaitable[None]]: (完了数, 総数) を受け取るコールバック
+    """
+    async def send_progress(done: int, total: int) -> None:
+        try:
+            await session.send_progress_notification(progress_token, done, total)
+        except Exception as e:
+            logger.debug(f"進捗通知を送信できませんでした: {e}")
+
+    return send_progress
+
 @server.call_tool()
 async def handle_call_tool(
     name: str, arguments: dict | None
@@ -213,46 +1164,245 @@ async def handle_call_tool(
     """
     ツールの実行リクエストを処理する
     """
-    global last_audio_file, tts_settings
+    global tts_settings
     
     if name == "text-to-speech":
         if not arguments:
             raise ValueError("Missing arguments")
             
-        text = arguments.get("text")
-        voice = arguments.get("voice", tts_settings["default_voice"])
-        speed = arguments.get("speed", tts_settings["default_speed"])
+        response_mode = arguments.get("response", tts_settings["default_response"])
+        if response_mode not in RESPONSE_MODES:
+            raise ValueError(f"response must be one of {list(RESPONSE_MODES)}")
         
-        if not validate_tts_arguments({"text": text, "voice": voice, "speed": speed}):
-            raise ValueError("Invalid arguments")
-            
-        request = TTSRequest(text=text, voice=voice, speed=speed)
-        success, file_path = tts_service.generate(request)
+        timeout_ms = arguments.get("timeout_ms", tts_settings["default_timeout_ms"])
+        if timeout_ms is not None and (not isinstance(timeout_ms, int) or timeout_ms < 0):
+            raise ValueError("timeout_ms must be a non-negative integer")
+        
+        priority = _get_priority(arguments, DEFAULT_PRIORITY)
+        request = _build_tts_request(arguments)
+        request.phonemes = _get_phonemes(arguments)
+        request.allow_partial = bool(arguments.get("allow_partial", False))
+        cancel_token = CancellationToken(timeout_ms / 1000 if timeout_ms else None)
+        request.cancel_token = cancel_token
+        progress_token = _get_progress_token()
+        chunk_sender: Optional[asyncio.Task] = None
+        if arguments.get("stream") and progress_token is not None:
+            chunk_queue: asyncio.Queue = asyncio.Queue()
+            request.on_chunk = _make_chunk_callback(chunk_queue)
+            chunk_sender = asyncio.create_task(
+                _send_audio_chunks(server.request_context.session, progress_token, chunk_queue)
+            )
+        elif arguments.get("stream"):
+            logger.debug("progressTokenが指定されていないため、ストリーミングを無効にします")
+
+        started = time.perf_counter()
+        metrics.inc("requests")
+        truncated: Optional[str] = None
+        try:
+            service = await get_tts_service()
+
+            async def run_synthesis() -> Tuple[bool, Optional[str]]:
+                try:
+                    return await synthesis_executor.submit(
+                        service.generate, request, priority=priority, cost=len(request.text)
+                    )
+                except asyncio.CancelledError:
+                    # クライアントのキャンセル（集約時は待っている全員のキャンセル）をワーカーに伝える
+                    cancel_token.cancel("cancelled")
+                    metrics.inc("cancelled")
+                    raise
+
+            if single_flight is not None and request.on_chunk is None:
+                # ストリーミングしないリクエストは、同時に届いた同じ内容のリクエストと結果を共有する
+                success, file_path = await single_flight.do(
+                    (request_key(request), timeout_ms, request.allow_partial), run_synthesis
+                )
+            else:
+                success, file_path = await run_synthesis()
+        except QueueFullError as e:
+            logger.warning(f"音声合成リクエストを拒否しました: {e}")
+            metrics.inc("rejected")
+            raise ValueError(str(e)) from e
+        except SynthesisCancelled as e:
+            if e.reason == "deadline_exceeded":
+                metrics.inc("timeouts")
+            if e.partial_path is None:
+                if e.reason == "deadline_exceeded":
+                    raise ValueError(f"Synthesis timed out after {timeout_ms} ms") from e
+                raise ValueError("Synthesis was cancelled") from e
+            success, file_path, truncated = True, e.partial_path, e.reason
+        finally:
+            if chunk_sender is not None:
+                chunk_queue.put_nowait(None)
+                await chunk_sender
         
         if success and file_path:
-            # 生成された音声ファイルを状態として記録
-            audio_metadata = {
-                "text": text,
-                "voice": voice,
-                "speed": speed,
-                "file_path": file_path,
-                "timestamp": asyncio.get_event_loop().time()
-            }
-            generated_audio_files.append(audio_metadata)
-            last_audio_file = file_path
+            # 生成された音声ファイルを状態として記録し、クライアントに状態変更を通知
+            entry = audio_history.add(_audio_metadata(request, file_path))
+            _notify_resource_list_changed()
+            
+            truncation = {"truncated": True, "reason": truncated} if truncated else {}
             
-            # クライアントに状態変更を通知
-            await server.request_context.session.send_resource_list_changed()
+            if response_mode == "reference":
+                metrics.observe("request", time.perf_counter() - started)
+                reference = {**_audio_reference(entry), **truncation}
+                return [types.TextContent(type="text", text=json.dumps(reference))]
             
-            with open(file_path, "rb") as f:
-                audio_data = base64.b64encode(f.read()).decode("utf-8")
-            return [types.ImageContent(type="image", data=audio_data)]
+            with metrics.timer("encode"):
+                audio_data, _, _ = read_file_base64(file_path)
+            metrics.observe("request", time.perf_counter() - started)
+            contents: list[types.TextContent | types.ImageContent | types.EmbeddedResource] = [
+                types.ImageContent(type="image", data=audio_data, mimeType=entry["mime_type"])
+            ]
+            if truncation:
+                contents.append(types.TextContent(type="text", text=json.dumps(truncation)))
+            return contents
         else:
             raise ValueError("Failed to generate audio")
             
+    elif name == "text-to-speech-batch":
+        if not arguments or not isinstance(arguments.get("items"), list) or not arguments["items"]:
+            raise ValueError("items must be a non-empty list")
+        if len(arguments["items"]) > BATCH_MAX_ITEMS:
+            raise ValueError(f"Too many items (limit {BATCH_MAX_ITEMS})")
+        
+        priority = _get_priority(arguments, "bulk")
+        shared = {key: value for key, value in arguments.items() if key != "items"}
+        requests = []
+        for item in arguments["items"]:
+            if not isinstance(item, dict):
+                raise ValueError("Each item must be an object")
+            requests.append(_build_tts_request({**shared, **item}))
+        if sum(len(request.text) for request in requests) > BATCH_MAX_CHARS:
+            raise ValueError(f"Batch is too long (limit {BATCH_MAX_CHARS} characters in total)")
+        
+        # シャードの1つが失敗・キャンセルされたら、実行中の他のシャードも止める
+        cancel_token = CancellationToken()
+        for request in requests:
+            request.cancel_token = cancel_token
+        try:
+            service = await get_tts_service()
+            shards = _shard_batch(requests, synthesis_executor.max_workers)
+            try:
+                # シャードの一部だけが受け付けられることのないよう、まとめて受け付けて待ち行列に入れる
+                shard_results = await synthesis_executor.submit_all(
+                    [
+                        (
+                            service.generate_batch,
+                            ([requests[i] for i in shard],),
+                            sum(len(requests[i].text) for i in shard),
+                        )
+                        for shard in shards
+                    ],
+                    priority=priority,
+                )
+            except BaseException:
+                cancel_token.cancel("cancelled")
+                raise
+        except QueueFullError as e:
+            logger.warning(f"バッチ音声合成リクエストを拒否しました: {e}")
+            metrics.inc("rejected")
+            raise ValueError(str(e)) from e
+        except SynthesisCancelled as e:
+            raise ValueError("Synthesis was cancelled") from e
+        
+        results: List[Dict[str, Any]] = [{} for _ in requests]
+        for shard, shard_result in zip(shards, shard_results):
+            for index, (success, file_path) in zip(shard, shard_result):
+                if success and file_path:
+                    entry = audio_history.add(_audio_metadata(requests[index], file_path))
+                    results[index] = {"index": index, "success": True, **_audio_reference(entry)}
+                else:
+                    results[index] = {"index": index, "success": False, "error": "Failed to generate audio"}
+        _notify_resource_list_changed()
+        
+        return [types.TextContent(type="text", text=json.dumps({"results": results}))]
+            
+    elif name == "text-to-speech-document":
+        if not arguments:
+            raise ValueError("Missing arguments")
+        response_mode = arguments.get("response", "reference")
+        if response_mode not in RESPONSE_MODES:
+            raise ValueError(f"response must be one of {list(RESPONSE_MODES)}")
+        request = _build_tts_request(arguments)
+        if len(request.text) > DOCUMENT_MAX_CHARS:
+            raise ValueError(f"Document is too long (limit {DOCUMENT_MAX_CHARS} characters)")
+        priority = _get_priority(arguments, "bulk")
+        chunk_chars = arguments.get("chunk_chars", DOCUMENT_CHUNK_CHARS)
+        sentence_pause_ms = arguments.get("sentence_pause_ms", 300)
+        paragraph_pause_ms = arguments.get("paragraph_pause_ms", 800)
+        if not isinstance(chunk_chars, int) or chunk_chars < 50:
+            raise ValueError("chunk_chars must be an integer of at least 50")
+        for pause in (sentence_pause_ms, paragraph_pause_ms):
+            if not isinstance(pause, (int, float)) or pause < 0:
+                raise ValueError("Pauses must be non-negative numbers of milliseconds")
+        
+        chunks = chunk_document(request.text, chunk_chars)
+        if not chunks:
+            raise ValueError("text must not be empty")
+        
+        audio_format = get_audio_format(request.audio_format)
+        sample_rate = resolve_sample_rate(audio_format, request.sample_rate or DEFAULT_SAMPLE_RATE)
+        progress_token = _get_progress_token()
+        on_progress = None
+        if progress_token is not None:
+            on_progress = _make_progress_callback(server.request_context.session, progress_token)
+        
+        started = time.perf_counter()
+        metrics.inc("documents")
+        cancel_token = CancellationToken()
+        try:
+            service = await get_tts_service()
+            result = await synthesize_document(
+                service,
+                synthesis_executor,
+                chunks,
+                audio_store,
+                sample_rate,
+                audio_format,
+                voice=request.voice,
+                speed=request.speed if request.speed is not None else 1.0,
+                quality=request.quality,
+                bitrate_mode=request.bitrate_mode,
+                resampler=getattr(service, "resampler", "polyphase"),
+                sentence_pause=sentence_pause_ms / 1000,
+                paragraph_pause=paragraph_pause_ms / 1000,
+                priority=priority,
+                cancel_token=cancel_token,
+                on_progress=on_progress,
+            )
+        except QueueFullError as e:
+            logger.warning(f"長文の音声合成リクエストを拒否しました: {e}")
+            metrics.inc("rejected")
+            raise ValueError(str(e)) from e
+        except SynthesisCancelled as e:
+            raise ValueError("Synthesis was cancelled") from e
+        except DocumentSynthesisError as e:
+            raise ValueError("Failed to generate audio") from e
+        
+        elapsed = time.perf_counter() - started
+        metrics.observe("document", elapsed)
+        metrics.record_synthesis(len(request.text), result["duration"], elapsed)
+        file_path = result.pop("file_path")
+        entry = audio_history.add(_audio_metadata(request, file_path))
+        _notify_resource_list_changed()
+        
+        if response_mode == "reference":
+            reference = {**_audio_reference(entry), **result}
+            return [types.TextContent(type="text", text=json.dumps(reference))]
+        audio_data, _, _ = read_file_base64(file_path)
+        return [
+            types.ImageContent(type="image", data=audio_data, mimeType=entry["mime_type"]),
+            types.TextContent(type="text", text=json.dumps(result)),
+        ]
+    
     elif name == "list-voices":
         voices = list_available_voices()
-        return [types.TextContent(type="text", text=json.dumps({"voices": voices}))]
+        return [
+            types.TextContent(
+                type="text", text=json.dumps({"voices": voices, "languages": VOICES})
+            )
+        ]
         
     elif name == "update-tts-settings":
         if not arguments:
@@ -267,9 +1417,39 @@ async def handle_call_tool(
             if not isinstance(speed, (int, float)) or speed < 0.5 or speed > 2.0:
                 raise ValueError("Speed must be a number between 0.5 and 2.0")
             tts_settings["default_speed"] = speed
+        
+        if "default_sample_rate" in arguments:
+            sample_rate = arguments["default_sample_rate"]
+            if sample_rate not in SUPPORTED_SAMPLE_RATES:
+                raise ValueError(f"Sample rate must be one of {list(SUPPORTED_SAMPLE_RATES)}")
+            tts_settings["default_sample_rate"] = sample_rate
+        
+        if "default_format" in arguments:
+            if arguments["default_format"] not in AUDIO_FORMATS:
+                raise ValueError(f"Format must be one of {list(AUDIO_FORMATS)}")
+            tts_settings["default_format"] = arguments["default_format"]
+        
+        if "default_quality" in arguments:
+            quality = arguments["default_quality"]
+            if quality is not None and (
+                not isinstance(quality, (int, float)) or not 0.0 <= quality <= 1.0
+            ):
+                raise ValueError("Quality must be a number between 0.0 and 1.0")
+            tts_settings["default_quality"] = quality
+        
+        if "default_response" in arguments:
+            if arguments["default_response"] not in RESPONSE_MODES:
+                raise ValueError(f"Response mode must be one of {list(RESPONSE_MODES)}")
+            tts_settings["default_response"] = arguments["default_response"]
+        
+        if "default_timeout_ms" in arguments:
+            timeout_ms = arguments["default_timeout_ms"]
+            if not isinstance(timeout_ms, int) or timeout_ms < 0:
+                raise ValueError("Timeout must be a non-negative integer (milliseconds)")
+            tts_settings["default_timeout_ms"] = timeout_ms or None
             
         # 設定変更を通知
-        await server.request_context.session.send_resource_list_changed()
+        _notify_resource_list_changed()
         
         return [types.TextContent(type="text", text=json.dumps({"message": "Settings updated", "settings": tts_settings}))]
     
@@ -348,7 +1528,7 @@ Base your recommendations on the content, intended tone, and best practices for
         
     elif name == "analyze-audio-history":
         history_text = ""
-        for idx, audio in enumerate(generated_audio_files[-10:]):  # 最新の10件を取得
+        for idx, audio in enumerate(reversed(audio_history.recent(10))):  # 最新の10件を取得
             history_text += f"{idx+1}. Text: \"{audio.get('text', '')[:50]}...\"\n"
             history_text += f"   Voice: {audio.get('voice')}, Speed: {audio.get('speed')}\n\n"
             
@@ -379,29 +1559,78 @@ Also, what could be improved about my text formatting to achieve better speech s
     else:
         raise ValueError(f"Unknown prompt: {name}")
 
-async def main():
-    """メインの実行関数"""
+def _initialization_options() -> InitializationOptions:
+    """MCPセッションの初期化オプションを作成する"""
+    return InitializationOptions(
+        server_name="kokoro-mcp-server",
+        server_version="0.1.0",
+        capabilities=server.get_capabilities(
+            notification_options=NotificationOptions(),
+            experimental_capabilities={},
+        ),
+    )
+
+def _health_status() -> Dict[str, Any]:
+    """HTTPトランスポートの /health で返す状態を取得する"""
+    return {**_tts_status, "workers": synthesis_executor.stats()}
+
+def parse_args(argv: Optional[Sequence[str]] = None) -> argparse.Namespace:
+    """
+    コマンドライン引数を解析する（省略した値は環境変数の設定を使用）
+
+    Args:
+        argv: コマンドライン引数（Noneの場合は sys.argv）
+
+    Returns:
+        argparse.Namespace: transport, host, port
+    """
+    parser = argparse.ArgumentParser(prog="kokoro-mcp-server")
+    parser.add_argument("--transport", choices=TRANSPORTS, default=TRANSPORT)
+    parser.add_argument("--host", default=HTTP_HOST)
+    parser.add_argument("--port", type=int, default=HTTP_PORT)
+    return parser.parse_args(argv)
+
+async def main(
+    transport: Optional[str] = None, host: Optional[str] = None, port: Optional[int] = None
+):
+    """
+    メインの実行関数
+
+    Args:
+        transport: トランスポート（"stdio" または "http"、Noneの場合は TTS_TRANSPORT）
+        host: HTTPトランスポートで待ち受けるアドレス（Noneの場合は TTS_HTTP_HOST）
+        port: HTTPトランスポートで待ち受けるポート（Noneの場合は TTS_HTTP_PORT）
+    """
+    global public_base_url
+    transport = transport or TRANSPORT
+    host = host or HTTP_HOST
+    port = port or HTTP_PORT
     try:
         print("=" * 50, file=sys.stderr)
         print("server.py: main関数が呼び出されました", file=sys.stderr)
         print("=" * 50, file=sys.stderr)
+        if transport not in TRANSPORTS:
+            raise ValueError(f"transport must be one of {list(TRANSPORTS)}")
         
+        # ハンドシェイクを待たせないよう、モデルはバックグラウンドで読み込む
+        start_tts_loading()
+        start_loop_lag_monitor()
+        start_janitor()
+        
+        if transport == "http":
+            # 複数のクライアントが1つのプロセス（モデルとワーカープール）を共有する
+            public_base_url = os.environ.get("TTS_PUBLIC_URL", "").rstrip("/") or None
+            app = create_http_app(
+                server, _initialization_options(), _lookup_audio, _health_status
+            )
+            await serve_http(app, host, port, HTTP_KEEPALIVE)
+            return
+
         # サーバーをstdin/stdoutストリームで実行
         async with mcp.server.stdio.stdio_server() as (read_stream, write_stream):
-            await server.run(
-                read_stream,
-                write_stream,
-                InitializationOptions(
-                    server_name="kokoro-mcp-server",
-                    server_version="0.1.0",
-                    capabilities=server.get_capabilities(
-                        notification_options=NotificationOptions(),
-                        experimental_capabilities={},
-                    ),
-                ),
-            )
+            await server.run(read_stream, write_stream, _initialization_options())
             
     except Exception as e:
         print(f"サーバー初期化エラー: {e}", file=sys.stderr)
         import traceback
-        traceback.print_exc(file=sys.stderr)
\ No newline at end of file
+        traceback.print_exc(file=sys.stderr)
@@ -0,0 +1,381 @@
+"""
+音声ファイルの保存先
+
+生成した音声は一時ファイルに書き込み、完了した時点で内容のハッシュ値をファイル名とする
+パスに名前を変更して配置します。ファイルはハッシュ値の先頭2文字のサブディレクトリに分散されるため、
+1つのディレクトリのファイル数が増え続けることはありません。
+同じ内容の音声は同じファイルになり、書き込み途中のファイルが完成したファイルとして見えることもありません。
+
+同じ内容のファイルは複数の履歴から参照されるため、``commit`` してから履歴に追加されるまでの間に
+他の履歴の削除や ``sweep`` でファイルが削除されないよう、``commit`` したファイルは ``release`` されるまで
+（最長 ``CLAIM_SECONDS``）削除の対象から外します。同じファイルを同時に ``commit`` した場合は、
+すべてが ``release`` されるまで削除の対象から外れたままです。
+
+::
+
+    output/audio/
+        .tmp/3f2a...e1.wav      書き込み中の音声（UUID）
+        9c/9c41...07.wav        完成した音声（内容のハッシュ値）
+"""
+
+import hashlib
+import logging
+import os
+import re
+import shutil
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+
+from .audio import AudioFormat, AudioWriter
+
+logger = logging.getLogger(__name__)
+
+# 書き込み中の一時ファイルを置くディレクトリ名
+TEMP_DIR_NAME = ".tmp"
+
+# この時間更新されていない一時ファイルは、異常終了したプロセスの書きかけとみなして削除する（秒）
+TEMP_GRACE_SECONDS = 3600.0
+
+# サブディレクトリ名に使うハッシュ値の文字数（16進数2文字で256個に分散）
+SHARD_CHARS = 2
+
+# 保存先でのファイル名（内容のハッシュ値と拡張子）
+_STORED_NAME_PATTERN = re.compile(r"([0-9a-f]{32})(\.[0-9a-z]+)")
+
+# commit したファイルを削除の対象から外しておく時間の上限（履歴に追加されなかった場合に備える）（秒）
+CLAIM_SECONDS = 600.0
+
+
+class AudioStore:
+    """
+    内容のハッシュ値で音声ファイルを配置する保存先
+
+    ``open`` で一時ファイルへのライターを作成し、書き込みが完了したら ``commit`` で
+    最終的なパスに名前を変更します（同じファイルシステム内の ``os.replace`` なので不可分）。
+    失敗・キャンセルした場合は ``discard`` で一時ファイルを削除します。
+    ``sweep`` は保存期間と合計サイズの上限を超えたファイルを古い順に削除します。
+
+    ``commit`` と ``adopt`` が返したファイルは、``release`` されるまで ``remove`` と ``sweep`` で削除されません
+    （``commit`` ・ ``adopt`` した回数だけ ``release`` されるまで）。
+    """
+
+    def __init__(self, root: Union[str, Path] = "output/audio"):
+        """
+        初期化
+
+        Args:
+            root: 音声ファイルの保存先ディレクトリ
+        """
+        self.root = Path(root)
+        self.temp_dir = self.root / TEMP_DIR_NAME
+        self._lock = threading.Lock()
+        self._sweep_lock = threading.Lock()
+        # 履歴への追加を待っているファイルのパスと、release されていない回数・削除の対象から外す期限
+        self._claims: Dict[str, Tuple[int, float]] = {}
+        self._last_sweep: Dict[str, Any] = {}
+
+    def open(
+        self,
+        audio_format: AudioFormat,
+        sample_rate: int,
+        quality: Optional[float] = None,
+        bitrate_mode: Optional[str] = None,
+    ) -> AudioWriter:
+        """
+        一時ファイルに書き込むライターを作成する
+
+        Args:
+            audio_format: 出力形式
+            sample_rate: サンプルレート
+            quality: 品質（0.0〜1.0）
+            bitrate_mode: ビットレートモード
+
+        Returns:
+            AudioWriter: 一時ファイルへのライター
+        """
+        self.temp_dir.mkdir(parents=True, exist_ok=True)
+        path = self.temp_dir / f"{uuid.uuid4().hex}{audio_format.extension}"
+        return AudioWriter(path, sample_rate, audio_format, quality, bitrate_mode)
+
+    def path_for(self, digest: str, extension: str) -> Path:
+        """
+        ハッシュ値に対応するファイルのパスを取得する
+
+        Args:
+            digest: 音声の内容のハッシュ値
+            extension: ファイルの拡張子
+
+        Returns:
+            Path: ファイルのパス
+        """
+        return self.root / digest[:SHARD_CHARS] / f"{digest}{extension}"
+
+    def name_of(self, path: Union[str, Path]) -> Optional[str]:
+        """
+        保存先のファイルのパスからファイル名（内容のハッシュ値と拡張子）を取得する
+
+        Args:
+            path: 音声ファイルのパス
+
+        Returns:
+            Optional[str]: ファイル名（保存先の配置に従っていないファイルの場合はNone）
+        """
+        name = os.path.basename(path)
+        match = _STORED_NAME_PATTERN.fullmatch(name)
+        if match is None:
+            return None
+        if os.path.normpath(path) != os.path.normpath(self.path_for(*match.groups())):
+            return None
+        return name
+
+    def locate(self, name: str) -> Optional[Path]:
+        """
+        ファイル名（内容のハッシュ値と拡張子）から保存先のファイルのパスを取得する
+
+        Args:
+            name: ``name_of`` で取得したファイル名
+
+        Returns:
+            Optional[Path]: ファイルのパス（ファイル名の形式が正しくない場合はNone）
+        """
+        match = _STORED_NAME_PATTERN.fullmatch(name)
+        return self.path_for(*match.groups()) if match is not None else None
+
+    def commit(self, writer: AudioWriter) -> str:
+        """
+        ライターを閉じ、一時ファイルを内容のハッシュ値のパスに移動する
+
+        同じ内容のファイルが既にある場合は置き換えます（内容は同じなので参照している履歴には影響しません）。
+        移動したファイルは ``release`` されるまで削除されません。
+
+        Args:
+            writer: ``open`` で作成したライター
+
+        Returns:
+            str: 音声ファイルのパス
+        """
+        writer.close()
+        temp_path = Path(writer.path)
+        path = self.path_for(writer.digest, temp_path.suffix)
+        with self._lock:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            os.replace(temp_path, path)
+            self._claim(str(path))
+        return str(path)
+
+    def adopt(self, source: Union[str, Path], name: Optional[str] = None) -> str:
+        """
+        保存先の外にある音声ファイル（キャッシュなど）を保存先に取り込む
+
+        ハードリンクを作成し、できない場合（別のファイルシステムなど）はコピーします。
+        取り込んだファイルは元のファイルが削除されても残り、``release`` されるまで削除されません。
+
+        Args:
+            source: 取り込む音声ファイルのパス
+            name: 保存先でのファイル名（ハッシュ値と拡張子。Noneの場合はファイルの内容から計算する）
+
+        Returns:
+            str: 保存先の音声ファイルのパス
+        """
+        source = Path(source)
+        if name is None:
+            file_hash = hashlib.blake2b(digest_size=16)
+            with open(source, "rb") as f:
+                for block in iter(lambda: f.read(1024 * 1024), b""):
+                    file_hash.update(block)
+            name = f"{file_hash.hexdigest()}{source.suffix}"
+        digest, extension = os.path.splitext(name)
+        path = self.path_for(digest, extension)
+        with self._lock:
+            if path.exists():
+                # 同じ内容のファイルが既にある場合はそれを使う（保存期間を延ばす）
+                os.utime(path)
+                self._claim(str(path))
+                return str(path)
+
+        self.temp_dir.mkdir(parents=True, exist_ok=True)
+        temp_path = self.temp_dir / f"{uuid.uuid4().hex}{extension}"
+        try:
+            os.link(source, temp_path)
+        except OSError:
+            shutil.copyfile(source, temp_path)
+        with self._lock:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            os.replace(temp_path, path)
+            self._claim(str(path))
+        return str(path)
+
+    def _claim(self, path: str) -> None:
+        """ファイルを削除の対象から外す（ロック内で呼び出す。release されていない回数を数える）"""
+        path = os.path.normpath(path)
+        count = 0
+        if self._is_claimed(path):
+            count = self._claims[path][0]
+        self._claims[path] = (count + 1, time.monotonic() + CLAIM_SECONDS)
+
+    def _is_claimed(self, path: str) -> bool:
+        """ファイルが削除の対象から外されているかどうか（ロック内で呼び出す）"""
+        path = os.path.normpath(path)
+        claim = self._claims.get(path)
+        if claim is None:
+            return False
+        if claim[1] < time.monotonic():
+            del self._claims[path]
+            return False
+        return True
+
+    def release(self, path: str) -> None:
+        """
+        ``commit`` ・ ``adopt`` したファイルを削除の対象に戻す（履歴に追加した後に呼び出す）
+
+        同じファイルが複数回 ``commit`` ・ ``adopt`` されている場合は、すべてが ``release`` されるまで
+        削除の対象に戻しません。
+
+        Args:
+            path: ``commit`` ・ ``adopt`` が返したパス
+        """
+        path = os.path.normpath(path)
+        with self._lock:
+            claim = self._claims.get(path)
+            if claim is None:
+                return
+            if claim[0] > 1:
+                self._claims[path] = (claim[0] - 1, claim[1])
+            else:
+                del self._claims[path]
+
+    def remove(self, path: str) -> bool:
+        """
+        音声ファイルを削除する（``release`` されていないファイルは削除しない）
+
+        Args:
+            path: 削除するファイルのパス
+
+        Returns:
+            bool: 削除したかどうか
+        """
+        with self._lock:
+            if self._is_claimed(path):
+                return False
+            return self._remove(path)
+
+    def discard(self, writer: AudioWriter) -> None:
+        """
+        ライターを閉じ、一時ファイルを削除する
+
+        Args:
+            writer: ``open`` で作成したライター
+        """
+        writer.close()
+        try:
+            os.remove(writer.path)
+        except FileNotFoundError:
+            pass
+
+    def sweep(
+        self,
+        max_bytes: int = 0,
+        max_age_seconds: float = 0,
+        on_remove: Optional[Callable[[List[str]], Any]] = None,
+    ) -> Dict[str, Any]:
+        """
+        保存期間と合計サイズの上限を超えたファイルを削除する
+
+        一時ファイルは ``TEMP_GRACE_SECONDS`` 以上更新されていないものだけを削除します。
+        以前の形式（保存先の直下）のファイルも対象です。``release`` されていないファイルは削除しません。
+
+        Args:
+            max_bytes: 合計サイズの上限（バイト、0以下で無制限）
+            max_age_seconds: 保存期間（秒、0以下で無制限）
+            on_remove: 削除したファイル（一時ファイルを除く）のパスのリストを受け取る関数
+                （参照している履歴を削除するために使う）
+
+        Returns:
+            Dict[str, Any]: 削除したファイル数・サイズと、残っているファイル数・サイズ
+        """
+        with self._sweep_lock:
+            now = time.time()
+            removed: List[str] = []
+            removed_temp = 0
+            removed_bytes = 0
+            files: List[Tuple[float, int, str]] = []
+            for dirpath, _, filenames in os.walk(self.root):
+                in_temp = Path(dirpath) == self.temp_dir
+                for name in filenames:
+                    path = os.path.join(dirpath, name)
+                    try:
+                        stat = os.stat(path)
+                    except FileNotFoundError:
+                        continue
+                    age = now - stat.st_mtime
+                    if in_temp:
+                        if age > TEMP_GRACE_SECONDS and self._remove(path):
+                            removed_temp += 1
+                            removed_bytes += stat.st_size
+                    elif max_age_seconds > 0 and age > max_age_seconds and self.remove(path):
+                        removed.append(path)
+                        removed_bytes += stat.st_size
+                    else:
+                        files.append((stat.st_mtime, stat.st_size, path))
+
+            total_bytes = sum(size for _, size, _ in files)
+            remaining = len(files)
+            if max_bytes > 0 and total_bytes > max_bytes:
+                # 更新日時の古いものから削除する
+                for _, size, path in sorted(files):
+                    if total_bytes <= max_bytes:
+                        break
+                    if self.remove(path):
+                        removed.append(path)
+                        removed_bytes += size
+                        total_bytes -= size
+                        remaining -= 1
+
+            if removed and on_remove is not None:
+                on_remove(removed)
+
+            with self._lock:
+                # 期限の切れた登録を片付ける
+                current = time.monotonic()
+                expired = [path for path, (_, until) in self._claims.items() if until < current]
+                for path in expired:
+                    del self._claims[path]
+                self._last_sweep = {
+                    "at": now,
+                    "removed": len(removed) + removed_temp,
+                    "removed_bytes": removed_bytes,
+                    "files": remaining,
+                    "bytes": total_bytes,
+                    "claimed": len(self._claims),
+                }
+                result = dict(self._last_sweep)
+        if result["removed"]:
+            logger.info(
+                f"Removed {result['removed']} audio files ({removed_bytes} bytes) from {self.root}"
+            )
+        return result
+
+    @staticmethod
+    def _remove(path: str) -> bool:
+        """ファイルを削除する（削除できなかった場合はFalse）"""
+        try:
+            os.remove(path)
+            return True
+        except FileNotFoundError:
+            return False
+        except OSError as e:
+            logger.warning(f"Failed to remove audio file {path}: {e}")
+            return False
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        保存先の情報と直近の ``sweep`` の結果を取得する
+
+        Returns:
+            Dict[str, Any]: 保存先のパスと直近の削除結果
+        """
+        with self._lock:
+            return {"root": str(self.root), "last_sweep": dict(self._last_sweep)}
@@ -0,0 +1,245 @@
+"""
+HTTPトランスポート
+
+1つのサーバープロセスで複数のMCPクライアントを受け付けるためのHTTPアプリケーションを作成します。
+すべてのクライアントが同じTTSサービス（モデルとワーカープール）を共有します。
+
+- ``/mcp``: Streamable HTTP トランスポート
+- ``/sse``, ``/messages/``: SSE トランスポート（旧方式のクライアント向け）
+- ``/audio/{name}``: 生成した音声ファイルのダウンロード（Rangeリクエスト対応）。
+  ``name`` は内容のハッシュ値のファイル名なので、URLを知らないクライアントは音声を取得できません
+- ``/health``: サーバーの状態
+"""
+
+import contextlib
+import logging
+import os
+from typing import Any, AsyncIterator, Callable, Dict, Optional, Tuple
+
+import anyio
+from mcp.server import Server
+from mcp.server.models import InitializationOptions
+from mcp.server.sse import SseServerTransport
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response, StreamingResponse
+from starlette.routing import Mount, Route
+from starlette.types import Receive, Scope, Send
+
+logger = logging.getLogger(__name__)
+
+TRANSPORTS = ("stdio", "http")
+DEFAULT_TRANSPORT = "stdio"
+
+# 音声ファイルを送信するときに1回で読み込むサイズ
+_READ_CHUNK_SIZE = 64 * 1024
+
+# 音声のファイル名（内容のハッシュ値と拡張子）から履歴のエントリ（file_path, mime_type を含む）を取得する関数
+AudioLookup = Callable[[str], Optional[Dict[str, Any]]]
+
+
+def parse_range(header: str, size: int) -> Optional[Tuple[int, int]]:
+    """
+    Rangeヘッダーを解釈する（単一の範囲のみ対応）
+
+    Args:
+        header: Rangeヘッダーの値（例: "bytes=0-1023", "bytes=1024-", "bytes=-500"）
+        size: ファイルサイズ
+
+    Returns:
+        Optional[Tuple[int, int]]: 開始位置と終了位置（終了位置を含む）。
+            解釈できないヘッダー・複数の範囲の場合はNone（ファイル全体を返す）
+
+    Raises:
+        ValueError: 範囲がファイルの外にある場合
+    """
+    unit, _, spec = header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in spec:
+        return None
+    first, sep, last = (part.strip() for part in spec.partition("-"))
+    if not sep or not (first or last) or not (first or "0").isdigit() or not (last or "0").isdigit():
+        return None
+    if not first:
+        # 末尾からのバイト数
+        suffix = int(last)
+        if suffix <= 0 or size == 0:
+            raise ValueError("Range is not satisfiable")
+        return max(size - suffix, 0), size - 1
+    start = int(first)
+    end = int(last) if last else size - 1
+    if start >= size or start > end:
+        raise ValueError("Range is not satisfiable")
+    return start, min(end, size - 1)
+
+
+async def _iter_file(path: str, start: int, length: int) -> AsyncIterator[bytes]:
+    """ファイルの指定範囲を少しずつ読み込む"""
+    async with await anyio.open_file(path, "rb") as f:
+        await f.seek(start)
+        remaining = length
+        while remaining > 0:
+            data = await f.read(min(_READ_CHUNK_SIZE, remaining))
+            if not data:
+                break
+            remaining -= len(data)
+            yield data
+
+
+def audio_response(request: Request, entry: Dict[str, Any]) -> Response:
+    """
+    音声ファイルのレスポンスを作成する
+
+    Rangeヘッダーが指定されている場合は、その範囲だけを 206 Partial Content で返します。
+
+    Args:
+        request: HTTPリクエスト
+        entry: 履歴のエントリ
+
+    Returns:
+        Response: 音声ファイルのレスポンス
+    """
+    file_path = entry["file_path"]
+    stat = os.stat(file_path)
+    size = stat.st_size
+    etag = f'"{size:x}-{int(stat.st_mtime * 1000):x}"'
+    headers = {
+        "Accept-Ranges": "bytes",
+        "ETag": etag,
+        "Cache-Control": "private, max-age=3600",
+    }
+    media_type = entry.get("mime_type") or "application/octet-stream"
+
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+
+    byte_range = None
+    range_header = request.headers.get("range")
+    # If-Range が現在のファイルと一致しない場合は、範囲を無視してファイル全体を返す
+    if range_header and request.headers.get("if-range", etag) == etag:
+        try:
+            byte_range = parse_range(range_header, size)
+        except ValueError:
+            headers["Content-Range"] = f"bytes */{size}"
+            return Response(status_code=416, headers=headers)
+
+    status_code = 200
+    start, end = 0, size - 1
+    if byte_range is not None:
+        start, end = byte_range
+        status_code = 206
+        headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+    length = end - start + 1
+    headers["Content-Length"] = str(length)
+
+    if request.method == "HEAD" or length <= 0:
+        return Response(status_code=status_code, headers=headers, media_type=media_type)
+    return StreamingResponse(
+        _iter_file(file_path, start, length),
+        status_code=status_code,
+        headers=headers,
+        media_type=media_type,
+    )
+
+
+class _StreamableHTTPApp:
+    """Streamable HTTP のリクエストをセッションマネージャーに渡すASGIアプリケーション"""
+
+    def __init__(self, session_manager: Any):
+        self.session_manager = session_manager
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        await self.session_manager.handle_request(scope, receive, send)
+
+
+def create_http_app(
+    mcp_server: Server,
+    initialization_options: InitializationOptions,
+    audio_lookup: AudioLookup,
+    status: Callable[[], Dict[str, Any]],
+) -> Starlette:
+    """
+    MCPサーバーと音声のダウンロードを提供するHTTPアプリケーションを作成する
+
+    Args:
+        mcp_server: MCPサーバー
+        initialization_options: SSEセッションの初期化オプション
+        audio_lookup: 音声のファイル名から履歴のエントリを取得する関数
+        status: ``/health`` で返すサーバーの状態を取得する関数
+
+    Returns:
+        Starlette: HTTPアプリケーション
+    """
+    sse = SseServerTransport("/messages/")
+
+    async def handle_sse(request: Request) -> Response:
+        async with sse.connect_sse(
+            request.scope, request.receive, request._send  # type: ignore[attr-defined]
+        ) as (read_stream, write_stream):
+            await mcp_server.run(read_stream, write_stream, initialization_options)
+        return Response()
+
+    async def handle_audio(request: Request) -> Response:
+        entry = audio_lookup(request.path_params["name"])
+        if entry is None or not os.path.exists(entry["file_path"]):
+            return JSONResponse({"error": "Audio file not found"}, status_code=404)
+        return audio_response(request, entry)
+
+    async def handle_health(request: Request) -> Response:
+        return JSONResponse(status())
+
+    routes = [
+        Route("/sse", endpoint=handle_sse, methods=["GET"]),
+        Mount("/messages/", app=sse.handle_post_message),
+        Route("/audio/{name}", endpoint=handle_audio, methods=["GET", "HEAD"]),
+        Route("/health", endpoint=handle_health, methods=["GET"]),
+    ]
+
+    session_manager = None
+    try:
+        from mcp.server.streamable_http_manager import StreamableHTTPSessionManager
+
+        session_manager = StreamableHTTPSessionManager(app=mcp_server)
+        routes.append(Route("/mcp", endpoint=_StreamableHTTPApp(session_manager)))
+    except ImportError:
+        logger.warning(
+            "Streamable HTTP transport is not available in this version of mcp; "
+            "only the SSE endpoint is served"
+        )
+
+    @contextlib.asynccontextmanager
+    async def lifespan(app: Starlette) -> AsyncIterator[None]:
+        if session_manager is None:
+            yield
+            return
+        async with session_manager.run():
+            yield
+
+    return Starlette(routes=routes, lifespan=lifespan)
+
+
+async def serve_http(
+    app: Starlette, host: str, port: int, keep_alive: float, log_level: str = "info"
+) -> None:
+    """
+    HTTPアプリケーションをuvicornで実行する
+
+    Args:
+        app: HTTPアプリケーション
+        host: 待ち受けるアドレス
+        port: 待ち受けるポート
+        keep_alive: アイドル状態のkeep-alive接続を保持する秒数
+        log_level: uvicornのログレベル
+    """
+    import uvicorn
+
+    config = uvicorn.Config(
+        app,
+        host=host,
+        port=port,
+        timeout_keep_alive=int(keep_alive),
+        log_level=log_level,
+        # SSEとストリーミング中の接続を待ってから終了する
+        timeout_graceful_shutdown=5,
+    )
+    logger.info(f"Serving MCP over HTTP on http://{host}:{port} (/mcp, /sse)")
+    await uvicorn.Server(config).serve()
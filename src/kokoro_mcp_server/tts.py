@@ -9,8 +9,6 @@ import soundfile as sf
 import torch
 from kokoro import KPipeline
 from loguru import logger
-import fugashi
-import unidic_lite
 
 class KokoroTTS:
     """Kokoro TTS implementation class."""
@@ -39,7 +37,10 @@ class KokoroTTS:
         os.environ['MECABRC'] = '/etc/mecabrc'
         os.environ['FUGASHI_ENABLE_FALLBACK'] = '1'
         
-        # Initialize fugashi with unidic-lite
+        # Initialize fugashi with unidic-lite (imported here because loading them is slow)
+        import fugashi
+        import unidic_lite
+
         try:
             tagger = fugashi.Tagger('-d ' + unidic_lite.DICDIR)
             logger.info("Successfully initialized MeCab with unidic-lite")
@@ -0,0 +1,325 @@
+"""
+音声合成ワーカープール
+
+イベントループをブロックしないよう、音声合成をスレッドプール上で実行します。
+ワーカーに空きがない間、ジョブは優先度クラスとテキストの長さに基づくスケジューラーで待機します。
+"""
+
+import asyncio
+import itertools
+import logging
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple, TypeVar
+
+from .metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# 優先度クラスごとの待ち行列上の不利（文字数換算）
+PRIORITIES: Dict[str, int] = {
+    "interactive": 0,
+    "bulk": 1000,
+}
+DEFAULT_PRIORITY = "interactive"
+
+# スループットの推定値の初期値（1ワーカーあたりの文字/秒）
+_INITIAL_CHARS_PER_SECOND = 50.0
+
+
+class QueueFullError(RuntimeError):
+    """
+    待ち行列が上限に達したときに送出される例外
+
+    Attributes:
+        retry_after: 再試行までの目安の秒数
+    """
+
+    def __init__(self, message: str, retry_after: float = 1.0):
+        super().__init__(f"{message}; retry after {retry_after:.1f}s")
+        self.retry_after = retry_after
+
+
+@dataclass
+class _Job:
+    """待ち行列上のジョブ"""
+    fn: Callable[..., Any]
+    args: tuple
+    priority: str
+    cost: int
+    seq: int
+    future: asyncio.Future
+    enqueued: float = field(default_factory=time.monotonic)
+
+    def score(self, now: float, aging: float) -> float:
+        """小さいほど先に実行される（優先度クラス + 文字数 - 待ち時間による補正）"""
+        return PRIORITIES[self.priority] + self.cost - aging * (now - self.enqueued)
+
+
+class SynthesisExecutor:
+    """
+    優先度付きの待ち行列とアドミッション制御を持つ音声合成エグゼキューター
+
+    ワーカーに空きができると、待機中のジョブのうち
+    ``優先度クラスの不利 + 文字数 - aging × 待ち時間`` が最も小さいものを実行します。
+    短いテキストや interactive のジョブが先に実行されますが、待ち時間に応じて
+    長いジョブの順位も上がるため、長いジョブが無限に待たされることはありません。
+
+    待機中のジョブ数が ``max_queue`` に達しているか、待機中の文字数が ``max_queued_chars`` を
+    超える場合、新しいジョブは待たずに ``QueueFullError`` で拒否されます。
+    """
+
+    def __init__(
+        self,
+        max_workers: int = 2,
+        max_queue: int = 16,
+        max_queued_chars: int = 20000,
+        aging_chars_per_second: float = 100.0,
+    ):
+        """
+        初期化
+
+        Args:
+            max_workers: 同時に実行する合成ジョブの数
+            max_queue: 実行待ちとして保持できるジョブの数
+            max_queued_chars: 実行待ちのジョブの合計文字数の上限
+            aging_chars_per_second: 待ち時間1秒あたりに順位を上げる量（文字数換算）
+        """
+        if max_workers < 1:
+            raise ValueError("max_workers must be at least 1")
+        if max_queue < 0:
+            raise ValueError("max_queue must not be negative")
+
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.max_queued_chars = max_queued_chars
+        self.aging = aging_chars_per_second
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._queue: List[_Job] = []
+        self._queued_chars = 0
+        self._running = 0
+        self._running_chars = 0
+        self._seq = itertools.count()
+        self._chars_per_second = _INITIAL_CHARS_PER_SECOND
+        self.rejected = 0
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        """スレッドプールを取得する（初回呼び出し時に作成）"""
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.max_workers, thread_name_prefix="tts-worker"
+            )
+        return self._executor
+
+    @property
+    def capacity(self) -> int:
+        """同時に受け付けられるジョブの総数"""
+        return self.max_workers + self.max_queue
+
+    def retry_after(self) -> float:
+        """
+        待機中・実行中のジョブが捌けるまでの目安の秒数を推定する
+
+        Returns:
+            float: 推定秒数（最低1秒）
+        """
+        backlog = self._queued_chars + self._running_chars
+        return max(backlog / (self._chars_per_second * self.max_workers), 1.0)
+
+    def _admission_error(self, jobs: int, cost: int) -> Optional[str]:
+        """ジョブを受け付けられない場合はその理由を返す"""
+        free_workers = max(self.max_workers - self._running, 0)
+        queued_after = len(self._queue) + max(jobs - free_workers, 0)
+        if queued_after > self.max_queue:
+            return (
+                f"TTS queue is full ({len(self._queue)} queued, {self._running} running, "
+                f"limit {self.max_queue})"
+            )
+        if self._queue and self._queued_chars + cost > self.max_queued_chars:
+            return (
+                f"TTS queue is full ({self._queued_chars} characters queued, "
+                f"limit {self.max_queued_chars})"
+            )
+        return None
+
+    def has_capacity(self, jobs: int = 1, cost: int = 0) -> bool:
+        """
+        ジョブを受け付けられるかどうかを返す（拒否の回数には数えない）
+
+        Args:
+            jobs: 追加するジョブの数
+            cost: 追加するジョブの合計文字数
+
+        Returns:
+            bool: 受け付けられる場合はTrue
+        """
+        return self._admission_error(jobs, cost) is None
+
+    def check_admission(self, jobs: int = 1, cost: int = 0) -> None:
+        """
+        ジョブを受け付けられるかどうかを確認する
+
+        Args:
+            jobs: 追加するジョブの数
+            cost: 追加するジョブの合計文字数
+
+        Raises:
+            QueueFullError: 待ち行列の上限を超える場合
+        """
+        message = self._admission_error(jobs, cost)
+        if message is not None:
+            self.rejected += 1
+            raise QueueFullError(message, self.retry_after())
+
+    async def submit(
+        self,
+        fn: Callable[..., T],
+        *args: Any,
+        priority: str = DEFAULT_PRIORITY,
+        cost: int = 0,
+    ) -> T:
+        """
+        ジョブをワーカーで実行し、その結果を待つ
+
+        Args:
+            fn: ワーカースレッドで実行する関数
+            *args: 関数に渡す引数
+            priority: 優先度クラス（"interactive" または "bulk"）
+            cost: ジョブの大きさ（テキストの文字数）
+
+        Returns:
+            関数の戻り値
+
+        Raises:
+            QueueFullError: 待ち行列が上限に達している場合
+        """
+        if priority not in PRIORITIES:
+            raise ValueError(f"priority must be one of {list(PRIORITIES)}")
+        self.check_admission(1, cost)
+
+        loop = asyncio.get_running_loop()
+        job = _Job(fn, args, priority, cost, next(self._seq), loop.create_future())
+        self._queue.append(job)
+        self._queued_chars += cost
+        self._dispatch()
+        try:
+            return await job.future
+        except asyncio.CancelledError:
+            # まだ実行されていないジョブは待ち行列から取り除く
+            if job in self._queue:
+                self._queue.remove(job)
+                self._queued_chars -= job.cost
+            raise
+
+    async def submit_all(
+        self,
+        calls: Sequence[Tuple[Callable[..., T], tuple, int]],
+        priority: str = DEFAULT_PRIORITY,
+    ) -> List[T]:
+        """
+        複数のジョブをまとめて受け付け、すべての結果を待つ
+
+        受け付けの確認は全体で1回だけ行い、受け付けたジョブは同時に待ち行列に入れるため、
+        一部のジョブだけが受け付けられることはありません。
+        いずれかのジョブが失敗した場合やキャンセルされた場合は、まだ実行されていないジョブを
+        待ち行列から取り除いてから例外を送出します（実行中のジョブはスレッド上で最後まで実行されます）。
+
+        Args:
+            calls: ジョブごとの（関数, 引数のタプル, ジョブの大きさ）のリスト
+            priority: 優先度クラス（"interactive" または "bulk"）
+
+        Returns:
+            List: ジョブごとの関数の戻り値（``calls`` と同じ順番）
+
+        Raises:
+            QueueFullError: 待ち行列の上限を超える場合
+        """
+        if priority not in PRIORITIES:
+            raise ValueError(f"priority must be one of {list(PRIORITIES)}")
+        self.check_admission(len(calls), sum(cost for _, _, cost in calls))
+
+        loop = asyncio.get_running_loop()
+        jobs = []
+        for fn, args, cost in calls:
+            job = _Job(fn, args, priority, cost, next(self._seq), loop.create_future())
+            self._queue.append(job)
+            self._queued_chars += cost
+            jobs.append(job)
+        self._dispatch()
+        try:
+            return list(await asyncio.gather(*(job.future for job in jobs)))
+        except BaseException:
+            for job in jobs:
+                if job in self._queue:
+                    self._queue.remove(job)
+                    self._queued_chars -= job.cost
+                job.future.cancel()
+            raise
+
+    def _dispatch(self) -> None:
+        """ワーカーに空きがある間、最も順位の高いジョブを実行する（イベントループ上で呼び出す）"""
+        now = time.monotonic()
+        while self._queue and self._running < self.max_workers:
+            job = min(self._queue, key=lambda j: (j.score(now, self.aging), j.seq))
+            self._queue.remove(job)
+            self._queued_chars -= job.cost
+            self._running += 1
+            self._running_chars += job.cost
+            metrics.observe("queue_wait", now - job.enqueued)
+
+            loop = job.future.get_loop()
+            started = time.monotonic()
+            concurrent = self._get_executor().submit(job.fn, *job.args)
+            concurrent.add_done_callback(
+                lambda f, job=job, started=started: loop.call_soon_threadsafe(
+                    self._on_done, job, f, started
+                )
+            )
+
+    def _on_done(self, job: _Job, concurrent: Future, started: float) -> None:
+        """ジョブの完了を処理し、次のジョブを実行する（イベントループ上で呼び出す）"""
+        self._running -= 1
+        self._running_chars -= job.cost
+        elapsed = time.monotonic() - started
+        error = concurrent.exception()
+        if job.cost > 0 and elapsed > 0 and error is None:
+            # 1ワーカーあたりのスループットを指数移動平均で推定する
+            self._chars_per_second = 0.8 * self._chars_per_second + 0.2 * (job.cost / elapsed)
+
+        if not job.future.done():
+            if error is not None:
+                job.future.set_exception(error)
+            else:
+                job.future.set_result(concurrent.result())
+        self._dispatch()
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        現在の負荷状況を取得する
+
+        Returns:
+            Dict[str, Any]: ワーカー数、実行中・待機中のジョブ数、待機中の文字数など
+        """
+        queued_by_priority = {name: 0 for name in PRIORITIES}
+        for job in self._queue:
+            queued_by_priority[job.priority] += 1
+        return {
+            "workers": self.max_workers,
+            "max_queue": self.max_queue,
+            "max_queued_chars": self.max_queued_chars,
+            "running": self._running,
+            "queued": len(self._queue),
+            "queued_chars": self._queued_chars,
+            "queued_by_priority": queued_by_priority,
+            "chars_per_second": self._chars_per_second * self.max_workers,
+            "rejected": self.rejected,
+        }
+
+    def shutdown(self, wait: bool = True) -> None:
+        """スレッドプールを停止する"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait)
+            self._executor = None
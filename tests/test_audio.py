@@ -0,0 +1,73 @@
+"""PolyphaseResampler のテスト"""
+
+import numpy as np
+import pytest
+
+from kokoro_mcp_server.audio import PassthroughResampler, PolyphaseResampler, create_resampler
+
+pytestmark = pytest.mark.unit
+
+
+def _signal(length: int, seed: int = 0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    t = np.arange(length) / 24000
+    tone = 0.5 * np.sin(2 * np.pi * 440 * t) + 0.1 * rng.standard_normal(length)
+    return tone.astype(np.float32)
+
+
+def _resample(resampler: PolyphaseResampler, audio: np.ndarray, chunk_sizes) -> np.ndarray:
+    """音声を指定した長さのチャンクに分けて変換する"""
+    parts = []
+    start = 0
+    for size in chunk_sizes:
+        parts.append(resampler.process(audio[start:start + size]))
+        start += size
+    parts.append(resampler.process(audio[start:]))
+    parts.append(resampler.flush())
+    return np.concatenate(parts)
+
+
+@pytest.mark.parametrize("orig_sr, target_sr", [(24000, 44100), (24000, 48000), (24000, 16000)])
+def test_output_length_matches_rate_ratio(orig_sr, target_sr):
+    audio = _signal(12345)
+    output = _resample(PolyphaseResampler(orig_sr, target_sr), audio, [])
+    assert len(output) == -(-len(audio) * target_sr // orig_sr)
+
+
+@pytest.mark.parametrize("chunk_sizes", [
+    [1, 2, 3, 5, 8, 13, 21],
+    [4800] * 4,
+    [7, 0, 0, 1000, 1, 3333],
+])
+def test_streaming_matches_single_pass(chunk_sizes):
+    audio = _signal(24000)
+    whole = _resample(PolyphaseResampler(24000, 44100), audio, [])
+    streamed = _resample(PolyphaseResampler(24000, 44100), audio, chunk_sizes)
+    assert len(streamed) == len(whole)
+    np.testing.assert_allclose(streamed, whole, atol=1e-5)
+
+
+def test_random_chunking_matches_single_pass():
+    audio = _signal(30000, seed=1)
+    rng = np.random.default_rng(2)
+    whole = _resample(PolyphaseResampler(24000, 44100), audio, [])
+    for _ in range(5):
+        sizes = list(rng.integers(0, 3000, size=20))
+        streamed = _resample(PolyphaseResampler(24000, 44100), audio, sizes)
+        np.testing.assert_allclose(streamed, whole, atol=1e-5)
+
+
+def test_matches_scipy_resample_poly():
+    signal = pytest.importorskip("scipy.signal")
+    audio = _signal(24000)
+    expected = signal.resample_poly(audio.astype(np.float64), 147, 80)
+    output = _resample(PolyphaseResampler(24000, 44100), audio, [1000] * 10)
+    assert len(output) == len(expected)
+    np.testing.assert_allclose(output, expected, atol=1e-4)
+
+
+def test_create_resampler():
+    assert isinstance(create_resampler("polyphase", 24000, 24000), PassthroughResampler)
+    assert isinstance(create_resampler("polyphase", 24000, 44100), PolyphaseResampler)
+    with pytest.raises(ValueError):
+        create_resampler("unknown", 24000, 44100)
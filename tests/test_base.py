@@ -0,0 +1,51 @@
+"""テキストの分割のテスト"""
+
+import pytest
+
+from kokoro_mcp_server.kokoro.base import split_for_g2p, split_text
+
+pytestmark = pytest.mark.unit
+
+
+def test_japanese_is_split_at_punctuation():
+    assert split_text("こんにちは。今日は、いい天気ですね！\n明日は？") == [
+        "こんにちは", "今日は", "いい天気ですね", "明日は",
+    ]
+
+
+def test_english_is_split_into_sentences():
+    text = (
+        "The quick brown fox jumps over the lazy dog. It costs 3.5 dollars; "
+        "nobody minds. Is that right? Yes!"
+    )
+    segments = split_text(text)
+
+    assert len(segments) > 1
+    assert segments == [
+        "The quick brown fox jumps over the lazy dog.",
+        "It costs 3.5 dollars;",
+        "nobody minds.",
+        "Is that right",
+        "Yes",
+    ]
+
+
+def test_blank_segments_are_dropped():
+    assert split_text("  。。\n\n  ") == []
+    assert split_text("  Hello.   World.  ") == ["Hello.", "World."]
+
+
+def test_g2p_parts_break_at_spaces_and_symbols():
+    text = "とても長い文章「引用」の続き・ここまで" * 10
+    parts = split_for_g2p(text, 50)
+
+    assert "".join(parts) == text
+    assert all(len(part) <= 50 for part in parts)
+    # かなの並びの途中ではなく、記号の後で区切る
+    assert all(part[-1] in "「」・" for part in parts[:-1])
+
+
+def test_g2p_parts_fall_back_to_fixed_length():
+    assert split_for_g2p("あ" * 120, 50) == ["あ" * 50, "あ" * 50, "あ" * 20]
+    assert split_for_g2p("短い", 50) == ["短い"]
+    assert split_for_g2p("", 50) == []
@@ -0,0 +1,137 @@
+"""長文の分割と合成のテスト"""
+
+import numpy as np
+import pytest
+
+from kokoro_mcp_server import document
+from kokoro_mcp_server.audio import get_audio_format
+from kokoro_mcp_server.document import (
+    DocumentSynthesisError,
+    chunk_document,
+    synthesize_document,
+)
+from kokoro_mcp_server.kokoro.base import CancellationToken, SynthesisCancelled
+from kokoro_mcp_server.storage import AudioStore
+from kokoro_mcp_server.worker import SynthesisExecutor
+
+pytestmark = pytest.mark.unit
+
+
+def test_empty_text_has_no_chunks():
+    assert chunk_document("") == []
+    assert chunk_document(" \n\n \n") == []
+
+
+def test_chunks_keep_text_and_order():
+    sentences = [f"これは{i}番目の文です。" for i in range(60)]
+    text = "".join(sentences)
+    chunks = chunk_document(text, target_chars=100)
+
+    assert [chunk.index for chunk in chunks] == list(range(len(chunks)))
+    assert "".join(chunk.text for chunk in chunks) == text
+    # 文の途中で区切られることはない
+    assert all(chunk.text.endswith("。") for chunk in chunks)
+
+
+def test_chunks_have_balanced_lengths():
+    text = "".join(f"文{i:03d}はこの長さです。" for i in range(100))
+    lengths = [len(chunk.text) for chunk in chunk_document(text, target_chars=200)]
+    assert len(lengths) > 1
+    assert max(lengths) - min(lengths) <= 2 * len("文000はこの長さです。")
+
+
+def test_chunks_do_not_cross_paragraphs():
+    text = "最初の段落です。続きの文です。\n\n次の段落です。\n  \n最後の段落です。"
+    chunks = chunk_document(text, target_chars=400)
+
+    assert [chunk.text for chunk in chunks] == [
+        "最初の段落です。続きの文です。",
+        "次の段落です。",
+        "最後の段落です。",
+    ]
+    assert all(chunk.paragraph_end for chunk in chunks)
+
+
+def test_english_sentences_are_joined_with_spaces():
+    chunks = chunk_document("Hello there. How are you? Fine!", target_chars=400)
+    assert [chunk.text for chunk in chunks] == ["Hello there. How are you? Fine!"]
+
+
+def test_long_sentences_are_split():
+    sentence = "、".join(["とても長い節"] * 100) + "。"
+    chunks = chunk_document(sentence, target_chars=50)
+
+    assert all(len(chunk.text) <= 100 for chunk in chunks)
+    assert "".join(chunk.text for chunk in chunks) == sentence
+
+    unbroken = "あ" * 250
+    assert [len(chunk.text) for chunk in chunk_document(unbroken, target_chars=50)] == [100, 100, 50]
+
+
+class _FakeService:
+    """``fail`` に含まれるテキストの合成に失敗するTTSサービス"""
+
+    def __init__(self, fail=()):
+        self.fail = set(fail)
+
+    def synthesize_text(self, text, voice, speed, cancel_token=None):
+        if text in self.fail:
+            raise RuntimeError("synthesis failed")
+        return np.full(2400, 0.5, dtype=np.float32)
+
+
+@pytest.fixture
+def executor():
+    executor = SynthesisExecutor(max_workers=2, max_queue=8)
+    yield executor
+    executor.shutdown(wait=False)
+
+
+async def _synthesize(service, executor, store, text):
+    return await synthesize_document(
+        service, executor, chunk_document(text, target_chars=10), store,
+        24000, get_audio_format("wav"), voice="jf_alpha",
+    )
+
+
+async def test_failed_chunks_are_reported(tmp_path, executor):
+    store = AudioStore(tmp_path)
+    text = "一つ目の文です。\n\n二つ目の文です。\n\n三つ目の文です。"
+
+    result = await _synthesize(_FakeService(fail={"二つ目の文です。"}), executor, store, text)
+
+    assert result["failed_chunks"] == [1]
+    assert store.name_of(result["file_path"]) is not None
+
+
+async def test_fails_when_no_chunk_succeeds(tmp_path, executor):
+    store = AudioStore(tmp_path)
+    text = "一つ目の文です。\n\n二つ目の文です。"
+
+    with pytest.raises(DocumentSynthesisError):
+        await _synthesize(_FakeService(fail=text.split("\n\n")), executor, store, text)
+
+    # 書きかけのファイルは残らない
+    assert [path for path in tmp_path.rglob("*") if path.is_file()] == []
+
+
+async def test_chunk_waiting_for_queue_stops(monkeypatch):
+    executor = SynthesisExecutor(max_workers=1, max_queue=0)
+    monkeypatch.setattr(executor, "has_capacity", lambda jobs=1, cost=0: False)
+    try:
+        chunk = chunk_document("一つ目の文です。")[0]
+        token = CancellationToken()
+        token.cancel("cancelled")
+        with pytest.raises(SynthesisCancelled):
+            await document._synthesize_chunk(
+                executor, _FakeService(), chunk, None, 1.0, "bulk", token
+            )
+
+        monkeypatch.setattr(document, "QUEUE_WAIT_SECONDS", 0.0)
+        assert await document._synthesize_chunk(
+            executor, _FakeService(), chunk, None, 1.0, "bulk", None
+        ) is None
+        # 空きを待つ間は拒否として数えない
+        assert executor.rejected == 0
+    finally:
+        executor.shutdown(wait=False)
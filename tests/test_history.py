@@ -0,0 +1,49 @@
+"""AudioHistory の保持条件のテスト"""
+
+import os
+
+import pytest
+
+from kokoro_mcp_server.history import AudioHistory
+from kokoro_mcp_server.storage import AudioStore
+
+pytestmark = pytest.mark.unit
+
+
+def _write(store: AudioStore, name: str, size: int) -> str:
+    digest = name * 32
+    path = store.path_for(digest, ".wav")
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(b"\0" * size)
+    return str(path)
+
+
+def _add(history: AudioHistory, file_path: str):
+    return history.add({"text": "テスト", "format": "wav", "file_path": file_path})
+
+
+def test_oversized_new_entry_is_kept(tmp_path):
+    store = AudioStore(tmp_path / "audio")
+    history = AudioHistory(":memory:", str(store.root), max_bytes=100, store=store)
+
+    old = _write(store, "a", 50)
+    _add(history, old)
+    big = _write(store, "b", 500)
+    entry = _add(history, big)
+
+    # 上限を超えた分は古いエントリから削除し、追加したエントリとファイルは残す
+    assert history.get(entry["id"]) is not None
+    assert os.path.exists(big)
+    assert not os.path.exists(old)
+
+
+def test_entries_sharing_a_file_keep_it(tmp_path):
+    store = AudioStore(tmp_path / "audio")
+    history = AudioHistory(":memory:", str(store.root), max_entries=1, store=store)
+
+    path = _write(store, "c", 10)
+    _add(history, path)
+    entry = _add(history, path)
+
+    assert history.get(entry["id"]) is not None
+    assert os.path.exists(path)
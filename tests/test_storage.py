@@ -0,0 +1,148 @@
+"""AudioStore のテスト"""
+
+import os
+import time
+
+import numpy as np
+import pytest
+
+from kokoro_mcp_server.audio import get_audio_format
+from kokoro_mcp_server.storage import TEMP_GRACE_SECONDS, AudioStore
+
+pytestmark = pytest.mark.unit
+
+
+def _commit(store: AudioStore, value: float = 0.5, samples: int = 2400) -> str:
+    writer = store.open(get_audio_format("wav"), 24000)
+    writer.write(np.full(samples, value, dtype=np.float32))
+    return store.commit(writer)
+
+
+def _age(path: str, seconds: float) -> None:
+    then = time.time() - seconds
+    os.utime(path, (then, then))
+
+
+def test_commit_places_file_by_content_hash(tmp_path):
+    store = AudioStore(tmp_path)
+    path = _commit(store)
+
+    name = store.name_of(path)
+    assert name is not None and name.endswith(".wav")
+    assert os.path.dirname(path) == str(tmp_path / name[:2])
+    assert store.locate(name) == tmp_path / name[:2] / name
+    assert os.listdir(store.temp_dir) == []
+
+    # 同じ内容は同じファイルになり、内容が違えば別のファイルになる
+    assert _commit(store) == path
+    assert _commit(store, value=0.25) != path
+
+
+def test_name_of_rejects_paths_outside_layout(tmp_path):
+    store = AudioStore(tmp_path)
+    name = store.name_of(_commit(store))
+
+    assert store.name_of(tmp_path / name) is None
+    assert store.name_of(tmp_path / "00" / name) is None
+    assert store.locate("../secret.wav") is None
+    assert store.locate(name.upper()) is None
+
+
+def test_discard_removes_temp_file(tmp_path):
+    store = AudioStore(tmp_path)
+    writer = store.open(get_audio_format("wav"), 24000)
+    writer.write(np.zeros(100, dtype=np.float32))
+    store.discard(writer)
+    assert not os.path.exists(writer.path)
+
+
+def test_claimed_files_survive_remove_and_sweep(tmp_path):
+    store = AudioStore(tmp_path)
+    path = _commit(store)
+    _age(path, 3600)
+
+    assert store.remove(path) is False
+    result = store.sweep(max_age_seconds=60)
+    assert result["removed"] == 0
+    assert result["claimed"] == 1
+    assert os.path.exists(path)
+
+    store.release(path)
+    assert store.remove(path) is True
+    assert not os.path.exists(path)
+
+
+def test_sweep_removes_expired_files(tmp_path):
+    store = AudioStore(tmp_path)
+    old, new = _commit(store, 0.1), _commit(store, 0.2)
+    for path in (old, new):
+        store.release(path)
+    _age(old, 3600)
+
+    removed = []
+    result = store.sweep(max_age_seconds=60, on_remove=removed.extend)
+
+    assert removed == [old]
+    assert result["removed"] == 1
+    assert result["files"] == 1
+    assert os.path.exists(new)
+
+
+def test_sweep_enforces_size_limit_oldest_first(tmp_path):
+    store = AudioStore(tmp_path)
+    paths = [_commit(store, value) for value in (0.1, 0.2, 0.3)]
+    for age, path in zip((300, 200, 100), paths):
+        store.release(path)
+        _age(path, age)
+    size = os.path.getsize(paths[0])
+
+    removed = []
+    result = store.sweep(max_bytes=2 * size, on_remove=removed.extend)
+
+    assert removed == [paths[0]]
+    assert result["bytes"] <= 2 * size
+    assert [os.path.exists(path) for path in paths] == [False, True, True]
+
+
+def test_sweep_keeps_recent_temp_files(tmp_path):
+    store = AudioStore(tmp_path)
+    store.temp_dir.mkdir(parents=True)
+    recent = store.temp_dir / "recent.wav"
+    stale = store.temp_dir / "stale.wav"
+    for path in (recent, stale):
+        path.write_bytes(b"partial")
+    _age(str(stale), TEMP_GRACE_SECONDS + 60)
+
+    removed = []
+    store.sweep(max_age_seconds=1, on_remove=removed.extend)
+
+    assert recent.exists()
+    assert not stale.exists()
+    # 一時ファイルは履歴から参照されないため通知しない
+    assert removed == []
+
+
+def test_adopt_survives_removal_of_source(tmp_path):
+    store = AudioStore(tmp_path / "audio")
+    source = tmp_path / "cached.wav"
+    source.write_bytes(b"RIFF audio")
+
+    path = store.adopt(source)
+    source.unlink()
+
+    assert store.name_of(path) is not None
+    with open(path, "rb") as f:
+        assert f.read() == b"RIFF audio"
+    assert store.adopt(path) == path
+
+
+def test_claims_are_reference_counted(tmp_path):
+    store = AudioStore(tmp_path)
+    # 同じ内容を2つのリクエストが同時に commit した場合
+    path = _commit(store)
+    assert _commit(store) == path
+    store.release(path)
+
+    assert store.remove(path) is False
+    store.release(path)
+    assert store.remove(path) is True
@@ -0,0 +1,120 @@
+"""HTTPトランスポートの音声ダウンロードのテスト"""
+
+import pytest
+from mcp.server import NotificationOptions, Server
+from mcp.server.models import InitializationOptions
+from starlette.testclient import TestClient
+
+from kokoro_mcp_server.transport import create_http_app, parse_range
+
+pytestmark = pytest.mark.unit
+
+AUDIO_NAME = "0123456789abcdef0123456789abcdef.wav"
+CONTENT = bytes(range(256)) * 4
+
+
+@pytest.fixture
+def client(tmp_path):
+    path = tmp_path / AUDIO_NAME
+    path.write_bytes(CONTENT)
+    entries = {AUDIO_NAME: {"file_path": str(path), "mime_type": "audio/wav"}}
+
+    server = Server("test")
+    options = InitializationOptions(
+        server_name="test",
+        server_version="0",
+        capabilities=server.get_capabilities(NotificationOptions(), {}),
+    )
+    app = create_http_app(server, options, entries.get, lambda: {"status": "ok"})
+    return TestClient(app)
+
+
+@pytest.mark.parametrize("header, expected", [
+    ("bytes=0-99", (0, 99)),
+    ("bytes=100-", (100, 1023)),
+    ("bytes=-24", (1000, 1023)),
+    ("bytes=1000-5000", (1000, 1023)),
+    ("bytes=-5000", (0, 1023)),
+    ("bytes=0-1,5-6", None),
+    ("items=0-1", None),
+    ("bytes=a-b", None),
+    ("bytes=-", None),
+])
+def test_parse_range(header, expected):
+    assert parse_range(header, 1024) == expected
+
+
+@pytest.mark.parametrize("header", ["bytes=1024-", "bytes=10-5", "bytes=-0"])
+def test_parse_range_unsatisfiable(header):
+    with pytest.raises(ValueError):
+        parse_range(header, 1024)
+
+
+def test_full_download(client):
+    response = client.get(f"/audio/{AUDIO_NAME}")
+
+    assert response.status_code == 200
+    assert response.content == CONTENT
+    assert response.headers["content-type"] == "audio/wav"
+    assert response.headers["accept-ranges"] == "bytes"
+    assert response.headers["content-length"] == str(len(CONTENT))
+    assert response.headers["etag"]
+
+
+def test_range_request(client):
+    response = client.get(f"/audio/{AUDIO_NAME}", headers={"Range": "bytes=100-199"})
+
+    assert response.status_code == 206
+    assert response.content == CONTENT[100:200]
+    assert response.headers["content-range"] == f"bytes 100-199/{len(CONTENT)}"
+    assert response.headers["content-length"] == "100"
+
+
+def test_unsatisfiable_range(client):
+    response = client.get(f"/audio/{AUDIO_NAME}", headers={"Range": "bytes=5000-"})
+
+    assert response.status_code == 416
+    assert response.headers["content-range"] == f"bytes */{len(CONTENT)}"
+
+
+def test_etag_revalidation(client):
+    etag = client.get(f"/audio/{AUDIO_NAME}").headers["etag"]
+
+    response = client.get(f"/audio/{AUDIO_NAME}", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.content == b""
+
+    response = client.get(f"/audio/{AUDIO_NAME}", headers={"If-None-Match": '"other"'})
+    assert response.status_code == 200
+
+
+def test_if_range_mismatch_returns_whole_file(client):
+    etag = client.get(f"/audio/{AUDIO_NAME}").headers["etag"]
+
+    response = client.get(
+        f"/audio/{AUDIO_NAME}", headers={"Range": "bytes=0-9", "If-Range": etag}
+    )
+    assert response.status_code == 206
+
+    response = client.get(
+        f"/audio/{AUDIO_NAME}", headers={"Range": "bytes=0-9", "If-Range": '"stale"'}
+    )
+    assert response.status_code == 200
+    assert response.content == CONTENT
+
+
+def test_head_request(client):
+    response = client.head(f"/audio/{AUDIO_NAME}", headers={"Range": "bytes=0-9"})
+
+    assert response.status_code == 206
+    assert response.headers["content-length"] == "10"
+    assert response.content == b""
+
+
+@pytest.mark.parametrize("name", ["1", "ffffffffffffffffffffffffffffffff.wav", "..%2Fsecret.wav"])
+def test_unknown_audio_is_not_found(client, name):
+    assert client.get(f"/audio/{name}").status_code == 404
+
+
+def test_health(client):
+    assert client.get("/health").json() == {"status": "ok"}
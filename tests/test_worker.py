@@ -0,0 +1,133 @@
+"""SynthesisExecutor のアドミッション制御と実行順序のテスト"""
+
+import asyncio
+import threading
+
+import pytest
+
+from kokoro_mcp_server.worker import QueueFullError, SynthesisExecutor
+
+pytestmark = pytest.mark.unit
+
+
+@pytest.fixture
+def executor():
+    executor = SynthesisExecutor(max_workers=1, max_queue=2, max_queued_chars=100,
+                                 aging_chars_per_second=0.0)
+    yield executor
+    executor.shutdown(wait=False)
+
+
+async def _occupy(executor: SynthesisExecutor) -> "tuple[threading.Event, asyncio.Task]":
+    """唯一のワーカーを、イベントがセットされるまで終わらないジョブで埋める"""
+    release = threading.Event()
+    task = asyncio.create_task(executor.submit(release.wait))
+    await asyncio.sleep(0)
+    assert executor.stats()["running"] == 1
+    return release, task
+
+
+async def test_rejects_when_queue_is_full(executor):
+    release, blocker = await _occupy(executor)
+    queued = [asyncio.create_task(executor.submit(lambda: None)) for _ in range(2)]
+    await asyncio.sleep(0)
+
+    with pytest.raises(QueueFullError) as excinfo:
+        await executor.submit(lambda: None)
+    assert excinfo.value.retry_after >= 1.0
+    assert executor.stats()["rejected"] == 1
+
+    release.set()
+    await asyncio.gather(blocker, *queued)
+
+
+async def test_rejects_when_queued_chars_exceed_limit(executor):
+    release, blocker = await _occupy(executor)
+    queued = asyncio.create_task(executor.submit(lambda: None, cost=60))
+    await asyncio.sleep(0)
+
+    with pytest.raises(QueueFullError):
+        await executor.submit(lambda: None, cost=60)
+    assert executor.stats()["queued_chars"] == 60
+
+    release.set()
+    await asyncio.gather(blocker, queued)
+
+
+async def test_submit_all_is_admitted_atomically(executor):
+    release, blocker = await _occupy(executor)
+
+    calls = [(lambda: None, (), 1)] * 3
+    with pytest.raises(QueueFullError):
+        await executor.submit_all(calls)
+    # 一部のジョブだけが待ち行列に残ることはない
+    assert executor.stats()["queued"] == 0
+
+    release.set()
+    await blocker
+    assert await executor.submit_all([(lambda x: x * 2, (i,), 1) for i in range(3)]) == [0, 2, 4]
+
+
+async def test_submit_all_removes_queued_jobs_on_failure():
+    executor = SynthesisExecutor(max_workers=1, max_queue=4)
+    gate = threading.Event()
+    ran = []
+
+    def fail():
+        raise RuntimeError("boom")
+
+    def record(i):
+        gate.wait()
+        ran.append(i)
+
+    try:
+        with pytest.raises(RuntimeError, match="boom"):
+            await executor.submit_all([(fail, (), 1)] + [(record, (i,), 10) for i in range(3)])
+        assert executor.stats()["queued"] == 0
+        assert executor.stats()["queued_chars"] == 0
+        gate.set()
+        await asyncio.sleep(0.05)
+        # 失敗と同時に実行が始まった1件を除き、残りのジョブは実行されない
+        assert len(ran) == 1
+    finally:
+        executor.shutdown(wait=True)
+
+
+async def test_shorter_and_interactive_jobs_run_first(executor):
+    executor.max_queue = 4
+    executor.max_queued_chars = 10000
+    release, blocker = await _occupy(executor)
+
+    order = []
+    jobs = [
+        executor.submit(order.append, "long", cost=300),
+        executor.submit(order.append, "bulk", priority="bulk", cost=10),
+        executor.submit(order.append, "short", cost=10),
+    ]
+    tasks = [asyncio.create_task(job) for job in jobs]
+    await asyncio.sleep(0)
+    release.set()
+    await asyncio.gather(blocker, *tasks)
+
+    assert order == ["short", "long", "bulk"]
+
+
+async def test_waiting_jobs_gain_priority_with_age():
+    executor = SynthesisExecutor(max_workers=1, max_queue=4, aging_chars_per_second=1e6)
+    try:
+        release, blocker = await _occupy(executor)
+        order = []
+        first = asyncio.create_task(executor.submit(order.append, "old-long", cost=500))
+        await asyncio.sleep(0.01)
+        second = asyncio.create_task(executor.submit(order.append, "new-short", cost=10))
+        await asyncio.sleep(0)
+        release.set()
+        await asyncio.gather(blocker, first, second)
+        assert order == ["old-long", "new-short"]
+    finally:
+        executor.shutdown(wait=False)
+
+
+async def test_unknown_priority_is_rejected(executor):
+    with pytest.raises(ValueError):
+        await executor.submit(lambda: None, priority="urgent")